@@ -0,0 +1,74 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: bytes on the wire and encode/decode throughput of the codecs
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_codecs.py
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import time
+
+from gv.codecs import CODECS
+
+
+def _rate(fn, arg, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(arg)
+    return count / (time.perf_counter() - start)
+
+
+def _legacy(message):
+    """The hand-formatted payload used before codecs existed."""
+    return '{value:"%s"}' % str(message["value"])
+
+
+def run(count=100000):
+    reading = {"value": 21.5}
+    stamped = {"value": 21.5, "ts": 1760000000.25}
+    batch = {"data": [{"id": "s%d" % (i % 8), "value": 20 + i * 0.125,
+                       "ts": 1760000000 + i * 0.01} for i in range(50)]}
+    results = {"legacy": {"reading_bytes": len(_legacy(reading)),
+                          "reading_encode_s": _rate(_legacy, reading, count)}}
+    for name, cls in sorted(CODECS.items()):
+        codec = cls()
+        one, many = codec.encode(reading), codec.encode(batch)
+        results[name] = {
+            "reading_bytes": len(one),
+            "reading_encode_s": _rate(codec.encode, reading, count),
+            "reading_decode_s": _rate(codec.decode, one, count),
+            "stamped_bytes": len(codec.encode(stamped)),
+            "batch50_bytes": len(many),
+            "batch50_encode_s": _rate(codec.encode, batch, count // 50),
+            "batch50_decode_s": _rate(codec.decode, many, count // 50),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for name, res in run().items():
+        print(name)
+        for key, value in res.items():
+            print("  %-18s %12.0f" % (key, value))
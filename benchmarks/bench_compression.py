@@ -0,0 +1,124 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: bytes saved vs CPU spent by payload compression
+
+Simulated sensor streams (a weather station: temperature, humidity,
+pressure and wind readings, drifting slowly) are encoded as single
+readings, batches of 10 and 50 readings and array messages, with each
+codec, uncompressed, with zlib, and with zlib and a dictionary trained on
+earlier messages of the same stream (zstd too, if `zstandard` is
+installed). Reports the mean payload size, the saving and the encode and
+decode time per message (codec included).
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_compression.py [messages]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import random
+import sys
+import time
+
+from gv.codecs import CODECS
+from gv.compression import CompressedCodec, SharedDictionary
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+SENSORS = {"temperature": (21.0, 0.05), "humidity": (55.0, 0.2),
+           "pressure": (1013.0, 0.1), "wind-speed": (3.0, 0.3), "wind-dir": (180, 5)}
+
+
+def _stream(seed):
+    """Yields `(sensor_id, value, timestamp)` readings, forever."""
+    rnd = random.Random(seed)
+    state = {id_: base for id_, (base, _) in SENSORS.items()}
+    ts = 1760000000.0
+    while True:
+        for id_, (base, step) in SENSORS.items():
+            if isinstance(base, int):
+                state[id_] = (state[id_] + rnd.randint(-step, step)) % 360
+            else:
+                state[id_] = round(state[id_] + rnd.uniform(-step, step), 2)
+            yield id_, state[id_], round(ts, 3)
+        ts += 1.0
+
+
+def _messages(kind, count, seed):
+    readings = _stream(seed)
+    for _ in range(count):
+        if kind == "reading":
+            _, value, ts = next(readings)
+            yield {"value": value, "ts": ts}
+        elif kind == "array":
+            values = [next(readings) for _ in range(50 * len(SENSORS))][::len(SENSORS)]
+            yield {"values": [v for _, v, _ in values], "ts": [t for _, _, t in values]}
+        else:
+            yield {"data": [{"id": id_, "value": value, "ts": ts}
+                            for id_, value, ts in (next(readings) for _ in range(kind))]}
+
+
+def _measure(codec, messages):
+    start = time.perf_counter()
+    payloads = [codec.encode(message) for message in messages]
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    for payload in payloads:
+        codec.decode(payload)
+    decode = time.perf_counter() - start
+    return (sum(len(payload) for payload in payloads) / len(payloads),
+            encode / len(payloads) * 1e6, decode / len(payloads) * 1e6)
+
+
+def run(messages=2000):
+    methods = ["zlib"] + (["zstd"] if zstandard is not None else [])
+    results = {}
+    for codec_name in sorted(CODECS):
+        plain = CODECS[codec_name]()
+        for kind in ("reading", 10, 50, "array"):
+            label = "%s %s" % (codec_name, kind if kind in ("reading", "array") else "batch%d" % kind)
+            samples = [plain.encode(m) for m in _messages(kind, 200, seed=1)]
+            stream = list(_messages(kind, messages, seed=2))
+            variants = {"none": plain}
+            for method in methods:
+                variants[method] = CompressedCodec(plain, method, min_size=0)
+                dictionary = SharedDictionary.train(1, samples, method=method)
+                variants[method + "+dict"] = CompressedCodec(plain, method, dictionary, min_size=0)
+            rows = results[label] = {}
+            for name, codec in variants.items():
+                rows[name] = _measure(codec, stream)
+    return results
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    for label, rows in run(*args).items():
+        print(label)
+        base = rows["none"][0]
+        for name, (size, encode, decode) in rows.items():
+            print("  %-10s %8.1f bytes %6.1f%% saved  encode %6.1f us  decode %6.1f us"
+                  % (name, size, 100 * (1 - size / base), encode, decode))
@@ -0,0 +1,82 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: QoS 1 publishing through in-flight windows of several sizes
+
+Publishes `messages` QoS 1 readings to a local MQTT stand-in, in both
+threading modes of `MqttTransport`, with in-flight windows of several
+sizes, then waits for all the acknowledgements. Reports the throughput,
+the acknowledgement latency and the max number of messages in flight.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_delivery.py [messages]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import sys
+import time
+
+from gv import DeviceInfo
+from gv.standins import MqttStandIn
+from gv.transports.mqtt import MqttTransport
+
+
+def _publish(broker, messages, threaded, window):
+    me = DeviceInfo("bench-%d-%d" % (threaded, window), "bench", "127.0.0.1", 0)
+    transport = MqttTransport(me, *broker.address, threaded=threaded,
+                              max_in_flight=window, loop_wait_sec=0.01)
+    transport.connect()
+    while not transport.connected:
+        transport.poll()
+    peak = 0
+    start = time.perf_counter()
+    for i in range(messages):
+        transport.send("/devices/bench/sensors/s/output", '{"value":%d}' % i, qos=1)
+        peak = max(peak, transport.deliveries.in_flight)
+    transport.wait_all()
+    elapsed = time.perf_counter() - start
+    stats = transport.deliveries.stats()
+    transport.shutdown()
+    latency = stats["latency"]
+    return {
+        "msg_per_sec": round(messages / elapsed),
+        "ack_mean_ms": round(latency["mean"] * 1e3, 3),
+        "ack_max_ms": round(latency["max"] * 1e3, 3),
+        "peak_in_flight": peak,
+    }
+
+
+def run(messages=20000):
+    results = {}
+    with MqttStandIn() as broker:
+        for threaded in (False, True):
+            for window in (10, 100, 1000):
+                label = "%s, window %d" % ("threaded" if threaded else "caller", window)
+                results[label] = _publish(broker, messages, threaded, window)
+    return results
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    for label, result in run(*args).items():
+        print("%-22s %s" % (label, result))
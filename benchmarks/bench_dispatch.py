@@ -0,0 +1,64 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: topic matching cost against the number of subscriptions
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_dispatch.py
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import time
+
+from gv.topics import TopicIndex
+
+
+def _per_call(fn, arg, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(arg)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def run(sizes=(1, 100, 10000, 100000), count=20000):
+    results = {}
+    for size in sizes:
+        index = TopicIndex(cache_size=0)
+        for i in range(size):
+            index.add('/devices/d%d/actuators/a%d/input' % (i % 1000, i), id)
+        index.add('/devices/+/actuators/+/input', id)
+        index.add('/devices/#', id)
+        topic = '/devices/d%d/actuators/a%d/input' % ((size - 1) % 1000, size - 1)
+        uncached = _per_call(index.match, topic, count)
+        index = TopicIndex()
+        for f in ('/devices/+/actuators/+/input', '/devices/#', topic):
+            index.add(f, id)
+        cached = _per_call(index.match, topic, count)
+        results[size] = (uncached, cached)
+    return results
+
+
+if __name__ == "__main__":
+    print("%12s %14s %14s" % ("subscriptions", "trie us/match", "cached us/match"))
+    for size, (uncached, cached) in run().items():
+        print("%12d %14.2f %14.2f" % (size, uncached, cached))
@@ -0,0 +1,76 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: message volume and cost of report-by-exception filters
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_filters.py [count]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import math
+import random
+import sys
+import time
+
+from gv import GVComm, DeviceInfo, DefaultProtocol
+from gv.filters import Deadband, SwingingDoor
+
+from bench_publish import _NullTransport
+
+
+def _signal(count):
+    """A slowly drifting temperature, one reading per second, with noise
+    and a few steps."""
+    rnd = random.Random(0)
+    return [(20 + 2 * math.sin(i / 3600.0) + (i // 20000) + rnd.gauss(0, 0.02), i)
+            for i in range(count)]
+
+
+def run(count=100000):
+    me = DeviceInfo("bench", "bench", "127.0.0.1", 0)
+    readings = _signal(count)
+    filters = {
+        "none": None,
+        "deadband_0.1": Deadband(absolute=0.1, max_interval=900),
+        "deadband_1pct": Deadband(percent=1, max_interval=900),
+        "swinging_door_0.1": SwingingDoor(0.1, max_interval=900),
+    }
+    results = {}
+    for label, filter_ in filters.items():
+        transport = _NullTransport()
+        comm = GVComm(me, transport, DefaultProtocol(transport, me))
+        comm.set_filter("t", filter_)
+        start = time.perf_counter()
+        for value, ts in readings:
+            comm.send_data("t", value, timestamp=ts)
+        elapsed = time.perf_counter() - start
+        published = filter_.published if filter_ else count
+        results[label] = (published, count / published, elapsed / count * 1e6)
+    return results
+
+
+if __name__ == "__main__":
+    print("%-18s %10s %10s %12s" % ("filter", "messages", "reduction", "us/reading"))
+    for label, (published, ratio, cost) in run(*map(int, sys.argv[1:])).items():
+        print("%-18s %10d %9.1fx %12.2f" % (label, published, ratio, cost))
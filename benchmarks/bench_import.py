@@ -0,0 +1,80 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark and check: cost of `import gv`
+
+Imports the package in fresh interpreters and checks that no transport
+dependency (paho, httplib2) nor optional one (numpy) gets loaded, and
+that the import takes less than `max_ms` milliseconds (best of `runs`,
+as measured by `python -X importtime`). Exits with status 1 otherwise.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_import.py [max_ms [runs]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import subprocess
+import sys
+
+FORBIDDEN = ("paho", "httplib2", "numpy")
+
+_PROBE = """
+import sys
+import gv
+print(",".join(sorted({m.split('.')[0] for m in sys.modules})))
+"""
+
+
+def _import_gv():
+    """Returns the import time of gv (us) and the top-level modules
+    loaded, from a fresh interpreter."""
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", _PROBE],
+                          capture_output=True, text=True, check=True)
+    micros = None
+    for line in done.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == "gv":
+            micros = int(fields[1])
+    return micros, set(done.stdout.strip().split(","))
+
+
+def run(max_ms=25.0, runs=5):
+    times, loaded = [], set()
+    for _ in range(runs):
+        micros, modules = _import_gv()
+        times.append(micros)
+        loaded |= modules
+    return {
+        "best_ms": min(times) / 1000.0,
+        "max_ms": max_ms,
+        "forbidden_loaded": sorted(m for m in FORBIDDEN if m in loaded),
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    result = run(float(args[0]) if args else 25.0, int(args[1]) if len(args) > 1 else 5)
+    print("import gv: %.2f ms (target: < %.0f ms)" % (result["best_ms"], result["max_ms"]))
+    print("forbidden modules loaded: %s" % (", ".join(result["forbidden_loaded"]) or "none"))
+    if result["forbidden_loaded"] or result["best_ms"] >= result["max_ms"]:
+        sys.exit(1)
@@ -0,0 +1,91 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: registration messages sent when a gateway restarts
+
+A gateway serving `devices` devices, each with `sensors` sensors and
+`actuators` actuators, is started twice (the second time with one sensor
+changed on one device), with and without a `RegistrationManifest`, and with
+bulk registration. Counts the registration messages published each time.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_manifest.py [devices [sensors [actuators]]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import functools
+import os
+import sys
+import tempfile
+import time
+
+from gv import DeviceInfo, DefaultProtocol
+from gv.gateway import GVGateway
+from gv.manifest import RegistrationManifest
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+def _start(devices, sensors, actuators, changed, **protocol_options):
+    """Runs the gateway once, returning (registration messages, seconds)."""
+    broker = LoopbackBroker()
+    gw_info = DeviceInfo("gateway", "gateway", "127.0.0.1", 0)
+    transport = LoopbackTransport(gw_info, broker)
+    gateway = GVGateway(gw_info, transport,
+                        functools.partial(DefaultProtocol, **protocol_options))
+    gateway.connect()
+    start = time.perf_counter()
+    before = broker.published
+    for d in range(devices):
+        device = gateway.add_device(DeviceInfo("dev%d" % d, "device", "127.0.0.1", 0))
+        for s in range(sensors):
+            type_ = "TEXT" if changed and d == 0 and s == 0 else "NUMERIC"
+            device.add_sensor("s%d" % s, "sensor", type_)
+        for a in range(actuators):
+            device.add_actuator("a%d" % a, "actuator", "NUMERIC", len)
+    gateway.poll()
+    messages = broker.published - before - devices  # minus the online statuses
+    elapsed = time.perf_counter() - start
+    gateway.shutdown()
+    return messages, elapsed
+
+
+def run(devices=1000, sensors=20, actuators=5):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, manifest, bulk in (("no manifest", False, False),
+                                      ("manifest", True, False),
+                                      ("manifest+bulk", True, True)):
+            path = os.path.join(tmp, "%s.json" % label)
+            for run_, changed in (("first start", False), ("restart", True)):
+                options = {"bulk_registration": bulk}
+                if manifest:
+                    options["manifest"] = RegistrationManifest(path)
+                results["%s/%s" % (label, run_)] = _start(devices, sensors, actuators,
+                                                          changed, **options)
+    return results
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    for label, (messages, elapsed) in run(*args).items():
+        print("%-28s %8d messages  %8.3f s" % (label, messages, elapsed))
@@ -0,0 +1,124 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: actuator round-trip latency of MqttTransport, polling vs threaded
+
+A "backend" client sends a command to the device's actuator; the actuator
+callback answers on a sensor topic; the backend measures the time between
+its command and the answer. The device meanwhile runs a sampling loop doing
+`sample_sec` of work per iteration, calling `poll()` in polling mode.
+
+Usage (from the repository root, with a broker listening on host:port,
+or a local `MqttStandIn` when no host is given):
+    PYTHONPATH=src python benchmarks/bench_mqtt_latency.py [host [port [count]]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import statistics
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from gv import GVComm, DeviceInfo, DefaultProtocol
+from gv.standins import MqttStandIn
+from gv.transports.mqtt import MqttTransport
+
+
+def _round_trips(host, port, threaded, count, sample_sec):
+    me = DeviceInfo("bench-%s" % ("thr" if threaded else "poll"), "bench",
+                    "127.0.0.1", 0)
+    transport = MqttTransport(me, host, port, threaded=threaded)
+    comm = GVComm(me, transport, DefaultProtocol(transport, me))
+    comm.connect()
+    comm.add_actuator("a1", "bench", "bench",
+                      lambda payload: comm.send_data("ack", payload.decode()))
+
+    answered = threading.Event()
+    backend = mqtt.Client("bench-backend-%s" % me.id)
+    backend.on_message = lambda c, u, m: answered.set()
+    backend.connect(host, port)
+    backend.subscribe("/devices/%s/sensors/ack/output" % me.id)
+    backend.loop_start()
+
+    running = True
+
+    def sampling_loop():
+        while running:
+            time.sleep(sample_sec)  # stands for the actual sampling work
+            if not threaded:
+                comm.poll()
+
+    device = threading.Thread(target=sampling_loop, daemon=True)
+    device.start()
+    time.sleep(0.5)  # let both subscriptions settle
+
+    latencies = []
+    command = "/devices/%s/actuators/a1/input" % me.id
+    for _ in range(count):
+        answered.clear()
+        start = time.perf_counter()
+        backend.publish(command, "1")
+        if answered.wait(5):
+            latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(sample_sec * 1.37)  # decorrelate from the sampling loop
+
+    running = False
+    device.join()
+    comm.shutdown()
+    backend.loop_stop()
+    backend.disconnect()
+    return latencies
+
+
+def run(host="127.0.0.1", port=1883, count=200, sample_sec=0.01):
+    results = {}
+    for label, threaded in (("polling", False), ("threaded", True)):
+        lat = sorted(_round_trips(host, port, threaded, count, sample_sec))
+        results[label] = {
+            "count": len(lat),
+            "p50_ms": statistics.median(lat) if lat else None,
+            "p99_ms": lat[int(len(lat) * 0.99) - 1] if lat else None,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    standin = None
+    if args:
+        host = args[0]
+        port = int(args[1]) if len(args) > 1 else 1883
+    else:
+        standin = MqttStandIn()
+        standin.start()
+        host, port = standin.address
+    count = int(args[2]) if len(args) > 2 else 200
+    try:
+        for label, res in run(host, port, count).items():
+            print("%-9s n=%-5d p50=%7.2f ms  p99=%7.2f ms" % (
+                label, res["count"], res["p50_ms"], res["p99_ms"]))
+    finally:
+        if standin:
+            standin.stop()
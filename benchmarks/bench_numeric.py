@@ -0,0 +1,73 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: ingestion of NumPy arrays vs one reading at a time
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_numeric.py [samples]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import sys
+import time
+
+import numpy as np
+
+from gv import GVComm, DeviceInfo, DefaultProtocol, numeric
+
+from bench_publish import _NullTransport
+
+
+def _samples_per_sec(fn, samples):
+    start = time.perf_counter()
+    fn()
+    return samples / (time.perf_counter() - start)
+
+
+def run(samples=200000):
+    me = DeviceInfo("bench", "bench", "127.0.0.1", 0)
+    values = np.random.default_rng(0).normal(size=samples)
+    timestamps = 1.7e9 + np.arange(samples) * 1e-3
+    results = {}
+    for codec in ("json", "cbor"):
+        transport = _NullTransport()
+        comm = GVComm(me, transport, DefaultProtocol(transport, me, codec=codec))
+        handle = comm.sensor("s1")
+
+        def one_by_one():
+            for v, ts in zip(values.tolist(), timestamps.tolist()):
+                handle.send(v, timestamp=ts)
+
+        results[codec + "_per_reading"] = _samples_per_sec(one_by_one, samples)
+        results[codec + "_array"] = _samples_per_sec(
+            lambda: numeric.send_array(comm, "s1", values, timestamps,
+                                       max_payload=64 * 1024), samples)
+        results[codec + "_window_100"] = _samples_per_sec(
+            lambda: numeric.send_array(comm, "s1", values, timestamps,
+                                       window=100), samples)
+    return results
+
+
+if __name__ == "__main__":
+    for label, rate in run(*map(int, sys.argv[1:])).items():
+        print("%-18s %12.0f samples/s" % (label, rate))
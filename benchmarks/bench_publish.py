@@ -0,0 +1,79 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: per-reading cost of the publish path, without any network
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_publish.py [count]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import sys
+import time
+
+from gv import GVComm, DeviceInfo, DefaultProtocol
+from gv.gvlib import Transport
+
+
+class _NullTransport(Transport):
+    """Accepts and discards everything."""
+
+    def _handle_send(self, service, payload, qos=0, retain=False): pass
+    def poll(self): pass
+    def _handle_connect(self): pass
+    def _handle_shutdown(self): pass
+    def _handle_subscription(self, topic, callback): pass
+
+
+def _per_call_us(fn, count):
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def run(count=200000):
+    me = DeviceInfo("bench", "bench", "127.0.0.1", 0)
+    transport = _NullTransport()
+    protocol = DefaultProtocol(transport, me)
+    comm = GVComm(me, transport, protocol)
+    handle = comm.sensor("s1")
+    services = protocol.SERVICES
+    encode = protocol.codec.encode
+
+    def render_each_time(value):
+        # what every send_data used to do before topics were cached
+        topic = services['data'] % {'device_id': protocol.device_info.id,
+                                    'sensor_id': "s1"}
+        transport.send(topic, encode({"value": value}), 0, False)
+
+    return {
+        "uncached_topic_us": _per_call_us(render_each_time, count),
+        "send_data_us": _per_call_us(lambda v: comm.send_data("s1", v), count),
+        "sensor_handle_us": _per_call_us(handle.send, count),
+    }
+
+
+if __name__ == "__main__":
+    for label, cost in run(*map(int, sys.argv[1:])).items():
+        print("%-18s %6.2f us/reading" % (label, cost))
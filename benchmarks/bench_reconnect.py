@@ -0,0 +1,161 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Scenario: restart of the broker under load, with automatic reconnection
+
+A fleet of devices (threaded `MqttTransport`s with a `Reconnector`) keeps
+publishing to a local `MqttStandIn`, which is stopped and, after an outage,
+restarted on the same port with all sessions lost. Once the fleet is back,
+a backend sends a command to every device's actuator, checking that all
+subscriptions were restored, and counts the registrations replayed.
+
+Reports how long the fleet took to recover and the peak of reconnections
+in any 100 ms window (how hard the fleet hit the restarted broker); exits
+with status 1 if some device did not recover.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_reconnect.py [devices [outage_sec [jitter]]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from gv import GVComm, DeviceInfo, DefaultProtocol
+from gv.gvlib import TransportListener
+from gv.reconnect import Reconnector
+from gv.standins import MqttStandIn
+from gv.transports.mqtt import MqttTransport
+
+
+class _Recorder(TransportListener):
+    def __init__(self):
+        self.lost = []
+        self.reconnected = []
+
+    def _after_connection_lost(self, info):
+        self.lost.append(time.monotonic())
+
+    def _after_reconnect(self, info):
+        self.reconnected.append(time.monotonic())
+
+
+def run(devices=50, outage_sec=1.0, rate=10, max_delay=2.0, jitter=1.0, timeout=30.0):
+    """
+    :param rate: readings per second sent by each device
+    """
+    recorder = _Recorder()
+    commands = []
+    registrations = []
+    with MqttStandIn() as broker:
+        host, port = broker.address
+        comms = []
+        for i in range(devices):
+            me = DeviceInfo("dev%d" % i, "restart", "127.0.0.1", 0)
+            transport = MqttTransport(me, host, port, threaded=True)
+            transport.add_listener(recorder)
+            transport.set_reconnector(Reconnector(initial_delay=0.2, max_delay=max_delay,
+                                                  jitter=jitter))
+            comm = GVComm(me, transport, DefaultProtocol(transport, me))
+            comm.connect()
+            comm.add_device()
+            comm.add_sensor("s1", "load", "NUMERIC")
+            comm.add_actuator("a1", "command", "NUMERIC", commands.append)
+            comms.append(comm)
+
+        running = True
+
+        def load():
+            value = 0
+            while running:
+                value += 1
+                for comm in comms:
+                    try:
+                        comm.send_data("s1", value)
+                    except MqttTransport.TransportException:
+                        pass  # queue full while the broker is down
+                time.sleep(1.0 / rate)
+
+        publisher = threading.Thread(target=load, daemon=True)
+        publisher.start()
+        time.sleep(0.5)
+
+        stopped = time.monotonic()
+        broker.stop()
+        time.sleep(outage_sec)
+
+        broker.start()
+        started = time.monotonic()
+        backend = mqtt.Client("restart-backend")
+        backend.on_message = lambda c, u, m: registrations.append(m.topic)
+        backend.connect(host, port)
+        backend.subscribe("/devices/+")  # device registrations
+        backend.loop_start()
+
+        deadline = started + timeout
+        while time.monotonic() < deadline and not all(
+                c.transport.connected and not c.transport.reconnector.active for c in comms):
+            time.sleep(0.05)
+        recovered = time.monotonic() - started
+        time.sleep(0.5)  # let the restored subscriptions settle
+
+        for comm in comms:
+            backend.publish("/devices/%s/actuators/a1/input" % comm.device_info.id, "1")
+        time.sleep(1.0)
+
+        running = False
+        publisher.join()
+        backend.loop_stop()
+        backend.disconnect()
+        back = sum(c.transport.connected for c in comms)
+        attempts = sum(c.transport.reconnector.attempts for c in comms)
+        for comm in comms:
+            comm.shutdown()
+
+    times = sorted(t for t in recorder.reconnected if t >= started)
+    peak = max((sum(1 for u in times if t <= u < t + 0.1) for t in times), default=0)
+    return {
+        "devices": devices,
+        "connections_lost": sum(1 for t in recorder.lost if t >= stopped),
+        "reconnected": back,
+        "recovery_sec": round(recovered, 3),
+        "attempts": attempts,
+        "peak_reconnects_per_100ms": peak,
+        "commands_delivered": len(commands),
+        "registrations_replayed": len(set(registrations)),
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    result = run(int(args[0]) if args else 50,
+                 float(args[1]) if len(args) > 1 else 1.0,
+                 jitter=float(args[2]) if len(args) > 2 else 1.0)
+    for key, value in result.items():
+        print("%-26s %s" % (key, value))
+    if result["reconnected"] < result["devices"] or \
+            result["commands_delivered"] < result["devices"]:
+        sys.exit(1)
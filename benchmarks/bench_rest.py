@@ -0,0 +1,67 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: RestTransport against a local stand-in HTTP server
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_rest.py [count]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import sys
+import time
+
+from gv import DeviceInfo
+from gv.standins import HttpStandIn
+from gv.transports.rest import RestTransport
+
+
+def run(count=2000):
+    server = HttpStandIn(keep=0)
+    server.start()
+    port = server.address[1]
+    me = DeviceInfo("bench", "bench", "127.0.0.1", 0)
+    service = "/devices/bench/sensors/s1/output"
+    payload = '{value:"21.5"}'
+    results = {}
+    try:
+        for label, keep_alive in (("close", False), ("keep-alive", True)):
+            rest = RestTransport(me, "127.0.0.1", port, keep_alive=keep_alive)
+            start = time.perf_counter()
+            for _ in range(count):
+                rest.send(service, payload)
+            results[label] = count / (time.perf_counter() - start)
+            rest.shutdown()
+        rest = RestTransport(me, "127.0.0.1", port)
+        start = time.perf_counter()
+        rest.send_bulk((service, payload) for _ in range(count))
+        results["bulk"] = count / (time.perf_counter() - start)
+        rest.shutdown()
+    finally:
+        server.stop()
+    return results
+
+
+if __name__ == "__main__":
+    for label, rate in run(*map(int, sys.argv[1:])).items():
+        print("%-12s %10.0f req/s" % (label, rate))
@@ -0,0 +1,83 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: actuator commands received over REST, long polling vs streaming
+
+`devices` devices connected with `RestTransport` to a local HTTP stand-in
+receive `commands` actuator commands, published at random intervals,
+by long polling and as an event stream. Reports the delivery latency
+percentiles and the commands lost.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_rest_inbound.py [devices [commands]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import random
+import sys
+import time
+
+from gv import DeviceInfo, GVComm, DefaultProtocol
+from gv.standins import HttpStandIn
+from gv.transports.rest import RestTransport, LONG_POLL, STREAM
+
+
+def _run(mode, devices, commands):
+    latencies = []
+    with HttpStandIn() as server:
+        comms = []
+        for d in range(devices):
+            me = DeviceInfo("dev%d" % d, "device", "127.0.0.1", 0)
+            transport = RestTransport(me, *server.address, receive=mode, hold_sec=5)
+            comm = GVComm(me, transport, DefaultProtocol(transport, me))
+            comm.connect()
+            comm.add_actuator("a", "actuator", "NUMERIC",
+                              lambda payload: latencies.append(time.perf_counter()
+                                                               - float(payload)))
+            comms.append(comm)
+        time.sleep(0.5)  # let every device send its first request
+        rnd = random.Random(0)
+        for _ in range(commands):
+            server.publish("/devices/dev%d/actuators/a/input" % rnd.randrange(devices),
+                           "%.9f" % time.perf_counter())
+            time.sleep(rnd.uniform(0, 0.004))
+        time.sleep(0.5)
+        for comm in comms:
+            comm.shutdown()
+    latencies.sort()
+    return {
+        "received": len(latencies),
+        "lost": commands - len(latencies),
+        **{"p%d_ms" % p: round(latencies[int(len(latencies) * p / 100) - 1] * 1e3, 3)
+           for p in (50, 90, 99) if latencies},
+    }
+
+
+def run(devices=50, commands=1000):
+    return {mode: _run(mode, devices, commands) for mode in (LONG_POLL, STREAM)}
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    for mode, result in run(*args).items():
+        print("%-10s %s" % (mode, result))
@@ -0,0 +1,120 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: readings from an acquisition process, over a pipe vs a ring
+
+An acquisition process produces `readings` readings of `sensors` sensors,
+sent to the process owning the `GVComm` (on the loopback transport) either
+one by one over a `multiprocessing` pipe, each sent with `send_data(...)`,
+or through a `ReadingRing` drained by a `RingConsumer`. Reports the
+readings per second, end to end.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_ring.py [readings [sensors]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from gv import DeviceInfo, GVComm, DefaultProtocol
+from gv.ring import ReadingRing, RingConsumer
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+def _comm():
+    me = DeviceInfo("device", "device", "127.0.0.1", 0)
+    transport = LoopbackTransport(me, LoopbackBroker())
+    comm = GVComm(me, transport, DefaultProtocol(transport, me))
+    comm.connect()
+    return comm
+
+
+def _pipe_producer(conn, readings, sensors):
+    for i in range(readings):
+        conn.send(("s%d" % (i % sensors), float(i), time.time()))
+    conn.send(None)
+
+
+def _ring_producer(path, readings, sensors):
+    ring = ReadingRing.open(path)
+    ids = ["s%d" % s for s in range(sensors)]
+    i = 0
+    while i < readings:
+        if ring.write(ids[i % sensors], float(i), time.time()):
+            i += 1
+        else:
+            time.sleep(0.0005)  # full: let the consumer catch up
+    ring.close()
+
+
+def bench_pipe(readings, sensors):
+    comm = _comm()
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    start = time.perf_counter()
+    producer = multiprocessing.Process(target=_pipe_producer, args=(sender, readings, sensors))
+    producer.start()
+    while True:
+        reading = receiver.recv()
+        if reading is None:
+            break
+        comm.send_data(reading[0], reading[1], timestamp=reading[2])
+    elapsed = time.perf_counter() - start
+    producer.join()
+    comm.shutdown()
+    return readings / elapsed
+
+
+def bench_ring(readings, sensors):
+    comm = _comm()
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as tmp:
+        ring = ReadingRing.create(os.path.join(tmp, "ring"), slots=65536)
+        consumer = RingConsumer(ring, comm)
+        start = time.perf_counter()
+        producer = multiprocessing.Process(target=_ring_producer,
+                                           args=(ring.path, readings, sensors))
+        producer.start()
+        while consumer.consumed < readings:
+            if not consumer.drain():
+                time.sleep(0.0005)
+        elapsed = time.perf_counter() - start
+        producer.join()
+        ring.close()
+    comm.shutdown()
+    return readings / elapsed
+
+
+def run(readings=200000, sensors=10):
+    return {
+        "pipe, send_data": bench_pipe(readings, sensors),
+        "ring, batches": bench_ring(readings, sensors),
+    }
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    for label, rate in run(*args).items():
+        print("%-18s %10.0f readings/s" % (label, rate))
@@ -0,0 +1,94 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: latency of a status message behind a burst of telemetry
+
+A device (threaded `MqttTransport`, local `MqttStandIn`) sends a burst of
+readings, then its status; a backend measures when the status arrives.
+Without a scheduler, the status waits behind the whole burst in the
+transport's outbound queue; with an `OutboundScheduler` limiting
+telemetry, it overtakes the readings still waiting in the scheduler.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_scheduler.py [burst [telemetry_rate]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from gv import GVComm, DeviceInfo, DefaultProtocol
+from gv.scheduler import OutboundScheduler, TELEMETRY
+from gv.standins import MqttStandIn
+from gv.transports.mqtt import MqttTransport
+
+
+def _status_latency(host, port, burst, scheduler):
+    me = DeviceInfo("bench-%s" % ("sched" if scheduler else "fifo"), "bench", "127.0.0.1", 0)
+    transport = MqttTransport(me, host, port, threaded=True, max_queued=burst + 10)
+    if scheduler:
+        transport.set_scheduler(scheduler)
+    comm = GVComm(me, transport, DefaultProtocol(transport, me))
+    comm.connect()
+
+    received = threading.Event()
+    backend = mqtt.Client("bench-backend-%s" % me.id)
+    backend.on_message = lambda c, u, m: received.set() if b'ALERT' in m.payload \
+        else None
+    backend.connect(host, port)
+    backend.subscribe("/devices/%s/status" % me.id)
+    backend.loop_start()
+    time.sleep(0.5)
+
+    handle = comm.sensor("s1")
+    for i in range(burst):
+        handle.send(i)
+    start = time.perf_counter()
+    comm.send_status("ALERT")
+    latency = (time.perf_counter() - start) * 1000 if received.wait(60) else None
+
+    backend.loop_stop()
+    backend.disconnect()
+    comm.shutdown()
+    return latency
+
+
+def run(burst=20000, telemetry_rate=5000):
+    with MqttStandIn() as broker:
+        host, port = broker.address
+        return {
+            "fifo": _status_latency(host, port, burst, None),
+            "scheduler": _status_latency(host, port, burst, OutboundScheduler(
+                rates={TELEMETRY: (telemetry_rate, telemetry_rate / 100)}, max_queued=burst)),
+        }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    results = run(int(args[0]) if args else 20000,
+                  float(args[1]) if len(args) > 1 else 5000)
+    for label, latency in results.items():
+        print("%-10s status after %8.2f ms" % (label, latency))
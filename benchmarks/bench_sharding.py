@@ -0,0 +1,86 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: throughput of a sharded gateway, from 1 to N worker processes
+
+`readings` readings, round-robin over `devices` devices with one sensor
+each, go through a single-process `GVGateway` and through a
+`ShardedGateway` with 1 to `max_shards` workers (default: one per CPU),
+each worker publishing on its own in-memory broker. Reports the readings
+per second, measured until every worker has published everything.
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_sharding.py [readings [devices [max_shards]]]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import multiprocessing
+import sys
+import time
+
+from gv import DeviceInfo
+from gv.gateway import GVGateway
+from gv.sharding import ShardedGateway
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+def _loopback(device_info):
+    return LoopbackTransport(device_info, LoopbackBroker())
+
+
+def _publish(gateway, readings, devices):
+    gateway.connect()
+    handles = []
+    for d in range(devices):
+        handle = gateway.add_device(DeviceInfo("dev%d" % d, "device", "127.0.0.1", 0))
+        handle.add_sensor("s", "sensor", "NUMERIC")
+        handles.append(handle)
+    if isinstance(gateway, ShardedGateway):
+        gateway.sync()
+    start = time.perf_counter()
+    for i in range(readings):
+        handles[i % devices].send_data("s", i)
+        if not i % 10000 and isinstance(gateway, ShardedGateway):
+            gateway.poll()
+    if isinstance(gateway, ShardedGateway):
+        gateway.sync()
+    elapsed = time.perf_counter() - start
+    gateway.shutdown()
+    return readings / elapsed
+
+
+def run(readings=200000, devices=1000, max_shards=None):
+    me = DeviceInfo("gateway", "gateway", "127.0.0.1", 0)
+    results = {"single process": _publish(GVGateway(me, _loopback(me)), readings, devices)}
+    for shards in range(1, (max_shards or multiprocessing.cpu_count()) + 1):
+        results["%d shard(s)" % shards] = _publish(ShardedGateway(me, _loopback, shards),
+                                                   readings, devices)
+    return results
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    results = run(*args)
+    base = results["1 shard(s)"]
+    for label, rate in results.items():
+        print("%-16s %10.0f readings/s  (x%.2f)" % (label, rate, rate / base))
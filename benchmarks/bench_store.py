@@ -0,0 +1,57 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark: enqueue/dequeue throughput of the store-and-forward queue
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/bench_store.py [count]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import sys
+import tempfile
+import time
+
+from gv.store import SegmentQueue
+
+
+def run(count=500000):
+    service = '/devices/bench/sensors/s1/output'
+    payload = '{value:"21.5"}'
+    with tempfile.TemporaryDirectory() as path:
+        queue = SegmentQueue(path)
+        start = time.perf_counter()
+        for _ in range(count):
+            queue.append(service, payload)
+        enqueue = count / (time.perf_counter() - start)
+        start = time.perf_counter()
+        while queue.peek() is not None:
+            queue.pop()
+        dequeue = count / (time.perf_counter() - start)
+        queue.close()
+    return {"enqueue_msg_s": enqueue, "dequeue_msg_s": dequeue}
+
+
+if __name__ == "__main__":
+    for label, rate in run(*map(int, sys.argv[1:])).items():
+        print("%-14s %10.0f" % (label, rate))
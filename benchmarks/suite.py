@@ -0,0 +1,289 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Benchmark suite of the hot paths, for regression tracking
+
+Covers publishing through each transport and codec, inbound dispatch with
+1 to 100k subscriptions, registration of sensors and actuators, listener
+fan-out, the overhead of metrics and memory per device and per sensor.
+Everything runs against in-process stand-ins (`LoopbackTransport`, `MqttStandIn`,
+`HttpStandIn`): no network or external server is needed.
+
+Each case reports throughput, p50/p99 latency of single calls, and the
+memory retained per call and the peak of allocated memory (traced in a
+separate pass, with tracemalloc).
+
+Usage (from the repository root):
+    PYTHONPATH=src python benchmarks/suite.py [--quick] [--only NAME...]
+                                              [--json FILE]
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import argparse
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from gv import GVComm, DeviceInfo, DefaultProtocol
+from gv.gvlib import TransportListener
+from gv.standins import HttpStandIn, MqttStandIn
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+def measure(fn, count, warmup=None):
+    """Calls `fn(i)` for i in `range(count)`, timing each call, then once
+    more under tracemalloc.
+    :return: dict with ops/s, p50/p99 latency (us), bytes retained per
+             call and peak of traced memory over the traced calls
+    """
+    for i in range(warmup if warmup is not None else min(count, 1000)):
+        fn(i)
+    clock = time.perf_counter_ns
+    samples = [0] * count
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        begin = clock()
+        for i in range(count):
+            start = clock()
+            fn(i)
+            samples[i] = clock() - start
+        total = clock() - begin
+    finally:
+        if gc_enabled:
+            gc.enable()
+    samples.sort()
+    traced = min(count, 2000)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(traced):
+        fn(i)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "count": count,
+        "ops_per_sec": round(count / (total / 1e9)),
+        "p50_us": round(samples[count // 2] / 1e3, 3),
+        "p99_us": round(samples[min(count - 1, count * 99 // 100)] / 1e3, 3),
+        "retained_bytes_per_op": round((current - before) / traced, 1),
+        "peak_bytes": peak - before,
+    }
+
+
+def _device(transport_factory, codec="json", id_="bench"):
+    me = DeviceInfo(id_, "bench", "127.0.0.1", 0)
+    transport = transport_factory(me)
+    comm = GVComm(me, transport, DefaultProtocol(transport, me, codec=codec))
+    comm.connect()
+    return comm
+
+
+def bench_publish(scale):
+    """`GVComm.send_data` and `SensorHandle.send` through each transport
+    and codec."""
+    results = {}
+    broker = LoopbackBroker()
+    with MqttStandIn() as mqtt_server, HttpStandIn(keep=0) as http_server:
+        from gv.transports.mqtt import MqttTransport
+        from gv.transports.rest import RestTransport
+        transports = {
+            "loopback": (lambda me: LoopbackTransport(me, broker), 50000),
+            "mqtt": (lambda me: MqttTransport(me, *mqtt_server.address), 20000),
+            "rest": (lambda me: RestTransport(me, *http_server.address), 2000),
+        }
+        for name, (factory, count) in transports.items():
+            count = max(100, int(count * scale))
+            for codec in ("json", "cbor"):
+                comm = _device(factory, codec, "bench-%s-%s" % (name, codec))
+                handle = comm.sensor("s1")
+                results["%s/%s/send_data" % (name, codec)] = measure(
+                    lambda i: comm.send_data("s1", 20.5 + i), count)
+                results["%s/%s/sensor_handle" % (name, codec)] = measure(
+                    lambda i: handle.send(20.5 + i), count)
+                if name == "mqtt":
+                    comm.poll()
+                comm.shutdown()
+    return results
+
+
+def bench_dispatch(scale):
+    """Inbound `Transport.callback` with 1, 100 and 100k subscriptions:
+    always the same topic (cached match) and spread over 10k topics."""
+    results = {}
+    for subscriptions in (1, 100, 100000):
+        transport = LoopbackTransport(DeviceInfo("bench", "bench", "127.0.0.1", 0),
+                                      LoopbackBroker())
+        topics = []
+        for i in range(subscriptions):
+            topic = "/devices/d%d/actuators/a%d/input" % (i % 1000, i)
+            transport.subscribe(topic, len)
+            topics.append(topic)
+        transport.subscribe("/devices/+/actuators/+/input", len)
+        spread = [topics[i * len(topics) // 10000] if len(topics) > 10000
+                  else "/devices/d%d/actuators/a%d/input" % (i % 1000, i)
+                  for i in range(10000)]
+        count = max(1000, int(50000 * scale))
+        callback = transport.callback
+        results["%d/same_topic" % subscriptions] = measure(
+            lambda i: callback(topics[-1], b"1"), count)
+        results["%d/spread_topics" % subscriptions] = measure(
+            lambda i: callback(spread[i % 10000], b"1"), count)
+    return results
+
+
+def bench_registration(scale):
+    """`add_sensor` and `add_actuator` of thousands of endpoints."""
+    count = max(500, int(5000 * scale))
+    comm = _device(lambda me: LoopbackTransport(me, LoopbackBroker()))
+    results = {
+        "add_sensor": measure(lambda i: comm.add_sensor("s%d" % i, "sensor", "NUMERIC"),
+                              count, warmup=0),
+        "add_actuator": measure(lambda i: comm.add_actuator("a%d" % i, "actuator",
+                                                            "NUMERIC", len),
+                                count, warmup=0),
+    }
+    comm.shutdown()
+    return results
+
+
+class _Listener(TransportListener):
+    def _after_subscribe(self, info):
+        pass
+
+
+def bench_listeners(scale):
+    """Cost of notifying 1, 10 and 100 `TransportListener`s of an event."""
+    results = {}
+    info = TransportListener.Info(None, topic="/t")
+    for listeners in (1, 10, 100):
+        transport = LoopbackTransport(DeviceInfo("bench", "bench", "127.0.0.1", 0),
+                                      LoopbackBroker())
+        for _ in range(listeners):
+            transport.add_listener(_Listener())
+        invoke = transport._invoke_listeners
+        results["%d_listeners" % listeners] = measure(
+            lambda i: invoke(TransportListener._after_subscribe, info),
+            max(1000, int(50000 * scale)))
+    return results
+
+
+def bench_metrics(scale):
+    """Overhead of `GVComm.set_metrics(...)` on publishing and dispatch."""
+    from gv.metrics import Metrics
+    results = {}
+    count = max(1000, int(50000 * scale))
+    for enabled in (False, True):
+        comm = _device(lambda me: LoopbackTransport(me, LoopbackBroker()),
+                       id_="bench-metrics-%s" % enabled)
+        if enabled:
+            comm.set_metrics(Metrics())
+        handle = comm.sensor("s1")
+        comm.transport.subscribe("/t", len)
+        callback = comm.transport.callback
+        label = "on" if enabled else "off"
+        results["%s/sensor_handle" % label] = measure(lambda i: handle.send(20.5 + i), count)
+        results["%s/callback" % label] = measure(lambda i: callback("/t", b"1"), count)
+        comm.shutdown()
+    return results
+
+
+def bench_memory(scale):
+    """Memory held by each connected device, and by each sensor handle."""
+    devices = max(100, int(1000 * scale))
+    broker = LoopbackBroker()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    comms = [_device(lambda me: LoopbackTransport(me, broker), id_="dev%d" % i)
+             for i in range(devices)]
+    for comm in comms:
+        comm.add_device()
+    per_device = (tracemalloc.get_traced_memory()[0] - before) / devices
+    comm = comms[0]
+    before = tracemalloc.get_traced_memory()[0]
+    handles = [comm.sensor("s%d" % i) for i in range(devices * 10)]
+    per_sensor = (tracemalloc.get_traced_memory()[0] - before) / len(handles)
+    tracemalloc.stop()
+    return {"per_device_bytes": round(per_device), "per_sensor_handle_bytes": round(per_sensor),
+            "devices": devices}
+
+
+BENCHMARKS = {
+    "publish": bench_publish,
+    "dispatch": bench_dispatch,
+    "registration": bench_registration,
+    "listeners": bench_listeners,
+    "metrics": bench_metrics,
+    "memory": bench_memory,
+}
+
+
+def run(names=None, scale=1.0):
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = BENCHMARKS[name](scale)
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "scale": scale,
+        },
+        "results": results,
+    }
+
+
+def _print(report):
+    for name, cases in report["results"].items():
+        print(name)
+        for case, res in cases.items():
+            if isinstance(res, dict):
+                print("  %-32s %10d ops/s  p50 %8.2f us  p99 %8.2f us  %8.1f B/op" % (
+                    case, res["ops_per_sec"], res["p50_us"], res["p99_us"],
+                    res["retained_bytes_per_op"]))
+            else:
+                print("  %-32s %10s" % (case, res))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--quick", action="store_true",
+                        help="run a tenth of the iterations")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS),
+                        help="run these benchmarks only")
+    parser.add_argument("--json", metavar="FILE",
+                        help="also write the results as JSON ('-' for stdout)")
+    args = parser.parse_args()
+    report = run(args.only, 0.1 if args.quick else 1.0)
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        _print(report)
+        if args.json:
+            with open(args.json, "w") as out:
+                json.dump(report, out, indent=2)
@@ -27,5 +27,16 @@ Main Library Package
 
 from .gvlib import GVComm, DeviceInfo, Callback
 from .protocols import GVProtocol_v1 as DefaultProtocol
-from .transports.rest import RestTransport
+from .aio import AsyncGVComm
+from .protocols import AsyncGVProtocol_v1 as AsyncDefaultProtocol
+from .transports import get_transport, create_transport, register_transport
+
+
+def __getattr__(name):
+    """Transports (e.g. `gv.RestTransport`) are imported on first access."""
+    from . import transports
+    try:
+        return getattr(transports, name)
+    except AttributeError:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
@@ -0,0 +1,267 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+GreenVulcano Communication Library
+asyncio flavor of the main library classes
+
+Everything here mirrors its counterpart in `gvlib`, except that the
+methods performing I/O are coroutines and must be awaited. Callbacks and
+listener methods may be plain functions or coroutine functions: in the
+latter case they are awaited on the event loop.
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+"""
+
+import abc
+import collections.abc
+import logging
+
+from . import mixins
+from .gvlib import Callback, Transport, TransportListener
+from .topics import TopicIndex
+
+
+_log = logging.getLogger(__name__)
+
+
+async def _maybe_await(result):
+    if isinstance(result, collections.abc.Awaitable):
+        result = await result
+    return result
+
+
+class AsyncTransport(metaclass=abc.ABCMeta):
+    """
+    Abstract base class for asyncio transport implementations.
+    See `Transport` for the general contract: the only differences are
+    that I/O methods are coroutines and that callbacks and listeners
+    may be coroutine functions.
+    """
+
+    TransportException = Transport.TransportException
+
+    def __init__(self):
+        """Base class constructor."""
+        self.__callbacks = TopicIndex()
+        self.__listeners = set()
+
+    async def connect(self):
+        """Initiates a connection to the IoT network.
+        See `Transport.connect()`."""
+        try:
+            await self._handle_connect()
+            await self._invoke_listeners(TransportListener._after_connect,
+                                         TransportListener.Info(self))
+        except Exception as exc:
+            await self._invoke_listeners(TransportListener._after_connection_unsuccessful,
+                                         TransportListener.Info(self, failure_reason=exc))
+
+    async def subscribe(self, topic: str, callback: Callback):
+        """Subscribes to a topic with a specific callback function.
+        See `Transport.subscribe(...)`."""
+        if self.__callbacks.add(topic, callback):
+            await self._handle_subscription(topic, callback)
+        await self._invoke_listeners(TransportListener._after_subscribe,
+                                     TransportListener.Info(self, topic=topic))
+
+    async def unsubscribe(self, topic: str, callback: Callback = None):
+        """Removes a callback (or all the callbacks) from a topic.
+        See `Transport.unsubscribe(...)`."""
+        if topic not in self.__callbacks:
+            return
+        await self._invoke_listeners(TransportListener._before_unsubscribe,
+                                     TransportListener.Info(self, topic=topic))
+        if self.__callbacks.remove(topic, callback):
+            await self._handle_unsubscription(topic)
+
+    async def shutdown(self):
+        """Shuts down the connection to the IoT network.
+        See `Transport.shutdown()`."""
+        await self._invoke_listeners(TransportListener._before_disconnect,
+                                     TransportListener.Info(self))
+        await self._handle_shutdown()
+
+    async def callback(self, topic: str, payload: bytearray):
+        """Invokes the callbacks registered for a specific topic
+        subscription with the provided data, awaiting those returning
+        an awaitable. See `Transport._run_callbacks(...)` for ordering and
+        error handling.
+        :param topic: the topic for which to invoke callbacks
+        :param payload: the data to pass to the callback chain
+        """
+        for cb in self.__callbacks.match(topic):
+            try:
+                payload = await _maybe_await(cb(payload))
+            except Exception as exc:
+                _log.exception("Callback failed on %s", topic)
+                await self._invoke_listeners(TransportListener._after_callback_error,
+                                             TransportListener.Info(self, topic, exc))
+
+    def add_listener(self, listener: TransportListener):
+        """Registers a new `TransportListener` for this transport."""
+        self.__listeners.add(listener)
+
+    def remove_listener(self, listener: TransportListener):
+        """Unregisters a `TransportListener` for this transport."""
+        self.__listeners.remove(listener)
+
+    async def _invoke_listeners(self, listener_method, info: TransportListener.Info):
+        """Invokes a method on all transport listeners, awaiting the
+        ones implemented as coroutines."""
+        name = listener_method.__name__
+        for lst in list(self.__listeners):
+            await _maybe_await(getattr(lst, name)(info))
+
+    @abc.abstractmethod
+    async def send(self, service: str, payload: bytearray,
+                   qos: int = 0, retain: bool = False):
+        """Sends data to a specific service. See `Transport.send(...)`."""
+        raise self.TransportException(lookup="NOT_IMPLEMENTED")
+
+    async def poll(self):
+        """Fetches new data from the IoT network. Reactive transports
+        deliver data from the event loop as they arrive, so by default
+        there is nothing to do."""
+        pass
+
+    @abc.abstractmethod
+    async def _handle_connect(self):
+        pass
+
+    @abc.abstractmethod
+    async def _handle_shutdown(self):
+        pass
+
+    @abc.abstractmethod
+    async def _handle_subscription(self, topic: str, callback: Callback):
+        raise self.TransportException(lookup="NOT_IMPLEMENTED")
+
+    async def _handle_unsubscription(self, topic: str):
+        pass  # nothing to undo for transports without subscriptions
+
+
+class AsyncProtocol(metaclass=abc.ABCMeta):
+    """Base class for asyncio protocol implementations.
+    """
+
+    def __init__(self, transport: AsyncTransport):
+        self._transport = transport
+
+    @abc.abstractmethod
+    async def add_device(self): pass
+
+    @abc.abstractmethod
+    async def add_sensor(self, id_: str, name: str, type_: str): pass
+
+    @abc.abstractmethod
+    async def add_actuator(self, id_: str, name: str, type_: str): pass
+
+    @abc.abstractmethod
+    async def send_data(self, id_: str, value: str,
+                        qos: int = 0, retain: bool = False,
+                        timestamp=None): pass
+
+    async def send_data_batch(self, readings, qos: int = 0, retain: bool = False):
+        """Sends several sensor readings at once. See
+        `Protocol.send_data_batch(...)`."""
+        for reading in readings:
+            if len(reading) > 2 and reading[2] is not None:
+                await self.send_data(reading[0], reading[1], qos, retain, timestamp=reading[2])
+            else:
+                await self.send_data(reading[0], reading[1], qos, retain)
+
+
+class AsyncGVComm(mixins._DeviceInfo):
+    """asyncio counterpart of `GVComm`: same Façade, awaitable methods.
+    """
+
+    def __init__(self, device_info, transport: AsyncTransport,
+                 protocol: AsyncProtocol):
+        """Constructor"""
+        mixins._DeviceInfo.__init__(self, device_info)
+        self.__transport = transport
+        self.__protocol = protocol
+
+    @property
+    def transport(self):
+        return self.__transport
+
+    @property
+    def protocol(self):
+        return self.__protocol
+
+    async def add_device(self, callback: Callback = None):
+        """Registers the current device to the IoT network.
+        See `GVComm.add_device(...)`."""
+        await self.__protocol.add_device()
+        if callback:
+            topic = self.__protocol.topic("devices_input")
+            await self.add_callback(topic, callback)
+
+    async def send_status(self, status: str):
+        """Sends the status of the current device to the IoT network."""
+        await self.__protocol.send_status(status)
+
+    async def add_sensor(self, id_: str, name: str, type_: str):
+        """Registers a new sensing capability for this device."""
+        await self.__protocol.add_sensor(id_, name, type_)
+
+    async def add_actuator(self, id_: str, name: str, type_: str, callback: Callback):
+        """Registers a new actuator for this device. The callback may be
+        a coroutine function."""
+        topic = self.__protocol.topic("actuators_input", id_)
+        await self.__protocol.add_actuator(id_, name, type_)
+        await self.add_callback(topic, callback)
+
+    async def send_data(self, id_: str, value: str, qos=0, retain=False,
+                        timestamp=None):
+        """Sends a sensor reading. See `GVComm.send_data(...)`."""
+        if timestamp is None:
+            await self.__protocol.send_data(id_, value, qos, retain)
+        else:
+            await self.__protocol.send_data(id_, value, qos, retain, timestamp=timestamp)
+
+    def sensor(self, id_: str):
+        """Returns a `SensorHandle` for a sensor; its `send(...)` returns
+        an awaitable. See `GVComm.sensor(...)`."""
+        return self.__protocol.sensor_handle(id_)
+
+    async def send_data_batch(self, readings, qos=0, retain=False):
+        """Sends several readings at once. See `GVComm.send_data_batch(...)`."""
+        await self.__protocol.send_data_batch(readings, qos, retain)
+
+    async def add_callback(self, topic, cb: Callback):
+        """Registers a callback (possibly a coroutine function) for data
+        received on a topic."""
+        await self.__transport.subscribe(topic, cb)
+
+    async def poll(self):
+        """Fetches new data from the IoT network, for non-reactive
+        transports."""
+        await self.__transport.poll()
+
+    async def connect(self):
+        """Connects to the IoT network."""
+        await self.__transport.connect()
+
+    async def shutdown(self):
+        """Disconnects from the IoT network."""
+        await self.__transport.shutdown()
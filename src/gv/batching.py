@@ -0,0 +1,102 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Automatic batching of sensor readings
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import time
+
+
+class DataBatcher(object):
+    """Accumulates sensor readings and hands them over to a protocol's
+    `send_data_batch(...)` when any of the configured thresholds is hit:
+        max_items       : number of readings waiting to be sent
+        max_bytes       : (approximate) encoded size of the waiting readings
+        max_latency_sec : age of the oldest waiting reading
+    Any threshold set to `None` is ignored.
+    Readings with a different qos/retain combination go in separate batches.
+
+    The batcher does not run any thread of its own: the latency threshold
+    is checked on every `add(...)` and whenever `check()` is called
+    (`GVComm.poll()` does it for you).
+    """
+
+    ENTRY_OVERHEAD = 20  # bytes added by the batch format for each reading
+    TIMESTAMP_OVERHEAD = 20  # bytes added by the timestamp of a reading
+
+    def __init__(self, protocol, max_items=100, max_bytes=None,
+                 max_latency_sec=1.0, clock=time.monotonic):
+        self.__protocol = protocol
+        self.__max_items = max_items
+        self.__max_bytes = max_bytes
+        self.__max_latency_sec = max_latency_sec
+        self.__clock = clock
+        self.__batches = {}  # (qos, retain) -> [readings, size, first_added]
+
+    @property
+    def pending(self):
+        """Number of readings waiting to be sent."""
+        return sum(len(b[0]) for b in self.__batches.values())
+
+    def add(self, id_, value, qos=0, retain=False, timestamp=None):
+        """Queues a reading, flushing its batch if a threshold is reached.
+        :param id_: the id of the sensor
+        :param value: the value of the reading
+        :param qos: quality of service for the delivery of the batch
+        :param retain: `True` if the batch must be retained
+        :param timestamp: (opt) when the reading was taken
+        """
+        key = (qos, retain)
+        batch = self.__batches.get(key)
+        if batch is None:
+            batch = self.__batches[key] = [[], 0, self.__clock()]
+        size = len(id_) + len(str(value)) + self.ENTRY_OVERHEAD
+        if timestamp is None:
+            batch[0].append((id_, value))
+        else:
+            batch[0].append((id_, value, timestamp))
+            size += self.TIMESTAMP_OVERHEAD
+        batch[1] += size
+        if ((self.__max_items is not None and len(batch[0]) >= self.__max_items) or
+                (self.__max_bytes is not None and batch[1] >= self.__max_bytes)):
+            self.__send(key)
+        else:
+            self.check()
+
+    def check(self):
+        """Flushes the batches whose oldest reading exceeded `max_latency_sec`."""
+        if self.__max_latency_sec is None or not self.__batches:
+            return
+        deadline = self.__clock() - self.__max_latency_sec
+        for key in [k for k, b in self.__batches.items() if b[2] <= deadline]:
+            self.__send(key)
+
+    def flush(self):
+        """Sends all waiting readings, regardless of thresholds."""
+        for key in list(self.__batches):
+            self.__send(key)
+
+    def __send(self, key):
+        readings = self.__batches.pop(key)[0]
+        self.__protocol.send_data_batch(readings, *key)
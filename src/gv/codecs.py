@@ -0,0 +1,296 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Payload codecs used by the protocols
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import abc
+import datetime
+import json
+import numbers
+import struct
+
+
+class Codec(metaclass=abc.ABCMeta):
+    """Turns the messages built by a protocol (made of dicts, lists,
+    strings, numbers, booleans and `None`) into payloads, and back.
+    """
+
+    name = None          # short name, used to select and announce the codec
+    content_type = None  # MIME type of the payloads
+
+    @abc.abstractmethod
+    def encode(self, message):
+        """Returns the payload (`str` or `bytes`) for a message."""
+        pass
+
+    @abc.abstractmethod
+    def decode(self, payload):
+        """Returns the message carried by a payload."""
+        pass
+
+    def array(self, values):
+        """Returns the representation of a numeric array (a sequence, or
+        anything with a `tolist()` method, such as a NumPy array) to put in
+        a message. By default, a list."""
+        return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+class JsonCodec(Codec):
+    """Compact JSON (no whitespace, UTF-8)."""
+
+    name = 'json'
+    content_type = 'application/json; charset=utf-8'
+
+    def __init__(self):
+        self.__encode = json.JSONEncoder(ensure_ascii=False, check_circular=False,
+                                         separators=(',', ':'), default=self._default).encode
+        self.__decode = json.JSONDecoder().decode
+
+    @staticmethod
+    def _default(obj):
+        """Values JSON knows nothing about: `datetime` objects become
+        epoch-based timestamps, as in CBOR, NumPy scalars (and other
+        numbers) their Python equivalent."""
+        if isinstance(obj, datetime.datetime):
+            return obj.timestamp()
+        if hasattr(obj, 'item'):
+            return obj.item()
+        if isinstance(obj, numbers.Integral):
+            return int(obj)
+        if isinstance(obj, numbers.Real):
+            return float(obj)
+        raise TypeError("Cannot encode %r as JSON" % type(obj))
+
+    def encode(self, message):
+        return self.__encode(message)
+
+    def decode(self, payload):
+        if isinstance(payload, (bytes, bytearray)):
+            payload = payload.decode('utf-8')
+        return self.__decode(payload)
+
+
+class _Tagged(object):
+    """A CBOR tag applied to a byte string."""
+    __slots__ = ('tag', 'data')
+
+    def __init__(self, tag, data):
+        self.tag = tag
+        self.data = data
+
+
+class CborCodec(Codec):
+    """Compact binary encoding following RFC 7049 (CBOR).
+    Integers take 1 to 9 bytes depending on their magnitude, floats are
+    sent in single precision whenever that loses nothing, `datetime`
+    objects become epoch-based timestamps (tag 1), integers beyond 64 bits
+    bignums (tags 2 and 3). NumPy arrays passed to
+    `array(...)` become RFC 8746 typed arrays (little endian), i.e. their
+    raw memory, with no per-element encoding.
+    """
+
+    name = 'cbor'
+    content_type = 'application/cbor'
+
+    _F32 = struct.Struct('>f')
+    _F64 = struct.Struct('>d')
+
+    # RFC 8746 tags for (kind, itemsize), little endian, and struct format
+    _TYPED_ARRAYS = {
+        ('u', 1): (64, 'B'), ('u', 2): (69, 'H'), ('u', 4): (70, 'I'),
+        ('u', 8): (71, 'Q'), ('i', 1): (72, 'b'), ('i', 2): (77, 'h'),
+        ('i', 4): (78, 'i'), ('i', 8): (79, 'q'), ('f', 2): (84, 'e'),
+        ('f', 4): (85, 'f'), ('f', 8): (86, 'd'),
+    }
+    _TYPED_FORMATS = {tag: fmt for tag, fmt in _TYPED_ARRAYS.values()}
+
+    def array(self, values):
+        dtype = getattr(values, 'dtype', None)
+        typed = dtype is not None and self._TYPED_ARRAYS.get((dtype.kind, dtype.itemsize))
+        if not typed:
+            return Codec.array(self, values)
+        return _Tagged(typed[0], values.astype(dtype.newbyteorder('<'), copy=False).tobytes())
+
+    def encode(self, message):
+        out = bytearray()
+        self.__encode(message, out)
+        return bytes(out)
+
+    def decode(self, payload):
+        value, pos = self.__decode(memoryview(payload), 0)
+        return value
+
+    @staticmethod
+    def _head(major, n, out):
+        major <<= 5
+        if n < 24:
+            out.append(major | n)
+        elif n < 0x100:
+            out += bytes((major | 24, n))
+        elif n < 0x10000:
+            out.append(major | 25)
+            out += n.to_bytes(2, 'big')
+        elif n < 0x100000000:
+            out.append(major | 26)
+            out += n.to_bytes(4, 'big')
+        else:
+            out.append(major | 27)
+            out += n.to_bytes(8, 'big')
+
+    def __encode(self, obj, out):
+        t = type(obj)
+        if t is str:
+            data = obj.encode('utf-8')
+            self._head(3, len(data), out)
+            out += data
+        elif t is int:
+            if obj >= 0:
+                major, n = 0, obj
+            else:
+                major, n = 1, -1 - obj
+            if n < 0x10000000000000000:
+                self._head(major, n, out)
+            else:  # bignum: tag 2 (or 3) applied to the magnitude
+                self._head(6, 2 + major, out)
+                data = n.to_bytes((n.bit_length() + 7) // 8, 'big')
+                self._head(2, len(data), out)
+                out += data
+        elif t is float:
+            f32 = self._F32.pack(obj) if -3.4e38 < obj < 3.4e38 else None
+            if f32 is not None and self._F32.unpack(f32)[0] == obj:
+                out.append(0xfa)
+                out += f32
+            else:
+                out.append(0xfb)
+                out += self._F64.pack(obj)
+        elif t is dict:
+            self._head(5, len(obj), out)
+            for key, value in obj.items():
+                self.__encode(key, out)
+                self.__encode(value, out)
+        elif t is list or t is tuple:
+            self._head(4, len(obj), out)
+            for value in obj:
+                self.__encode(value, out)
+        elif obj is None:
+            out.append(0xf6)
+        elif t is bool:
+            out.append(0xf5 if obj else 0xf4)
+        elif t is bytes or t is bytearray:
+            self._head(2, len(obj), out)
+            out += obj
+        elif t is _Tagged:
+            self._head(6, obj.tag, out)
+            self._head(2, len(obj.data), out)
+            out += obj.data
+        elif isinstance(obj, datetime.datetime):
+            out.append(0xc1)  # tag 1: epoch-based date/time
+            self.__encode(obj.timestamp(), out)
+        elif isinstance(obj, numbers.Integral):
+            self.__encode(int(obj), out)
+        elif isinstance(obj, numbers.Real):
+            self.__encode(float(obj), out)
+        elif hasattr(obj, 'item'):  # other NumPy scalars, e.g. booleans
+            self.__encode(obj.item(), out)
+        else:
+            raise TypeError("Cannot encode %r as CBOR" % t)
+
+    def __decode(self, data, pos):
+        initial = data[pos]
+        major, info = initial >> 5, initial & 0x1f
+        pos += 1
+        if major == 7:
+            if info == 20:
+                return False, pos
+            if info == 21:
+                return True, pos
+            if info in (22, 23):
+                return None, pos
+            if info == 25:
+                return struct.unpack('>e', data[pos:pos + 2])[0], pos + 2
+            if info == 26:
+                return self._F32.unpack(data[pos:pos + 4])[0], pos + 4
+            if info == 27:
+                return self._F64.unpack(data[pos:pos + 8])[0], pos + 8
+            raise ValueError("Unsupported CBOR simple value: %d" % info)
+        if info < 24:
+            n = info
+        elif info < 28:
+            size = 1 << (info - 24)
+            n = int.from_bytes(data[pos:pos + size], 'big')
+            pos += size
+        else:
+            raise ValueError("Unsupported CBOR length: %d" % info)
+        if major == 0:
+            return n, pos
+        if major == 1:
+            return -1 - n, pos
+        if major == 2:
+            return bytes(data[pos:pos + n]), pos + n
+        if major == 3:
+            return str(data[pos:pos + n], 'utf-8'), pos + n
+        if major == 4:
+            result = []
+            for _ in range(n):
+                value, pos = self.__decode(data, pos)
+                result.append(value)
+            return result, pos
+        if major == 5:
+            result = {}
+            for _ in range(n):
+                key, pos = self.__decode(data, pos)
+                result[key], pos = self.__decode(data, pos)
+            return result, pos
+        # major == 6: tags
+        value, pos = self.__decode(data, pos)
+        if n == 1:
+            value = datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+        elif n == 2:
+            value = int.from_bytes(value, 'big')
+        elif n == 3:
+            value = -1 - int.from_bytes(value, 'big')
+        elif n in self._TYPED_FORMATS:
+            fmt = self._TYPED_FORMATS[n]
+            value = list(struct.unpack('<%d%s' % (len(value) // struct.calcsize(fmt), fmt), value))
+        return value, pos
+
+
+CODECS = {
+    JsonCodec.name: JsonCodec,
+    CborCodec.name: CborCodec,
+}
+
+
+def get_codec(codec):
+    """Returns a codec instance: `codec` may be a `Codec` (returned as is),
+    the name of a codec in `CODECS`, or `None` for the default (JSON)."""
+    if codec is None:
+        return JsonCodec()
+    if isinstance(codec, Codec):
+        return codec
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise ValueError("Unknown codec: %s" % codec)
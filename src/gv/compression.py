@@ -0,0 +1,216 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Payload compression with shared dictionaries
+
+A compressed payload starts with a 4-byte header: 0x1F (a byte that can
+start neither a JSON text nor a valid CBOR item), the method (1: zlib raw
+deflate, 2: zstd) and the id of the dictionary used (u16, big endian;
+0 for none), followed by the compressed payload of the wrapped codec.
+Payloads without the header are not compressed. As the payloads of a
+codec may be either, its content type is not the one of the wrapped codec
+but `application/x-gv-compressed`, naming the codec and the method (e.g.
+`application/x-gv-compressed; codec=json; method=zlib`).
+
+zstd requires the `zstandard` package, which is not needed by the rest of
+the library.
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import collections
+import re
+import struct
+import zlib
+
+from .codecs import Codec, get_codec
+
+
+MARKER = 0x1f
+ZLIB, ZSTD = 1, 2
+METHODS = {'zlib': ZLIB, 'zstd': ZSTD}
+
+_HEADER = struct.Struct('>BBH')
+_NUMBERS = re.compile(rb'-?[0-9][0-9.eE+-]*')
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compression requires the zstandard package")
+    return zstandard
+
+
+class SharedDictionary(object):
+    """A compression dictionary shared by the senders and the receivers of
+    a class of devices, identified on the wire by `id_` (1 to 65535).
+    """
+
+    def __init__(self, id_, data):
+        if not 0 < id_ < 0x10000:
+            raise ValueError("Dictionary ids go from 1 to 65535")
+        self.id = id_
+        self.data = bytes(data)
+
+    @classmethod
+    def train(cls, id_, samples, size=2048, method='zlib'):
+        """Builds a dictionary from sample payloads (e.g. the messages of
+        a device of the class, as encoded by its codec).
+        For zlib, the dictionary gathers the recurring pieces of the
+        samples found between numbers, the most frequent (weighted by
+        length) last, where they are cheapest to refer to, after as many of
+        the latest samples as fit; for zstd, it is trained by the
+        `zstandard` package.
+        :param size: max size of the dictionary, in bytes
+        """
+        samples = [s.encode('utf-8') if isinstance(s, str) else bytes(s) for s in samples]
+        if method == 'zstd':
+            return cls(id_, _zstandard().train_dictionary(size, samples).as_bytes())
+        counts = collections.Counter()
+        for sample in samples:
+            counts.update(piece for piece in _NUMBERS.split(sample) if len(piece) > 2)
+        chosen, used = [], 0
+        for piece, count in sorted(counts.items(), key=lambda pc: -pc[1] * len(pc[0])):
+            if count < 2 or used + len(piece) > size:
+                continue
+            chosen.append(piece)
+            used += len(piece)
+        # whole samples fill the rest, for the values recurring as well
+        for sample in reversed(samples):
+            if used + len(sample) > size:
+                break
+            chosen.append(sample)
+            used += len(sample)
+        return cls(id_, b''.join(reversed(chosen)))
+
+
+class CompressedCodec(Codec):
+    """Wraps a codec (see `gv.codecs`), compressing the payloads of at
+    least `min_size` bytes with `method` ('zlib' or 'zstd'), and a shared
+    dictionary if given: small payloads, such as single readings, are left
+    alone, while batches and registrations shrink. Receivers decode both
+    compressed and plain payloads, given the dictionaries the senders use
+    (`dictionary`, plus any in `dictionaries`), refusing payloads growing
+    beyond `max_size` bytes once decompressed.
+    """
+
+    def __init__(self, codec=None, method='zlib', dictionary=None, dictionaries=(),
+                 level=6, min_size=128, max_size=1024 * 1024):
+        """
+        :param codec: the wrapped codec, or its name (default: JSON)
+        :param dictionary: (opt) the `SharedDictionary` to compress with
+        :param dictionaries: (opt) other dictionaries to decode with
+        :param level: compression level
+        :param min_size: smallest payload to compress, in bytes
+        :param max_size: largest payload to decompress, in bytes
+        """
+        if method not in METHODS:
+            raise ValueError("Unknown compression method: %s" % method)
+        self.__codec = get_codec(codec)
+        self.name = "%s+%s" % (self.__codec.name, method)
+        self.content_type = "application/x-gv-compressed; codec=%s; method=%s" % (
+            self.__codec.name, method)
+        self.__method = METHODS[method]
+        self.__level = level
+        self.__min_size = min_size
+        self.__max_size = max_size
+        self.__dictionary = dictionary
+        self.__dictionaries = {d.id: d for d in dictionaries}
+        if dictionary is not None:
+            self.__dictionaries[dictionary.id] = dictionary
+        self.__header = _HEADER.pack(MARKER, self.__method, dictionary.id if dictionary else 0)
+        self.__zstd = {}  # dictionary id -> zstandard decompressor
+        if self.__method == ZSTD:
+            self.__compress = self.__zstd_compressor().compress
+        else:
+            self.__compress = self.__deflate
+
+    @property
+    def codec(self):
+        return self.__codec
+
+    def array(self, values):
+        return self.__codec.array(values)
+
+    def encode(self, message):
+        payload = self.__codec.encode(message)
+        if len(payload) < self.__min_size:
+            return payload
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        return self.__header + self.__compress(payload)
+
+    def decode(self, payload):
+        if not isinstance(payload, str) and len(payload) >= 4 and payload[0] == MARKER:
+            payload = self.decompress(payload)
+        return self.__codec.decode(payload)
+
+    def decompress(self, payload):
+        """Returns the payload of the wrapped codec carried by a
+        compressed payload; raises `ValueError` if it is larger than
+        `max_size`."""
+        marker, method, dictionary_id = _HEADER.unpack_from(payload)
+        data = memoryview(payload)[4:]
+        if dictionary_id and dictionary_id not in self.__dictionaries:
+            raise ValueError("Unknown compression dictionary: %d" % dictionary_id)
+        if method == ZLIB:
+            if dictionary_id:
+                decompressor = zlib.decompressobj(-15, zdict=self.__dictionaries[dictionary_id].data)
+            else:
+                decompressor = zlib.decompressobj(-15)
+            payload = decompressor.decompress(data, self.__max_size + 1)
+            if len(payload) > self.__max_size:
+                raise ValueError("Decompressed payload larger than %d bytes" % self.__max_size)
+            return payload + decompressor.flush()  # all the output is out, if under the limit
+        if method == ZSTD:
+            decompressor = self.__zstd_decompressor(dictionary_id)
+            if _zstandard().frame_content_size(data) > self.__max_size:
+                raise ValueError("Decompressed payload larger than %d bytes" % self.__max_size)
+            # the limit of frames not declaring their size
+            return decompressor.decompress(data, max_output_size=self.__max_size)
+        raise ValueError("Unknown compression method: %d" % method)
+
+    def __deflate(self, payload):
+        # raw deflate: no zlib header and checksum, the transport has its own
+        if self.__dictionary is None:
+            compressor = zlib.compressobj(self.__level, zlib.DEFLATED, -15)
+        else:
+            compressor = zlib.compressobj(self.__level, zlib.DEFLATED, -15,
+                                          zdict=self.__dictionary.data)
+        return compressor.compress(payload) + compressor.flush()
+
+    def __zstd_compressor(self):
+        zstandard = _zstandard()
+        dictionary = self.__dictionary
+        return zstandard.ZstdCompressor(
+            level=self.__level, write_checksum=False, write_content_size=True,
+            dict_data=zstandard.ZstdCompressionDict(dictionary.data) if dictionary else None)
+
+    def __zstd_decompressor(self, dictionary_id):
+        decompressor = self.__zstd.get(dictionary_id)
+        if decompressor is None:
+            zstandard = _zstandard()
+            dictionary = self.__dictionaries.get(dictionary_id)
+            decompressor = self.__zstd[dictionary_id] = zstandard.ZstdDecompressor(
+                dict_data=zstandard.ZstdCompressionDict(dictionary.data) if dictionary else None)
+        return decompressor
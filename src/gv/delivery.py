@@ -0,0 +1,277 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Delivery tracking of acknowledged (QoS 1 and 2) messages
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import logging
+import threading
+import time
+
+from .gvlib import Transport
+from .metrics import Histogram
+
+
+_log = logging.getLogger(__name__)
+
+
+class Delivery(object):
+    """Completion handle of a message waiting for its acknowledgement,
+    returned by `Transport.send(...)` (and `GVComm.send_data(...)`) for
+    messages sent with qos 1 or 2 by the transports that track deliveries.
+    """
+    __slots__ = ('service', 'qos', 'sent_at', 'acked_at', 'error', 'spilled',
+                 '_tracker', '_callbacks')
+
+    def __init__(self, tracker, service, qos, sent_at):
+        self.service = service
+        self.qos = qos
+        self.sent_at = sent_at
+        self.acked_at = None
+        self.error = None
+        self.spilled = False  # handed to the outbox, to be sent again
+        self._tracker = tracker
+        self._callbacks = None
+
+    def done(self):
+        """`True` once the message has been acknowledged, has failed, or
+        has been spilled to the outbox of the transport (which sends it
+        again, with a new delivery)."""
+        return self.acked_at is not None or self.error is not None or self.spilled
+
+    @property
+    def acked(self):
+        return self.acked_at is not None
+
+    @property
+    def latency(self):
+        """Seconds from send to acknowledgement (`None` until acked)."""
+        return None if self.acked_at is None else self.acked_at - self.sent_at
+
+    def wait(self, timeout=None):
+        """Waits for the acknowledgement.
+        :return: `True` if the message was acknowledged, `False` if it
+                 failed, was spilled or the timeout expired
+        """
+        return self._tracker._wait(self.done, timeout) and self.acked_at is not None
+
+    def add_done_callback(self, fn):
+        """Calls `fn(delivery)` when the message is acknowledged or fails
+        (right away if it already is), on the thread completing it."""
+        if not self._tracker._add_callback(self, fn):
+            fn(self)
+
+
+class DeliveryTracker(object):
+    """Keeps track of the messages waiting for their acknowledgement,
+    within a window of at most `max_in_flight` of them: beyond that,
+    sending blocks until acknowledgements free up room, or raises a
+    `TransportException` (QUEUE_FULL) after `window_timeout_sec`.
+    Used by transports (see `MqttTransport`), which report when messages
+    are sent and acknowledged, identified by a key (e.g. the MQTT message
+    id).
+    """
+
+    def __init__(self, max_in_flight=100, window_timeout_sec=30.0, clock=time.perf_counter):
+        self.__max_in_flight = max_in_flight
+        self.__window_timeout_sec = window_timeout_sec
+        self.__clock = clock
+        self.__lock = threading.Condition()
+        self.__pending = {}  # key -> Delivery
+        self.__publishing = 0
+        self.__early = set()  # keys acknowledged while messages were being published
+        self.__in_flight = 0
+        self.__acked = 0
+        self.__failed = 0
+        self.__spilled = 0
+        self.__latency = Histogram()
+        self.__min = self.__max = None
+        self.__pump = None
+
+    def _attach(self, pump):
+        """Called by the transport: `pump(timeout)` handles its network
+        I/O (acknowledgements included) for up to `timeout` seconds, when
+        nothing else does it in the background; `None` otherwise."""
+        self.__pump = pump
+
+    @property
+    def in_flight(self):
+        """Number of messages waiting for their acknowledgement."""
+        return self.__in_flight
+
+    def stats(self):
+        """Returns the number of messages in flight, acknowledged, failed
+        and spilled, and the acknowledgement latency (in seconds): count, mean,
+        min, max and the buckets of its histogram (see `gv.metrics`)."""
+        with self.__lock:
+            sample = self.__latency.sample()
+            return {
+                "in_flight": self.__in_flight,
+                "acked": self.__acked,
+                "failed": self.__failed,
+                "spilled": self.__spilled,
+                "latency": {
+                    "count": sample["count"],
+                    "mean": sample["sum"] / sample["count"] if sample["count"] else None,
+                    "min": self.__min,
+                    "max": self.__max,
+                    "buckets": sample["buckets"],
+                },
+            }
+
+    def begin(self, service, qos):
+        """Takes room in the window for a new message, waiting for it if
+        needed.
+        :return: the `Delivery` of the message
+        """
+        with self.__lock:
+            if self.__in_flight < self.__max_in_flight:
+                self.__in_flight += 1
+                return Delivery(self, service, qos, self.__clock())
+        if not self._wait(lambda: self.__in_flight < self.__max_in_flight,
+                          self.__window_timeout_sec, reserve=True):
+            raise Transport.TransportException(lookup="QUEUE_FULL")
+        return Delivery(self, service, qos, self.__clock())
+
+    def track(self, delivery, publish, fail=True):
+        """Hands a message over to the network with `publish()`, which
+        returns the key identifying it (or raises an exception, which is
+        raised again and, with `fail`, marks the message as failed; without,
+        the caller reports the outcome with `failed(...)` or `spilled(...)`).
+        Acknowledgements coming in before `publish()` returns are not
+        missed."""
+        with self.__lock:
+            self.__publishing += 1
+        try:
+            key = publish()
+        except Exception as exc:
+            with self.__lock:
+                self.__publishing -= 1
+            if fail:
+                self.failed(delivery, exc)
+            raise
+        with self.__lock:
+            self.__publishing -= 1
+            early = key in self.__early
+            if not self.__publishing:
+                self.__early.clear()
+            if delivery.error is None:
+                self.__pending[key] = delivery
+        if early:
+            self.acked(key)
+
+    def acked(self, key):
+        """The message sent as `key` has been acknowledged (unknown keys
+        are ignored)."""
+        with self.__lock:
+            delivery = self.__pending.pop(key, None)
+            if delivery is None:
+                if self.__publishing:
+                    self.__early.add(key)  # maybe for a message being published
+                return
+            if delivery.done():
+                return
+            delivery.acked_at = now = self.__clock()
+            latency = now - delivery.sent_at
+            self.__latency.observe(latency)
+            self.__min = latency if self.__min is None else min(self.__min, latency)
+            self.__max = latency if self.__max is None else max(self.__max, latency)
+            self.__acked += 1
+            self.__in_flight -= 1
+            self.__lock.notify_all()
+        self.__completed(delivery)
+
+    def failed(self, delivery, error):
+        """The message could not be sent, or will not be acknowledged."""
+        with self.__lock:
+            if delivery.done():
+                return
+            delivery.error = error
+            self.__failed += 1
+            self.__in_flight -= 1
+            self.__lock.notify_all()
+        self.__completed(delivery)
+
+    def spilled(self, delivery):
+        """The message could not be sent, and has been handed to the outbox
+        of the transport instead: it is no longer in flight, nor failed."""
+        with self.__lock:
+            if delivery.done():
+                return
+            delivery.spilled = True
+            self.__spilled += 1
+            self.__in_flight -= 1
+            self.__lock.notify_all()
+        self.__completed(delivery)
+
+    def fail_all(self, error):
+        """Marks all the messages in flight as failed (e.g. when the
+        transport shuts down before their acknowledgement)."""
+        with self.__lock:
+            pending = list(self.__pending.values())
+            self.__pending.clear()
+        for delivery in pending:
+            self.failed(delivery, error)
+
+    def wait_all(self, timeout=None):
+        """Waits until no message is in flight.
+        :return: `False` if the timeout expired first
+        """
+        return self._wait(lambda: self.__in_flight == 0, timeout)
+
+    def _wait(self, predicate, timeout, reserve=False):
+        """Waits for `predicate()` to be true, handling the transport's I/O
+        meanwhile if needed (see `_attach(...)`); with `reserve`, takes
+        room in the window as soon as it is true."""
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.__lock:
+                if predicate():
+                    if reserve:
+                        self.__in_flight += 1
+                    return True
+                remaining = None if end is None else end - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                if self.__pump is None:
+                    self.__lock.wait(remaining)
+                    continue
+            self.__pump(0.01 if remaining is None else min(0.01, remaining))
+
+    def _add_callback(self, delivery, fn):
+        with self.__lock:
+            if delivery.done():
+                return False
+            if delivery._callbacks is None:
+                delivery._callbacks = []
+            delivery._callbacks.append(fn)
+            return True
+
+    def __completed(self, delivery):
+        callbacks, delivery._callbacks = delivery._callbacks, None
+        for fn in callbacks or ():
+            try:
+                fn(delivery)
+            except Exception:
+                _log.exception("Delivery callback failed for %s", delivery.service)
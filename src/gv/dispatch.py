@@ -0,0 +1,174 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Worker-pool dispatch of inbound messages to callbacks
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import collections
+import concurrent.futures
+import logging
+import threading
+
+
+_log = logging.getLogger(__name__)
+
+
+DROP_OLDEST = 'drop_oldest'  # a full queue makes room by dropping its oldest message
+DROP_NEWEST = 'drop_newest'  # messages arriving when the queue is full are dropped
+COALESCE = 'coalesce'        # only the latest message is kept: stale ones are dropped
+
+POLICIES = (DROP_OLDEST, DROP_NEWEST, COALESCE)
+
+
+class _TopicQueue(object):
+    __slots__ = ('messages', 'max_queued', 'policy', 'scheduled')
+
+    def __init__(self, max_queued, policy):
+        self.messages = collections.deque()
+        self.max_queued = max_queued
+        self.policy = policy
+        self.scheduled = False
+
+
+class Dispatcher(object):
+    """Runs the callbacks of a `Transport` on a pool of worker threads
+    (see `Transport.set_dispatcher(...)`), so that slow callbacks do not
+    hold up the thread receiving messages.
+
+    Messages for the same topic are handled one at a time, in the order
+    they arrived; different topics are handled in parallel. Each topic has
+    a queue of at most `max_queued` messages waiting: when it is full,
+    `policy` decides what is dropped (see `POLICIES`; `COALESCE` keeps
+    only the latest message, which suits actuator commands where only the
+    last one matters). Policies can be overridden for specific topics with
+    `set_policy(...)`.
+
+    A worker handles at most `burst` messages of a topic before giving the
+    other topics a chance.
+    """
+
+    def __init__(self, workers=4, max_queued=100, policy=DROP_OLDEST, burst=16):
+        if policy not in POLICIES:
+            raise ValueError("Unknown policy: %s" % policy)
+        self.__workers = workers
+        self.__max_queued = max_queued
+        self.__policy = policy
+        self.__burst = burst
+        self.__policies = {}  # topic -> (max_queued, policy)
+        self.__queues = {}    # topic -> _TopicQueue, only while messages are waiting
+        self.__lock = threading.Lock()
+        self.__executor = None
+        self.__handler = None
+        self.__dispatched = 0
+        self.__dropped = 0
+
+    @property
+    def dispatched(self):
+        """Number of messages handed over to the callbacks."""
+        return self.__dispatched
+
+    @property
+    def dropped(self):
+        """Number of messages dropped because their queue was full."""
+        return self.__dropped
+
+    @property
+    def pending(self):
+        """Number of messages waiting to be dispatched."""
+        with self.__lock:
+            return sum(len(q.messages) for q in self.__queues.values())
+
+    def _attach(self, handler):
+        """Called by the transport: `handler(topic, payload)` runs the
+        callbacks for a message."""
+        self.__handler = handler
+
+    def set_policy(self, topic, policy, max_queued=None):
+        """Overrides the queueing policy for a topic.
+        :param topic: the topic (no wildcards) of the messages
+        :param policy: one of `POLICIES`
+        :param max_queued: (opt) the size of the queue for the topic
+        """
+        if policy not in POLICIES:
+            raise ValueError("Unknown policy: %s" % policy)
+        with self.__lock:
+            self.__policies[topic] = (max_queued or self.__max_queued, policy)
+
+    def submit(self, topic, payload):
+        """Queues a message for its callbacks; never blocks."""
+        with self.__lock:
+            queue = self.__queues.get(topic)
+            if queue is None:
+                max_queued, policy = self.__policies.get(
+                    topic, (self.__max_queued, self.__policy))
+                queue = self.__queues[topic] = _TopicQueue(max_queued, policy)
+            messages = queue.messages
+            if queue.policy == COALESCE:
+                self.__dropped += len(messages)
+                messages.clear()
+            elif len(messages) >= queue.max_queued:
+                self.__dropped += 1
+                if queue.policy == DROP_NEWEST:
+                    return
+                messages.popleft()
+            messages.append(payload)
+            if not queue.scheduled:
+                queue.scheduled = True
+                self.__schedule(topic, queue)
+
+    def shutdown(self, wait=True):
+        """Stops the worker threads, after dispatching the messages
+        already queued if `wait` is `True`. The dispatcher can be used
+        again afterwards: workers are started on demand."""
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def __schedule(self, topic, queue):
+        if self.__executor is None:
+            self.__executor = concurrent.futures.ThreadPoolExecutor(
+                self.__workers, thread_name_prefix="gv-dispatch")
+        self.__executor.submit(self.__drain, topic, queue)
+
+    def __drain(self, topic, queue):
+        handler = self.__handler
+        handled = 0
+        while True:
+            with self.__lock:
+                if not queue.messages:
+                    queue.scheduled = False
+                    del self.__queues[topic]
+                    return
+                if handled >= self.__burst and self.__executor is not None:
+                    # back in line, behind the other topics
+                    self.__executor.submit(self.__drain, topic, queue)
+                    return
+                payload = queue.messages.popleft()
+                self.__dispatched += 1
+            handled += 1
+            try:
+                handler(topic, payload)
+            except Exception:
+                _log.exception("Error dispatching a message on %s", topic)
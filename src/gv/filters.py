@@ -0,0 +1,235 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Report-by-exception filters for sensor readings
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import abc
+import datetime
+import math
+import time
+
+
+def _seconds(timestamp):
+    if isinstance(timestamp, datetime.datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class ReadingFilter(metaclass=abc.ABCMeta):
+    """Decides which readings of a sensor are worth publishing.
+    One instance holds the state of one sensor: see `GVComm.set_filter(...)`.
+
+    Time is taken from the timestamps of the readings, when given, or from
+    `clock` (wall-clock seconds by default). If `max_interval` is set, a
+    reading is always published when the last one was published at least
+    `max_interval` seconds earlier (heartbeat), along with anything the
+    filter was holding back: note that this is checked when a reading
+    arrives, there is no timer.
+    """
+
+    __slots__ = ('_max_interval', '_clock', '_last_sent', '_received', '_published', '_options')
+
+    def __init__(self, max_interval=None, clock=time.time):
+        self._max_interval = max_interval
+        self._clock = clock
+        self._last_sent = None  # time of the last published reading
+        self._received = 0
+        self._published = 0
+        self._options = (0, False)
+
+    @property
+    def received(self):
+        """Number of readings offered to the filter."""
+        return self._received
+
+    @property
+    def published(self):
+        """Number of readings let through by the filter."""
+        return self._published
+
+    @property
+    def suppressed(self):
+        """Number of readings held back by the filter."""
+        return self._received - self._published
+
+    @property
+    def options(self):
+        """`(qos, retain)` the last reading was offered with, to publish
+        the readings returned by `flush()` with."""
+        return self._options
+
+    @property
+    def stats(self):
+        return {"received": self._received, "published": self._published,
+                "suppressed": self._received - self._published}
+
+    def offer(self, value, timestamp=None, qos=0, retain=False):
+        """Feeds a reading to the filter.
+        :param value: the value of the reading
+        :param timestamp: (opt) when the reading was taken
+        :param qos, retain: (opt) how the reading is to be published, kept
+                            for the readings held back (see `options`)
+        :return: the list of `(value, timestamp)` readings to publish
+                 (possibly empty, possibly including an earlier reading)
+        """
+        self._received += 1
+        self._options = (qos, retain)
+        now = self._clock() if timestamp is None else _seconds(timestamp)
+        if (self._last_sent is None or
+                (self._max_interval is not None and
+                 now - self._last_sent >= self._max_interval)):
+            readings = self._handle_flush()
+            self._restart(value, now)
+            readings.append((value, timestamp))
+        else:
+            readings = self._handle_offer(value, timestamp, now)
+        if readings:
+            self._last_sent = now
+            self._published += len(readings)
+        return readings
+
+    def flush(self):
+        """Returns the readings held back that must not be lost, e.g.
+        when shutting down (see `GVComm.flush()`)."""
+        readings = self._handle_flush()
+        self._published += len(readings)
+        return readings
+
+    def wrap(self, send):
+        """Returns a function with the signature of `SensorHandle.send`
+        that publishes the readings let through by this filter with `send`.
+        """
+        offer = self.offer
+
+        def send_filtered(value, qos=0, retain=False, timestamp=None):
+            for value, timestamp in offer(value, timestamp, qos, retain):
+                send(value, qos, retain, timestamp)
+        return send_filtered
+
+    @abc.abstractmethod
+    def _restart(self, value, now):
+        """Called when a reading is published unconditionally."""
+        pass
+
+    @abc.abstractmethod
+    def _handle_offer(self, value, timestamp, now):
+        pass
+
+    def _handle_flush(self):
+        return []
+
+
+class Deadband(ReadingFilter):
+    """Publishes a reading only when it moved away from the last published
+    one by more than `absolute` and by more than `percent` % of it (the
+    thresholds that are not `None`) and, if `min_interval` is set, at least
+    `min_interval` seconds after it. With no threshold at all (or for
+    non-numeric values) any change is published.
+    """
+
+    __slots__ = ('_absolute', '_ratio', '_min_interval', '_last')
+
+    def __init__(self, absolute=None, percent=None, min_interval=None,
+                 max_interval=None, clock=time.time):
+        ReadingFilter.__init__(self, max_interval, clock)
+        self._absolute = absolute or 0
+        self._ratio = percent / 100.0 if percent else 0
+        self._min_interval = min_interval
+        self._last = None
+
+    def _restart(self, value, now):
+        self._last = value
+
+    def _handle_offer(self, value, timestamp, now):
+        if self._min_interval is not None and now - self._last_sent < self._min_interval:
+            return []
+        last = self._last
+        try:
+            delta = abs(value - last)
+        except TypeError:
+            changed = value != last
+        else:
+            changed = (delta > self._absolute and delta > self._ratio * abs(last)
+                       if self._absolute or self._ratio else delta != 0)
+        if not changed:
+            return []
+        self._last = value
+        return [(value, timestamp)]
+
+
+class SwingingDoor(ReadingFilter):
+    """Swinging door trending compression: readings are published only
+    where needed to reconstruct the signal by linear interpolation, with
+    an error in the order of `deviation` (never more than twice it).
+
+    When a reading cannot be interpolated within `deviation`, the one
+    preceding it is published, timestamped with when it was taken (the
+    clock time, if the reading had no timestamp): values must be numbers.
+    Call `flush()` to publish the last reading held back.
+    """
+
+    __slots__ = ('_deviation', '_origin', '_held', '_upper', '_lower')
+
+    def __init__(self, deviation, max_interval=None, clock=time.time):
+        ReadingFilter.__init__(self, max_interval, clock)
+        self._deviation = deviation
+        self._origin = None  # (time, value) of the last published reading
+        self._held = None    # (value, timestamp, time) of the last reading
+        self._upper = math.inf
+        self._lower = -math.inf
+
+    def _restart(self, value, now):
+        self._origin = (now, value)
+        self._held = None
+        self._upper = math.inf
+        self._lower = -math.inf
+
+    def _handle_offer(self, value, timestamp, now):
+        readings = []
+        t0, v0 = self._origin
+        dt = now - t0
+        if dt > 0:
+            self._upper = min(self._upper, (value + self._deviation - v0) / dt)
+            self._lower = max(self._lower, (value - self._deviation - v0) / dt)
+            if self._lower > self._upper:
+                held_value, held_timestamp, held_time = self._held
+                readings.append((held_value, held_time if held_timestamp is None
+                                 else held_timestamp))
+                self._origin = (held_time, held_value)
+                dt = now - held_time
+                if dt > 0:
+                    self._upper = (value + self._deviation - held_value) / dt
+                    self._lower = (value - self._deviation - held_value) / dt
+                else:
+                    self._upper, self._lower = math.inf, -math.inf
+        self._held = (value, timestamp, now)
+        return readings
+
+    def _handle_flush(self):
+        held, self._held = self._held, None
+        if held is None:
+            return []
+        self._restart(held[0], held[2])
+        return [(held[0], held[2] if held[1] is None else held[1])]
@@ -0,0 +1,156 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Gateway mode: many logical devices over a single transport
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+from .gvlib import GVComm, TransportListener
+from .mixins import _DeviceInfo
+from .protocols import GVProtocol_v1
+
+
+class GatewayDevice(GVComm):
+    """A `GVComm` for one of the devices served by a `GVGateway`.
+    It behaves like a regular `GVComm`, except that the connection belongs
+    to the gateway: `connect()` does nothing, `poll()` only takes care of
+    batching (the gateway polls the transport for all the devices) and
+    `shutdown()` only takes this device offline, leaving the shared
+    connection open.
+    """
+
+    def __init__(self, gateway, device_info, transport, protocol):
+        GVComm.__init__(self, device_info, transport, protocol)
+        self.__gateway = gateway
+        self.__transport = transport
+        self.__topics = set()
+
+    def add_callback(self, topic, cb):
+        self.__topics.add(topic)
+        GVComm.add_callback(self, topic, cb)
+
+    def connect(self):
+        pass  # the gateway owns the connection
+
+    def poll(self):
+        self.protocol.flush_registrations()
+        self._check_batching()  # the gateway polls the transport
+
+    def shutdown(self):
+        self.__gateway.remove_device(self.device_info.id)
+
+    def _release(self):
+        """Sends pending data and drops the device's subscriptions."""
+        self.flush()
+        for topic in self.__topics:
+            self.__transport.unsubscribe(topic)
+        self.__topics.clear()
+
+
+class GVGateway(_DeviceInfo, TransportListener):
+    """Façade for a gateway serving many logical devices over one transport
+    (e.g. one MQTT connection, whose client id is the gateway's own id).
+    Each device gets its own protocol instance and its own `GatewayDevice`,
+    through which sensors, actuators and callbacks are registered as usual.
+    Inbound messages are routed to the right device by topic, and every
+    device sends its own online/offline status when the shared connection
+    goes up or down, or when the device is added to / removed from a
+    connected gateway.
+    """
+
+    def __init__(self, device_info, transport, protocol_factory=GVProtocol_v1):
+        """Constructor.
+        :param device_info: the identity of the gateway itself
+        :param transport: the transport shared by all the devices
+        :param protocol_factory: called as `protocol_factory(transport,
+                                 device_info)` to build each device's protocol
+        """
+        _DeviceInfo.__init__(self, device_info)
+        self.__transport = transport
+        self.__protocol_factory = protocol_factory
+        self.__devices = {}
+        self.__connected = False
+        transport.add_listener(self)
+
+    @property
+    def connected(self):
+        return self.__connected
+
+    @property
+    def devices(self):
+        """The ids of the devices served by this gateway."""
+        return list(self.__devices)
+
+    def device(self, id_):
+        """Returns the `GatewayDevice` for a device id (`KeyError` if
+        the device is not served by this gateway)."""
+        return self.__devices[id_]
+
+    def add_device(self, device_info, callback=None):
+        """Starts serving a new device and registers it to the IoT network.
+        :param device_info: the identity of the device
+        :param callback: the function to be called when receiving system-level
+                         communications directed to the device
+        :return: the `GatewayDevice` to use for the device
+        """
+        if device_info.id in self.__devices:
+            raise ValueError("Device already served: %s" % device_info.id)
+        protocol = self.__protocol_factory(self.__transport, device_info)
+        device = GatewayDevice(self, device_info, self.__transport, protocol)
+        self.__devices[device_info.id] = device
+        device.add_device(callback)
+        if self.__connected:
+            protocol.send_status(True)
+        return device
+
+    def remove_device(self, id_):
+        """Stops serving a device, sending its offline status first."""
+        device = self.__devices.pop(id_, None)
+        if device is None:
+            return
+        device._release()
+        if self.__connected:
+            device.protocol.send_status(False)
+        self.__transport.remove_listener(device.protocol)
+
+    def connect(self):
+        """Connects the shared transport to the IoT network."""
+        self.__transport.connect()
+
+    def poll(self):
+        """Fetches new data for all the devices."""
+        for device in self.__devices.values():
+            device.poll()
+        self.__transport.poll()
+
+    def shutdown(self):
+        """Takes all the devices offline and disconnects."""
+        for device in self.__devices.values():
+            device.flush()
+        self.__transport.shutdown()
+
+    def _after_connect(self, info):
+        self.__connected = True
+
+    def _before_disconnect(self, info):
+        self.__connected = False
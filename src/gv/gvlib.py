@@ -27,7 +27,14 @@ Main Library Module
 """
 
 import abc
+import logging
+import warnings
 from . import mixins
+from .batching import DataBatcher
+from .topics import TopicIndex
+
+
+_log = logging.getLogger(__name__)
 
 
 class DeviceInfo(object):
@@ -71,6 +78,21 @@ class Callback(object):
         pass
 
 
+class SensorHandle(object):
+    """Publish handle for a single sensor, as returned by
+    `GVComm.sensor(...)`: everything that does not depend on the reading
+    (topic, transport, encoding) is resolved once, when the handle is
+    created, so that `send(value, qos=0, retain=False, timestamp=None)`
+    only has to encode and publish.
+    """
+    __slots__ = ('id', 'topic', 'send')
+
+    def __init__(self, id_, topic, send):
+        self.id = id_
+        self.topic = topic
+        self.send = send
+
+
 class Transport(object): pass # forward declaration for type hinting in TransportListener
 
 
@@ -124,6 +146,14 @@ class TransportListener(object):
         """
         pass
 
+    def _after_reconnect(self, info: Info):
+        """Called after the connection has been re-established by
+        `Transport.reconnect()` and the subscriptions restored (right after
+        `_after_connect(...)`)
+        Fields valued in the info object: transport
+        """
+        pass
+
     def _after_subscribe(self, info: Info):
         """Called after the transport has successfully subscribed to a topic
         Fields valued in the info object: transport, topic
@@ -136,6 +166,13 @@ class TransportListener(object):
         """
         pass
 
+    def _after_callback_error(self, info: Info):
+        """Called after a callback raised an exception while handling
+        data received on a topic
+        Fields valued in the info object: transport, topic, failure_reason
+        """
+        pass
+
 
 class Transport(metaclass=abc.ABCMeta):
     """
@@ -150,15 +187,28 @@ class Transport(metaclass=abc.ABCMeta):
     after the transport may want to register as listeners *before* the
     connection is attempted. Therefore, the only way to establish a connection
     should be (so far) to call the method `connect()`.
+
+    *** MIGRATION ***
+    Subclasses used to implement `send(...)` themselves: they now implement
+    `_handle_send(...)` instead, with the same signature, and `send(...)`
+    routes messages through the scheduler, the outbox and the metrics
+    before calling it. Subclasses still overriding `send(...)` (and not
+    `_handle_send(...)`) keep working: their `send(...)` becomes their
+    `_handle_send(...)`, with a `DeprecationWarning`.
     """
 
     class TransportException(Exception):
         """Raised by methods of `Transport` when they cannot do their job."""
         ERRORS = {
             "NOT_IMPLEMENTED":
-                (-1, 'The requested method is not implemented')}
-
-        def __init__(self, code: int, reason: str, lookup: str = None):
+                (-1, 'The requested method is not implemented'),
+            "QUEUE_FULL":
+                (-2, 'The outbound queue is full'),
+            "NOT_CONNECTED":
+                (-3, 'The transport is not connected')}
+
+        def __init__(self, code: int = None, reason: str = None,
+                     lookup: str = None):
             
             if lookup:
                 code, reason = self.ERRORS[lookup]
@@ -167,10 +217,126 @@ class Transport(metaclass=abc.ABCMeta):
             self.code = code
             self.reason = reason
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        send = cls.__dict__.get('send')
+        if send is None or '_handle_send' in cls.__dict__:
+            return
+        handler = cls._handle_send
+        if handler is not Transport._handle_send and not getattr(handler, '_legacy', False):
+            return  # extends the send(...) of a transport implementing _handle_send(...)
+        warnings.warn("%s overrides send(...): implement _handle_send(...) instead"
+                      % cls.__qualname__, DeprecationWarning, stacklevel=2)
+
+        def _handle_send(self, service, payload, qos=0, retain=False):
+            return send(self, service, payload, qos, retain)
+        _handle_send._legacy = True
+        cls._handle_send = _handle_send
+        cls.send = Transport.send
+
     def __init__(self):
         """Base class constructor."""
-        self.__callbacks = {}
+        self.__callbacks = TopicIndex()
         self.__listeners = set()
+        self.__outbox = None
+        self.__dispatcher = None
+        self.__meter = None
+        self.__reconnector = None
+        self.__scheduler = None
+
+    @property
+    def outbox(self):
+        return self.__outbox
+
+    def set_outbox(self, outbox):
+        """Routes all outbound messages through a store-and-forward stage
+        (see `gv.store.Outbox`), so that messages that cannot be delivered
+        are kept and sent once the connection is (re-)established.
+        Must be called before `connect()`.
+        :param outbox: the `Outbox` to use, `None` to send directly
+        """
+        if self.__outbox:
+            self.remove_listener(self.__outbox)
+        self.__outbox = outbox
+        if outbox:
+            outbox._attach(self._handle_send)
+            self.add_listener(outbox)
+
+    @property
+    def dispatcher(self):
+        return self.__dispatcher
+
+    def set_dispatcher(self, dispatcher):
+        """Runs callbacks on a pool of worker threads (see
+        `gv.dispatch.Dispatcher`) instead of the thread receiving data.
+        :param dispatcher: the `Dispatcher` to use, `None` to run callbacks
+                           as soon as data are received
+        """
+        self.__dispatcher = dispatcher
+        if dispatcher:
+            dispatcher._attach(self._run_callbacks)
+
+    @property
+    def scheduler(self):
+        return self.__scheduler
+
+    def set_scheduler(self, scheduler):
+        """Routes all outbound messages through a scheduler (see
+        `gv.scheduler.OutboundScheduler`), which sends them by priority
+        within rate limits, before the outbox if one is set.
+        :param scheduler: the `OutboundScheduler` to use, `None` to send
+                          messages as they come
+        """
+        self.__scheduler = scheduler
+        if scheduler:
+            scheduler._attach(self.__forward)
+
+    @property
+    def reconnector(self):
+        return self.__reconnector
+
+    def set_reconnector(self, reconnector):
+        """Re-establishes the connection when it is lost or cannot be
+        established (see `gv.reconnect.Reconnector`).
+        :param reconnector: the `Reconnector` to use, `None` to stay
+                            disconnected
+        """
+        if self.__reconnector:
+            self.remove_listener(self.__reconnector)
+            self.__reconnector.stop()
+        self.__reconnector = reconnector
+        if reconnector:
+            reconnector._attach(self.reconnect)
+            self.add_listener(reconnector)
+
+    @property
+    def session_present(self):
+        """`True` if the last connection resumed a session in which the
+        other side kept the subscriptions (e.g. a persistent MQTT
+        session)."""
+        return False
+
+    @property
+    def meter(self):
+        return self.__meter
+
+    def set_metrics(self, metrics, labels=None):
+        """Measures sends, callbacks and connections of this transport
+        (see `gv.metrics`).
+        :param metrics: the `Metrics` registry to use, `None` to stop
+                        measuring
+        :param labels: (opt) dict of labels identifying this transport's
+                       metrics, besides its class name (and the id of its
+                       device, if it has one)
+        """
+        if self.__meter:
+            self.remove_listener(self.__meter)
+            self.__meter.close()
+            self.__meter = None
+        if metrics is not None:
+            from .metrics import TransportMeter
+            self.__meter = TransportMeter(metrics, self, labels)
+            self.add_listener(self.__meter)
 
     def connect(self):
         """Initiates a connection to the IoT network.
@@ -179,49 +345,134 @@ class Transport(metaclass=abc.ABCMeta):
         `TransportListener._after_connect(...)` or
         `TransportListener._after_connection_unsuccesful(...)` depending
         on the connection result."""
+        self.__connect(self._handle_connect)
+
+    def reconnect(self):
+        """Connects again, typically after the connection was lost.
+        This method delegates to the subclass' implementation of
+        `_handle_reconnect(...)`, which also restores all the subscriptions,
+        then invokes `TransportListener._after_connect(...)` and
+        `TransportListener._after_reconnect(...)`, or
+        `TransportListener._after_connection_unsuccesful(...)`.
+        :return: `True` if the connection was re-established
+        """
+        if not self.__connect(lambda: self._handle_reconnect(self.__callbacks.filters())):
+            return False
+        self._invoke_listeners(TransportListener._after_reconnect,
+                               TransportListener.Info(self))
+        return True
+
+    def __connect(self, handler):
+        meter = self.__meter
         try:
-            self._handle_connect()
-            self._invoke_listeners(TransportListener._after_connect,
-                                   TransportListener.Info(self))
+            if meter is None:
+                handler()
+            else:
+                start = meter.clock()
+                handler()
+                meter.connect_seconds.observe(meter.clock() - start)
         except Exception as exc:
             self._invoke_listeners(TransportListener._after_connection_unsuccessful,
                                    TransportListener.Info(self, failure_reason=exc))
+            return False
+        self._invoke_listeners(TransportListener._after_connect,
+                               TransportListener.Info(self))
+        return True
+
+    def _connection_lost(self, reason: Exception):
+        """To be called by subclasses when they detect that the connection
+        dropped: invokes `TransportListener._after_connection_lost(...)`.
+        :param reason: the exception describing the failure
+        """
+        self._invoke_listeners(TransportListener._after_connection_lost,
+                               TransportListener.Info(self, failure_reason=reason))
 
     def subscribe(self, topic: str, callback: Callback):
         """Subscribes to a topic with a specific callback function.
         This method delegates connection to the subclass' implementation
-        of `_handle_subscription(...)`, then invokes
-        `TransportListener._after_subscribe(...)` in case of success.
-        :param topic: the topic to subscribe to
+        of `_handle_subscription(...)` (only the first time a topic is
+        subscribed to), then invokes `TransportListener._after_subscribe(...)`
+        in case of success.
+        :param topic: the topic to subscribe to; may contain the MQTT
+               wildcards '+' (single level) and '#' (multi-level)
         :param callback: the function to call when data are received
                on the specified topic
         """
-        if topic not in self.__callbacks:
-            self.__callbacks[topic] = set()
-        self.__callbacks[topic].add(callback)
-        self._handle_subscription(topic, callback)
+        if self.__callbacks.add(topic, callback):
+            self._handle_subscription(topic, callback)
         self._invoke_listeners(TransportListener._after_subscribe,
                                TransportListener.Info(self, topic=topic))
 
+    def unsubscribe(self, topic: str, callback: Callback = None):
+        """Removes a callback (or all the callbacks) from a topic.
+        This method invokes `TransportListener._before_unsubscribe(...)`,
+        then delegates to the subclass' implementation of
+        `_handle_unsubscription(...)` if no callbacks are left for the topic.
+        :param topic: the topic as passed to `subscribe(...)`
+        :param callback: the callback to remove, `None` to remove them all
+        """
+        if topic not in self.__callbacks:
+            return
+        self._invoke_listeners(TransportListener._before_unsubscribe,
+                               TransportListener.Info(self, topic=topic))
+        if self.__callbacks.remove(topic, callback):
+            self._handle_unsubscription(topic)
+
     def shutdown(self):
         """Shuts down the connection to the IoT network.
         This method invokes `TransportListener._before_disconnect(...)`,
         then delegates to the subclass' implementation of
-        `_handle_shutdown()`.
+        `_handle_shutdown()`. Data already received are handed over to
+        their callbacks before returning.
         """
+        if self.__scheduler:
+            self.__scheduler.flush()  # before the last words of the listeners
         self._invoke_listeners(TransportListener._before_disconnect,
                                TransportListener.Info(self))
+        if self.__scheduler:
+            self.__scheduler.shutdown()
         self._handle_shutdown()
+        if self.__dispatcher:
+            self.__dispatcher.shutdown()
 
     def callback(self, topic: str, payload: bytearray):
         """Invokes the callbacks registered for a specific topic
-        subscription with the provided data.
+        subscription with the provided data, through the dispatcher
+        if one is set.
         :param topic: the topic for which to invoke callbacks
         :param payload: the data to pass to the callback chain
         """
-        s = self.__callbacks.get(topic) or self.__EMPTY_SET
-        for cb in s:
-            payload = cb(payload)
+        meter = self.__meter
+        if meter is not None:
+            meter.received.value += 1
+            meter.received_bytes.value += len(payload)
+        if self.__dispatcher:
+            self.__dispatcher.submit(topic, payload)
+        else:
+            self._run_callbacks(topic, payload)
+
+    def _run_callbacks(self, topic: str, payload: bytearray):
+        """Runs the callback chain for a topic: callbacks are called in
+        the order they were registered, each one with the value returned by
+        the previous one. A callback raising an exception is reported to
+        `TransportListener._after_callback_error(...)` and skipped: the
+        next one gets the same data it got.
+        """
+        meter = self.__meter
+        for cb in self.__callbacks.match(topic):
+            try:
+                if meter is None:
+                    payload = cb(payload)
+                else:
+                    start = meter.clock()
+                    try:
+                        payload = cb(payload)
+                    finally:
+                        meter.called(topic, cb, start)
+            except Exception as exc:
+                _log.exception("Callback failed on %s", topic)
+                self._invoke_listeners(TransportListener._after_callback_error,
+                                       TransportListener.Info(self, topic, exc))
 
     def add_listener(self, listener: TransportListener):
         """Registers a new `TransportListener` for this transport.
@@ -243,13 +494,16 @@ class Transport(metaclass=abc.ABCMeta):
         :param listener_method: the method to invoke on all listeners
         :param info: the information object to pass to the listeners
         """
-        for lst in self.__listeners:
-            listener_method(lst, info)
+        name = listener_method.__name__
+        for lst in list(self.__listeners):
+            getattr(lst, name)(info)
 
-    @abc.abstractclassmethod
     def send(self, service: str, payload: bytearray,
              qos: int = 0, retain: bool = False):
         """Sends data to a specific service.
+        This method delegates to the subclass' implementation of
+        `_handle_send(...)`, through the scheduler and the outbox if they
+        are set.
         :param service: the service to invoke on the receiver's side
         :param payload: the data to send
         :param qos: quality of service for the delivery of the message:
@@ -258,6 +512,64 @@ class Transport(metaclass=abc.ABCMeta):
                     2 = exactly once
         :param retain: `True` if the message must be retained
                        for durable subscribers, `False` otherwise
+        :return: for transports tracking deliveries, the
+                 `gv.delivery.Delivery` of a message sent with qos 1 or 2
+                 (`None` if it was queued by the scheduler or the outbox)
+        """
+        meter = self.__meter
+        if meter is None:
+            if self.__scheduler:
+                return self.__scheduler.send(service, payload, qos, retain)
+            elif self.__outbox:
+                return self.__outbox.send(service, payload, qos, retain)
+            else:
+                return self._handle_send(service, payload, qos, retain)
+        start = meter.clock()
+        try:
+            if self.__scheduler:
+                result = self.__scheduler.send(service, payload, qos, retain)
+            elif self.__outbox:
+                result = self.__outbox.send(service, payload, qos, retain)
+            else:
+                result = self._handle_send(service, payload, qos, retain)
+        except Exception:
+            meter.send_failures.value += 1
+            raise
+        meter.sent(service, payload, start)
+        return result
+
+    def wait_all(self, timeout: float = None):
+        """Waits until all the messages sent with qos 1 or 2 have been
+        acknowledged, for transports tracking deliveries (the others
+        return `True` right away).
+        :param timeout: (opt) max seconds to wait
+        :return: `False` if the timeout expired first
+        """
+        return True
+
+    def __forward(self, service, payload, qos, retain):
+        """Next stage after the scheduler."""
+        if self.__outbox:
+            return self.__outbox.send(service, payload, qos, retain)
+        return self._handle_send(service, payload, qos, retain)
+
+    def _spill(self, service: str, payload: bytearray,
+               qos: int = 0, retain: bool = False):
+        """To be called by subclasses when they fail to deliver a message
+        after `_handle_send(...)` accepted it (e.g. from a background
+        thread): the message goes to the outbox, if any, or is lost.
+        """
+        if self.__outbox:
+            self.__outbox.spill(service, payload, qos, retain)
+
+    def _handle_send(self, service: str, payload: bytearray,
+                     qos: int = 0, retain: bool = False):
+        """To be implemented by subclasses to actually send data
+        (see `send(...)`). Must raise an exception if the data could not
+        be sent: `ValueError`, `TypeError` or a `TransportException` with
+        an HTTP 4xx code when sending it again is pointless, any other
+        exception when it is worth trying again later (see
+        `gv.store.is_permanent(...)`).
         """
         raise self.TransportException(lookup="NOT_IMPLEMENTED")
     
@@ -294,7 +606,22 @@ class Transport(metaclass=abc.ABCMeta):
         """
         raise self.TransportException(lookup="NOT_IMPLEMENTED")
 
-    __EMPTY_SET = set()
+    def _handle_reconnect(self, topics):
+        """May be overridden by subclasses to connect again and restore
+        the subscriptions in one go, where the transport allows it.
+        The default implementation connects, then subscribes to each topic.
+        :param topics: the topics subscribed to
+        """
+        self._handle_connect()
+        for topic in topics:
+            self._handle_subscription(topic, None)
+
+    def _handle_unsubscription(self, topic: str):
+        """May be overridden by subclasses to handle the specific details
+        of topic unsubscription for the given transport.
+        :param topic: the topic to unsubscribe from
+        """
+        pass  # nothing to undo for transports without subscriptions
 
 
 class Protocol(metaclass=abc.ABCMeta):
@@ -303,6 +630,36 @@ class Protocol(metaclass=abc.ABCMeta):
 
     def __init__(self, transport: Transport):
         self._transport = transport
+
+    def topic(self, service: str, id_: str = None):
+        """Returns the topic of a service (a key of `SERVICES`).
+        :param service: the service name
+        :param id_: the id of the sensor or actuator, if needed
+        """
+        return self.SERVICES[service] % {
+            'device_id': self.device_info.id,
+            'sensor_id': id_, 'actuator_id': id_}
+
+    def sensor_handle(self, id_: str):
+        """Returns a `SensorHandle` to publish readings of a sensor.
+        The default implementation simply binds `send_data(...)`.
+        """
+        def send_value(value, qos=0, retain=False, timestamp=None):
+            if timestamp is None:  # as protocols written before timestamps expect
+                return self.send_data(id_, value, qos, retain)
+            return self.send_data(id_, value, qos, retain, timestamp=timestamp)
+        return SensorHandle(id_, None, send_value)
+
+    def set_metrics(self, metrics, labels=None):
+        """Measures the protocol's own work, e.g. encoding (see
+        `gv.metrics`). Nothing to measure by default."""
+        pass
+
+    def flush_registrations(self):
+        """Sends the registrations the protocol is holding back, if any
+        (e.g. to send them in a single message). Nothing is held back by
+        default."""
+        pass
         
     @abc.abstractclassmethod
     def add_device(self): pass
@@ -315,7 +672,24 @@ class Protocol(metaclass=abc.ABCMeta):
     
     @abc.abstractclassmethod
     def send_data(self, id_: str, value: str,
-                  qos: int = 0, retain: bool = False): pass
+                  qos: int = 0, retain: bool = False,
+                  timestamp=None): pass
+
+    def send_data_batch(self, readings, qos: int = 0, retain: bool = False):
+        """Sends several sensor readings at once.
+        The default implementation falls back to one `send_data(...)` call
+        per reading: protocols that define a multi-reading format should
+        override it.
+        :param readings: iterable of `(sensor_id, value)` or
+                         `(sensor_id, value, timestamp)` tuples
+        :param qos: quality of service for the delivery of the message(s)
+        :param retain: `True` if the message(s) must be retained
+        """
+        for reading in readings:
+            if len(reading) > 2 and reading[2] is not None:
+                self.send_data(reading[0], reading[1], qos, retain, timestamp=reading[2])
+            else:
+                self.send_data(reading[0], reading[1], qos, retain)
 
 
 class GVComm(mixins._DeviceInfo):
@@ -332,6 +706,17 @@ class GVComm(mixins._DeviceInfo):
         mixins._DeviceInfo.__init__(self, device_info)
         self.__transport = transport
         self.__protocol= protocol
+        self.__batcher = None
+        self.__filters = {}
+        self.__metrics = None  # (registry, labels) of the device's own gauges
+
+    @property
+    def transport(self):
+        return self.__transport
+
+    @property
+    def protocol(self):
+        return self.__protocol
 
     def add_device(self, callback: Callback = None):
         """Registers the current device to the IoT network.
@@ -341,7 +726,7 @@ class GVComm(mixins._DeviceInfo):
         """
         self.__protocol.add_device()
         if callback:
-            topic = self.__protocol.SERVICES["devices_input"] % {'device_id': self.device_info.id}
+            topic = self.__protocol.topic("devices_input")
             self.add_callback(topic, callback)
 
     def send_status(self, status: str):
@@ -367,11 +752,12 @@ class GVComm(mixins._DeviceInfo):
         :param callback: the function to call in order to receive
                          commands for the actuator
         """
-        topic = self.__protocol.SERVICES["actuators_input"] % {'device_id': self.device_info.id, 'actuator_id': id_}
+        topic = self.__protocol.topic("actuators_input", id_)
         self.__protocol.add_actuator(id_, name, type_)
         self.add_callback(topic, callback)
 
-    def send_data(self, id_: str, value: str, qos=0, retain=False):
+    def send_data(self, id_: str, value: str, qos=0, retain=False,
+                  timestamp=None):
         """
         :param id_: the id of the sensor
         :param value: the value of the reading
@@ -381,8 +767,130 @@ class GVComm(mixins._DeviceInfo):
                     2 = exactly once
         :param retain: `True` if the message must be retained
                        for durable subscribers, `False` otherwise
+        :param timestamp: (opt) when the reading was taken
+        :return: with qos 1 or 2, the `gv.delivery.Delivery` of the message
+                 if the transport tracks deliveries and the reading was
+                 sent right away (not batched, filtered or queued)
         """
-        self.__protocol.send_data(id_, value, qos, retain)
+        filter_ = self.__filters.get(id_) if self.__filters else None
+        if filter_ is None:
+            return self.__send_data(id_, value, qos, retain, timestamp)
+        for value, timestamp in filter_.offer(value, timestamp, qos, retain):
+            self.__send_data(id_, value, qos, retain, timestamp)
+
+    def __send_data(self, id_, value, qos, retain, timestamp):
+        if self.__batcher:
+            self.__batcher.add(id_, value, qos, retain, timestamp)
+        else:
+            if timestamp is None:
+                return self.__protocol.send_data(id_, value, qos, retain)
+            return self.__protocol.send_data(id_, value, qos, retain, timestamp=timestamp)
+
+    def sensor(self, id_: str):
+        """Returns a `SensorHandle`, the fastest way to publish readings
+        of a sensor in a loop: `comm.sensor("s1").send(value)`.
+        Handles publish straight away, without batching, through the
+        filter set for the sensor when the handle is created, if any.
+        :param id_: the id of the sensor
+        """
+        handle = self.__protocol.sensor_handle(id_)
+        filter_ = self.__filters.get(id_)
+        if filter_ is not None:
+            handle = SensorHandle(id_, handle.topic, filter_.wrap(handle.send))
+        return handle
+
+    def set_filter(self, id_: str, filter_):
+        """Puts a report-by-exception filter (see `gv.filters`) in front of
+        `send_data(...)` for a sensor, so that only the readings the
+        filter lets through are published.
+        :param id_: the id of the sensor
+        :param filter_: a `ReadingFilter`, used for this sensor only;
+                        `None` to remove the current one
+        """
+        old = self.__filters.pop(id_, None)
+        if old is not None:
+            qos, retain = old.options
+            for value, timestamp in old.flush():
+                self.__send_data(id_, value, qos, retain, timestamp)
+        if filter_ is not None:
+            self.__filters[id_] = filter_
+
+    def filter_stats(self):
+        """Returns a dict mapping the ids of filtered sensors to the
+        number of readings received, published and suppressed by their
+        filters."""
+        return {id_: f.stats for id_, f in self.__filters.items()}
+
+    def send_data_batch(self, readings, qos=0, retain=False):
+        """Sends several readings at once, in a single message if the
+        protocol supports it.
+        :param readings: iterable of `(sensor_id, value)` or
+                         `(sensor_id, value, timestamp)` tuples
+        :param qos: quality of service for the delivery of the message
+        :param retain: `True` if the message must be retained
+                       for durable subscribers, `False` otherwise
+        """
+        self.__protocol.send_data_batch(readings, qos, retain)
+
+    def set_metrics(self, metrics, labels=None):
+        """Measures what this device does (see `gv.metrics`): sends,
+        callbacks and connections of the transport, encoding in the
+        protocol, readings waiting in batches and held back by filters.
+        Call it before creating sensor handles, which would not see the
+        instrumented encoder otherwise.
+        :param metrics: the `Metrics` registry to use, `None` to stop
+                        measuring
+        :param labels: (opt) dict of labels identifying this device's
+                       metrics, besides its id (label "device")
+        """
+        if self.__metrics is not None:
+            old, old_labels = self.__metrics
+            old.remove("gv_batch_pending", old_labels)
+            old.remove("gv_filter_suppressed", old_labels)
+            self.__metrics = None
+        labels = dict(labels or {})
+        labels.setdefault("device", self.device_info.id)
+        self.__transport.set_metrics(metrics, labels)
+        self.__protocol.set_metrics(metrics, labels)
+        if metrics is not None:
+            metrics.gauge("gv_batch_pending", "Readings waiting in batches", labels,
+                          lambda: self.__batcher.pending if self.__batcher else 0)
+            metrics.gauge("gv_filter_suppressed", "Readings suppressed by filters", labels,
+                          lambda: sum(f.suppressed for f in self.__filters.values()))
+            self.__metrics = (metrics, labels)
+
+    def enable_batching(self, max_items=100, max_bytes=None,
+                        max_latency_sec=1.0):
+        """Makes `send_data(...)` accumulate readings and send them in
+        batches. A batch is sent as soon as any of the thresholds is reached
+        (`None` disables a threshold). The latency threshold is checked when
+        sending data and when calling `poll()`.
+        :param max_items: max number of readings in a batch
+        :param max_bytes: max (approximate) size in bytes of a batch
+        :param max_latency_sec: max time a reading can wait before being sent
+        """
+        self.disable_batching()
+        self.__batcher = DataBatcher(self.__protocol, max_items, max_bytes,
+                                     max_latency_sec)
+
+    def disable_batching(self):
+        """Sends any pending batch and goes back to one message per
+        reading."""
+        if self.__batcher:
+            self.__batcher.flush()
+        self.__batcher = None
+
+    def flush(self):
+        """Sends the registrations held back by the protocol, then the
+        readings held back by filters (with the qos and retain flag they
+        were sent with) and accumulated by batching, if any."""
+        self.__protocol.flush_registrations()
+        for id_, filter_ in self.__filters.items():
+            qos, retain = filter_.options
+            for value, timestamp in filter_.flush():
+                self.__send_data(id_, value, qos, retain, timestamp)
+        if self.__batcher:
+            self.__batcher.flush()
 
     def add_callback(self, topic, cb: Callback):
         """Registers a callback for data received on a topic.
@@ -397,12 +905,20 @@ class GVComm(mixins._DeviceInfo):
         Only needed for non-reactive transports (e.g. REST over simple
         HTTP(S)),
         """
+        self.__protocol.flush_registrations()
+        self._check_batching()
         self.__transport.poll()
 
+    def _check_batching(self):
+        """Sends the batches that have been waiting too long, if any."""
+        if self.__batcher:
+            self.__batcher.check()
+
     def connect(self):
         """Connects to the IoT network."""
         self.__transport.connect()
 
     def shutdown(self):
         """Disconnects from the IoT network."""
+        self.flush()
         self.__transport.shutdown()
@@ -0,0 +1,359 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Synthetic fleet load generator
+
+Simulates a fleet of devices, spread over several processes (each one
+multiplexing many devices on a single thread). Every device registers
+itself, its sensors and its actuators, then publishes readings at a fixed
+rate; a backend client in each process sends commands to the actuators.
+At the end, the achieved throughput, the distribution of the time spent in
+`send_data(...)`, the command round-trip and the errors are reported.
+
+    python -m gv.loadgen --transport mqtt --standin --devices 1000 \\
+        --processes 4 --sensors 5 --rate 1 --commands 50 --duration 30
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import argparse
+import collections
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+from . import GVComm, DeviceInfo, DefaultProtocol
+from .gvlib import TransportListener
+
+
+def _constant(rnd, i, t, last):
+    return 20.0
+
+
+def _random_walk(rnd, i, t, last):
+    return round((20.0 if last is None else last) + rnd.uniform(-0.5, 0.5), 2)
+
+
+def _sine(rnd, i, t, last):
+    return round(20.0 + 5.0 * math.sin(t / 60.0 + i), 2)
+
+
+def _switch(rnd, i, t, last):
+    return rnd.random() < 0.5
+
+
+PROFILES = {
+    'constant': _constant,
+    'random_walk': _random_walk,
+    'sine': _sine,
+    'switch': _switch,
+}
+
+
+class Histogram(object):
+    """Log-scale histogram of durations in seconds, mergeable across
+    processes; percentiles are accurate within the bucket width (5%)."""
+
+    GROWTH = 1.05
+    MIN = 1e-6
+
+    def __init__(self, buckets=None):
+        self.buckets = collections.Counter(buckets or {})
+
+    def add(self, seconds):
+        if seconds <= self.MIN:
+            self.buckets[0] += 1
+        else:
+            self.buckets[int(math.log(seconds / self.MIN, self.GROWTH)) + 1] += 1
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+
+    @property
+    def count(self):
+        return sum(self.buckets.values())
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the `pct` percentile, in
+        seconds; `None` if empty."""
+        total = self.count
+        if not total:
+            return None
+        rank = math.ceil(total * pct / 100.0)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return self.MIN * self.GROWTH ** bucket
+
+    def summary(self):
+        return {"count": self.count,
+                **{"p%g_ms" % p: (None if self.percentile(p) is None
+                                  else round(self.percentile(p) * 1e3, 3))
+                   for p in (50, 90, 99, 99.9)}}
+
+
+def _transport_factory(options):
+    if options.transport == 'mqtt':
+        from .transports.mqtt import MqttTransport
+        return lambda me: MqttTransport(me, options.host, options.port, loop_wait_sec=0)
+    if options.transport == 'rest':
+        from .transports.rest import RestTransport
+        return lambda me: RestTransport(me, options.host, options.port, pool_size=1)
+    from .transports.loopback import LoopbackBroker, LoopbackTransport
+    broker = LoopbackBroker()
+    return lambda me: LoopbackTransport(me, broker)
+
+
+class _Fleet(TransportListener):
+    """The devices simulated by one process."""
+
+    def __init__(self, options, index):
+        self.__options = options
+        self.__index = index
+        self.__rnd = random.Random(index)
+        self.__profile = PROFILES[options.profile]
+        self.__latency = Histogram()
+        self.__commands = Histogram()
+        self.__errors = collections.Counter()
+        self.__devices = []
+        self.__backend = None
+
+    def run(self):
+        options = self.__options
+        factory = _transport_factory(options)
+        first = options.devices * self.__index // options.processes
+        last = options.devices * (self.__index + 1) // options.processes
+        start = time.perf_counter()
+        for n in range(first, last):
+            self.__devices.append(self.__register(factory, "lg-%d" % n))
+        registration = time.perf_counter() - start
+        commands = 0
+        if options.commands and options.actuators and options.transport != 'rest':
+            commands = options.commands / options.processes
+            me = DeviceInfo("lg-backend-%d" % self.__index, "backend", options.device_ip, 0)
+            self.__backend = factory(me)
+            self.__backend.connect()
+        sent, commands_sent, elapsed = self.__publish(commands)
+        for comm in self.__devices:
+            try:
+                if self.__backend:
+                    comm.poll()  # commands still on their way
+                comm.shutdown()
+            except Exception as exc:
+                self.__errors["shutdown:" + type(exc).__name__] += 1
+        if self.__backend:
+            self.__backend.shutdown()
+        return {
+            "devices": len(self.__devices),
+            "registration_sec": registration,
+            "elapsed_sec": elapsed,
+            "readings": sent,
+            "commands_sent": commands_sent,
+            "latency": dict(self.__latency.buckets),
+            "commands": dict(self.__commands.buckets),
+            "errors": dict(self.__errors),
+        }
+
+    def __register(self, factory, id_):
+        options = self.__options
+        me = DeviceInfo(id_, id_, options.device_ip, 0)
+        transport = factory(me)
+        transport.add_listener(self)
+        comm = GVComm(me, transport, DefaultProtocol(transport, me, codec=options.codec))
+        try:
+            comm.connect()
+            comm.add_device()
+            for s in range(options.sensors):
+                comm.add_sensor("s%d" % s, "sensor %d" % s, "NUMERIC")
+            if options.transport != 'rest':
+                for a in range(options.actuators):
+                    comm.add_actuator("a%d" % a, "actuator %d" % a, "NUMERIC",
+                                      self.__on_command)
+        except Exception as exc:
+            self.__errors["register:" + type(exc).__name__] += 1
+        return comm
+
+    def _after_connection_unsuccessful(self, info):
+        self.__errors["connect:" + type(info.failure_reason).__name__] += 1
+
+    def _after_connection_lost(self, info):
+        self.__errors["connection_lost"] += 1
+
+    def __on_command(self, payload):
+        self.__commands.add(time.time() - float(payload))
+
+    def __publish(self, command_rate):
+        """Sends readings round-robin over all (device, sensor) pairs at the
+        overall configured rate, polling every device every
+        `poll_interval` seconds."""
+        options = self.__options
+        devices = self.__devices
+        pairs = [(comm, "s%d" % s) for comm in devices for s in range(options.sensors)]
+        rate = len(pairs) * options.rate
+        lasts = [None] * len(pairs)
+        tick = options.tick
+        polls_per_tick = (0 if options.transport == 'rest' else  # nothing to receive
+                          max(1, math.ceil(len(devices) * tick / options.poll_interval)))
+        sent = cursor = poll_cursor = commands_sent = 0
+        qos, profile, rnd = options.qos, self.__profile, self.__rnd
+        latency, errors, clock = self.__latency, self.__errors, time.perf_counter
+        start = clock()
+        end = start + options.duration
+        now = start
+        while now < end:
+            due = int((now - start) * rate) - sent
+            for _ in range(due):
+                comm, sensor = pairs[cursor]
+                value = profile(rnd, cursor, now, lasts[cursor])
+                lasts[cursor] = value
+                begin = clock()
+                try:
+                    comm.send_data(sensor, value, qos)
+                except Exception as exc:
+                    errors["send:" + type(exc).__name__] += 1
+                latency.add(clock() - begin)
+                cursor = (cursor + 1) % len(pairs)
+                sent += 1
+            due = int((now - start) * command_rate) - commands_sent
+            for _ in range(due):
+                target = devices[rnd.randrange(len(devices))].device_info.id
+                topic = "/devices/%s/actuators/a%d/input" % (
+                    target, rnd.randrange(options.actuators))
+                try:
+                    self.__backend.send(topic, "%.6f" % time.time(), qos)
+                except Exception as exc:
+                    errors["command:" + type(exc).__name__] += 1
+                commands_sent += 1
+            for _ in range(min(polls_per_tick, len(devices))):
+                try:
+                    devices[poll_cursor].poll()
+                except Exception as exc:
+                    errors["poll:" + type(exc).__name__] += 1
+                poll_cursor = (poll_cursor + 1) % len(devices)
+            if self.__backend:
+                self.__backend.poll()
+            now = clock()
+            if now < end and (now - start) * rate - sent < 1:
+                time.sleep(min(tick, end - now))
+                now = clock()
+        return sent, commands_sent, now - start
+
+
+def _run_fleet(args):
+    options, index = args
+    return _Fleet(options, index).run()
+
+
+def run(options):
+    """Runs the load generator.
+    :param options: the parsed command line (see `parser()`)
+    :return: the report, as a dict
+    """
+    options.processes = max(1, min(options.processes, options.devices))
+    standin = None
+    if options.standin:
+        from .standins import HttpStandIn, MqttStandIn
+        standin = HttpStandIn(keep=0) if options.transport == 'rest' else MqttStandIn()
+        standin.start()
+        options.host, options.port = standin.address
+    try:
+        if options.processes == 1:
+            results = [_run_fleet((options, 0))]
+        else:
+            with multiprocessing.Pool(options.processes) as pool:
+                results = pool.map(_run_fleet, [(options, i) for i in range(options.processes)])
+    finally:
+        if standin:
+            standin.stop()
+    latency, commands, errors = Histogram(), Histogram(), collections.Counter()
+    for result in results:
+        latency.merge(Histogram(result["latency"]))
+        commands.merge(Histogram(result["commands"]))
+        errors.update(result["errors"])
+    readings = sum(r["readings"] for r in results)
+    elapsed = max(r["elapsed_sec"] for r in results)
+    return {
+        "transport": options.transport,
+        "devices": sum(r["devices"] for r in results),
+        "processes": options.processes,
+        "registration_sec": round(max(r["registration_sec"] for r in results), 3),
+        "duration_sec": round(elapsed, 3),
+        "readings": readings,
+        "target_readings_per_sec": options.devices * options.sensors * options.rate,
+        "readings_per_sec": round(readings / elapsed, 1) if elapsed else 0,
+        "send_latency": latency.summary(),
+        "commands_sent": sum(r["commands_sent"] for r in results),
+        "commands_received": commands.count,
+        "command_latency": commands.summary(),
+        "errors": dict(errors),
+        "send_error_rate": round(sum(n for kind, n in errors.items()
+                                     if kind.startswith("send:")) / readings, 6)
+                           if readings else 0,
+    }
+
+
+def parser():
+    p = argparse.ArgumentParser(prog="python -m gv.loadgen",
+                                description="Synthetic fleet load generator")
+    p.add_argument("--transport", choices=("mqtt", "rest", "loopback"), default="mqtt")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=1883)
+    p.add_argument("--standin", action="store_true",
+                   help="run against a local stand-in server (ignores --host/--port)")
+    p.add_argument("--devices", type=int, default=100)
+    p.add_argument("--processes", type=int, default=1)
+    p.add_argument("--sensors", type=int, default=4, help="sensors per device")
+    p.add_argument("--actuators", type=int, default=1, help="actuators per device")
+    p.add_argument("--rate", type=float, default=1.0,
+                   help="readings per second of each sensor")
+    p.add_argument("--commands", type=float, default=10.0,
+                   help="actuator commands per second, over the whole fleet")
+    p.add_argument("--profile", choices=sorted(PROFILES), default="random_walk")
+    p.add_argument("--codec", default="json")
+    p.add_argument("--qos", type=int, choices=(0, 1, 2), default=0)
+    p.add_argument("--duration", type=float, default=10.0, help="seconds")
+    p.add_argument("--tick", type=float, default=0.01,
+                   help="scheduling granularity, in seconds")
+    p.add_argument("--poll-interval", type=float, default=0.1,
+                   help="max seconds between two polls of a device")
+    p.add_argument("--device-ip", default="", help="local address to bind to")
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    return p
+
+
+def main(argv=None):
+    options = parser().parse_args(argv)
+    report = run(options)
+    if options.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    for key, value in report.items():
+        print("%-26s %s" % (key, value))
+
+
+if __name__ == "__main__":
+    main()
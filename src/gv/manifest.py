@@ -0,0 +1,115 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Registration manifest: what the backend already knows about each device
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class RegistrationManifest(object):
+    """Remembers a digest of every registration message sent (device,
+    sensors, actuators, or the bulk registration of a whole device), by
+    device id and topic, so that a protocol only publishes the registrations
+    that changed since they were last sent (see `GVProtocol_v1`).
+
+    With a `path`, the manifest is kept in that JSON file across restarts.
+    It is written at most every `autosave_sec` while registrations change,
+    and by `save()`, which protocols call when the transport disconnects:
+    registrations recorded after the last save are simply sent again after
+    a crash. One manifest can be shared by many devices (e.g. all the
+    devices of a gateway).
+    """
+
+    def __init__(self, path=None, autosave_sec=5.0, clock=time.monotonic):
+        """Loads the manifest from `path`, if the file exists.
+        :param path: (opt) the file to keep the manifest in
+        :param autosave_sec: min interval between automatic saves
+        """
+        self.__path = path
+        self.__autosave_sec = autosave_sec
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__digests = {}  # device id -> {topic: digest}
+        self.__dirty = False
+        self.__saved_at = clock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as file:
+                self.__digests = json.load(file)
+
+    @property
+    def path(self):
+        return self.__path
+
+    def __len__(self):
+        """Number of registrations recorded, over all devices."""
+        return sum(len(entries) for entries in self.__digests.values())
+
+    @staticmethod
+    def digest(payload):
+        """Digest of a registration payload (bytes or str)."""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def changed(self, device_id, topic, payload):
+        """`True` unless `payload` is what was last recorded for the
+        topic."""
+        entries = self.__digests.get(device_id)
+        return entries is None or entries.get(topic) != self.digest(payload)
+
+    def record(self, device_id, topic, payload):
+        """Records that `payload` has been sent to the topic."""
+        with self.__lock:
+            self.__digests.setdefault(device_id, {})[topic] = self.digest(payload)
+            self.__dirty = True
+        if self.__path and self.__clock() - self.__saved_at >= self.__autosave_sec:
+            self.save()
+
+    def forget(self, device_id=None):
+        """Forgets the registrations of a device (of all devices if
+        `device_id` is `None`), so that they are sent again."""
+        with self.__lock:
+            if device_id is None:
+                self.__digests.clear()
+            else:
+                self.__digests.pop(device_id, None)
+            self.__dirty = True
+
+    def save(self):
+        """Writes the manifest to its file, if it changed (atomically:
+        a crash leaves the previous version in place)."""
+        with self.__lock:
+            self.__saved_at = self.__clock()
+            if not self.__path or not self.__dirty:
+                return
+            temp = self.__path + '.tmp'
+            with open(temp, 'w') as file:
+                json.dump(self.__digests, file, separators=(',', ':'))
+            os.replace(temp, self.__path)
+            self.__dirty = False
@@ -0,0 +1,332 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Metrics: counters, gauges and fixed-bucket histograms
+
+Nothing is measured unless a `Metrics` registry is set on a transport
+(`Transport.set_metrics(...)`) or on a `GVComm` (`GVComm.set_metrics(...)`,
+which also instruments the protocol's codec): until then, the only cost on
+the hot paths is a check for `None`.
+
+Updates are not locked: under heavy contention between threads, a few
+increments may occasionally be lost.
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import bisect
+import logging
+import time
+
+from .codecs import Codec
+from .gvlib import TransportListener
+
+
+_log = logging.getLogger(__name__)
+
+# seconds: from 10 us to 5 s
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005,
+                   0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Counter(object):
+    __slots__ = ('value',)
+    type = 'counter'
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def sample(self):
+        return self.value
+
+
+class Gauge(object):
+    """A value that goes up and down: either `set(...)` or, if `function`
+    is given, sampled by calling it at snapshot time."""
+    __slots__ = ('value', 'function')
+    type = 'gauge'
+
+    def __init__(self, function=None):
+        self.value = 0
+        self.function = function
+
+    def set(self, value):
+        self.value = value
+
+    def sample(self):
+        return self.function() if self.function else self.value
+
+
+class Histogram(object):
+    """Counts observations in fixed buckets (upper bounds, inclusive)."""
+    __slots__ = ('bounds', 'counts', 'sum')
+    type = 'histogram'
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def sample(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            cumulative += count
+            buckets[_format_number(bound)] = cumulative
+        return {"count": cumulative, "sum": self.sum, "buckets": buckets}
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return "%s{%s}" % (name, ",".join('%s="%s"' % (k, _label_value(v)) for k, v in labels))
+
+
+class Metrics(object):
+    """Registry of metrics, identified by name and labels.
+
+    Profiling hooks added with `add_hook(...)` are called after every send
+    and every callback as `hook(kind, topic, seconds)` (`kind` is "send" or
+    "callback"). Callbacks taking longer than `slow_callback_sec` are
+    reported to `on_slow_callback(topic, callback, seconds)` (by default,
+    a warning is logged).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, slow_callback_sec=None,
+                 on_slow_callback=None, clock=time.perf_counter):
+        self.__buckets = buckets
+        self.__families = {}  # name -> [type, help, {labels: instrument}]
+        self.hooks = []
+        self.slow_callback_sec = slow_callback_sec
+        self.on_slow_callback = on_slow_callback or self.__log_slow_callback
+        self.clock = clock
+
+    def counter(self, name, help_="", labels=None):
+        return self.__get(name, help_, labels, Counter)
+
+    def gauge(self, name, help_="", labels=None, function=None):
+        """Returns the gauge of a series, sampled by calling `function` if
+        given: a series can only be sampled by one function (see
+        `remove(...)`), a `ValueError` is raised otherwise."""
+        gauge = self.__get(name, help_, labels, Gauge)
+        if function is not None:
+            if gauge.function is not None and gauge.function != function:
+                raise ValueError("Gauge already registered: %s" % _series(
+                    name, tuple(sorted(labels.items())) if labels else ()))
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, help_="", labels=None, buckets=None):
+        return self.__get(name, help_, labels,
+                          lambda: Histogram(buckets or self.__buckets))
+
+    def remove(self, name, labels=None):
+        """Removes a series (e.g. a gauge of an object going away)."""
+        labels = tuple(sorted(labels.items())) if labels else ()
+        family = self.__families.get(name)
+        if family is not None:
+            family[2].pop(labels, None)
+            if not family[2]:
+                del self.__families[name]
+
+    def add_hook(self, hook):
+        """Adds a profiling hook: `hook(kind, topic, seconds)`."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def snapshot(self):
+        """Returns the current value of all metrics, as a dict mapping
+        series names (e.g. `gv_sends_total{transport="MqttTransport"}`) to
+        numbers, or to dicts for histograms."""
+        return {_series(name, labels): instrument.sample()
+                for name, family in list(self.__families.items())
+                for labels, instrument in list(family[2].items())}
+
+    def prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name, (type_, help_, instruments) in sorted(self.__families.items()):
+            if help_:
+                lines.append("# HELP %s %s" % (name, help_))
+            lines.append("# TYPE %s %s" % (name, type_))
+            for labels, instrument in list(instruments.items()):
+                value = instrument.sample()
+                if type_ != 'histogram':
+                    lines.append("%s %s" % (_series(name, labels), _format_number(value)))
+                    continue
+                for bound, count in value["buckets"].items():
+                    lines.append("%s %d" % (_series(name + "_bucket", labels + (("le", bound),)),
+                                            count))
+                lines.append("%s %s" % (_series(name + "_sum", labels), repr(value["sum"])))
+                lines.append("%s %d" % (_series(name + "_count", labels), value["count"]))
+        return "\n".join(lines) + "\n"
+
+    def __get(self, name, help_, labels, factory):
+        labels = tuple(sorted(labels.items())) if labels else ()
+        family = self.__families.get(name)
+        if family is None:
+            instrument = factory()
+            self.__families[name] = [instrument.type, help_, {labels: instrument}]
+            return instrument
+        instrument = family[2].get(labels)
+        if instrument is None:
+            instrument = family[2][labels] = factory()
+        return instrument
+
+    @staticmethod
+    def __log_slow_callback(topic, callback, seconds):
+        _log.warning("Slow callback %r on %s: %.3f s", callback, topic, seconds)
+
+
+class TransportMeter(TransportListener):
+    """The instruments of one transport, created by
+    `Transport.set_metrics(...)`. Lifecycle events are counted by listening
+    to the transport; sends, callbacks and connection times are measured by
+    the transport itself."""
+
+    def __init__(self, metrics: Metrics, transport, labels=None):
+        labels = dict(labels or {})
+        labels.setdefault("transport", type(transport).__name__)
+        device_info = getattr(transport, 'device_info', None)
+        if device_info is not None:
+            labels.setdefault("device", device_info.id)
+        self.labels = labels
+        m = metrics
+        self.metrics = metrics
+        self.clock = metrics.clock
+        self.sends = m.counter("gv_sends_total", "Messages sent", labels)
+        self.send_bytes = m.counter("gv_send_bytes_total", "Payload bytes sent", labels)
+        self.send_failures = m.counter("gv_send_failures_total", "Failed sends", labels)
+        self.send_seconds = m.histogram("gv_send_seconds", "Time spent sending a message", labels)
+        self.received = m.counter("gv_received_total", "Messages received", labels)
+        self.received_bytes = m.counter("gv_received_bytes_total", "Payload bytes received", labels)
+        self.callback_seconds = m.histogram("gv_callback_seconds", "Time spent in a callback",
+                                            labels)
+        self.callback_errors = m.counter("gv_callback_errors_total", "Callbacks raising", labels)
+        self.connect_seconds = m.histogram("gv_connect_seconds", "Time spent connecting", labels)
+        self.connects = m.counter("gv_connects_total", "Successful connections", labels)
+        self.connect_failures = m.counter("gv_connect_failures_total",
+                                          "Unsuccessful connections", labels)
+        self.connections_lost = m.counter("gv_connections_lost_total", "Connections lost", labels)
+        self.reconnects = m.counter("gv_reconnects_total", "Connections re-established", labels)
+        self.disconnects = m.counter("gv_disconnects_total", "Disconnections", labels)
+        m.gauge("gv_outbox_depth", "Messages waiting in the store-and-forward outbox", labels,
+                lambda: len(transport.outbox.queue) if transport.outbox else 0)
+        m.gauge("gv_scheduler_depth", "Messages waiting in the outbound scheduler", labels,
+                lambda: transport.scheduler.pending if transport.scheduler else 0)
+        m.gauge("gv_dispatch_depth", "Messages waiting for their callbacks", labels,
+                lambda: transport.dispatcher.pending if transport.dispatcher else 0)
+        if hasattr(type(transport), "queued"):
+            m.gauge("gv_send_queue_depth", "Messages waiting in the send queue", labels,
+                    lambda: transport.queued)
+
+    def close(self):
+        """Removes the gauges, which refer to the transport."""
+        for name in ("gv_outbox_depth", "gv_scheduler_depth", "gv_dispatch_depth",
+                     "gv_send_queue_depth"):
+            self.metrics.remove(name, self.labels)
+
+    def sent(self, service, payload, start):
+        elapsed = self.clock() - start
+        self.sends.value += 1
+        self.send_bytes.value += len(payload)
+        self.send_seconds.observe(elapsed)
+        for hook in self.metrics.hooks:
+            hook("send", service, elapsed)
+
+    def called(self, topic, callback, start):
+        elapsed = self.clock() - start
+        self.callback_seconds.observe(elapsed)
+        metrics = self.metrics
+        for hook in metrics.hooks:
+            hook("callback", topic, elapsed)
+        if metrics.slow_callback_sec is not None and elapsed >= metrics.slow_callback_sec:
+            metrics.on_slow_callback(topic, callback, elapsed)
+
+    def _after_connect(self, info):
+        self.connects.value += 1
+
+    def _after_connection_unsuccessful(self, info):
+        self.connect_failures.value += 1
+
+    def _after_connection_lost(self, info):
+        self.connections_lost.value += 1
+
+    def _after_reconnect(self, info):
+        self.reconnects.value += 1
+
+    def _before_disconnect(self, info):
+        self.disconnects.value += 1
+
+    def _after_callback_error(self, info):
+        self.callback_errors.value += 1
+
+
+class InstrumentedCodec(Codec):
+    """Wraps a codec, measuring encoding times and sizes."""
+
+    def __init__(self, codec: Codec, metrics: Metrics, labels=None):
+        labels = dict(labels or {})
+        labels.setdefault("codec", codec.name)
+        self.__codec = codec
+        self.__clock = metrics.clock
+        self.__seconds = metrics.histogram("gv_encode_seconds", "Time spent encoding a message",
+                                           labels)
+        self.__bytes = metrics.counter("gv_encoded_bytes_total", "Bytes produced by encoding",
+                                       labels)
+        self.name = codec.name
+        self.content_type = codec.content_type
+
+    @property
+    def codec(self):
+        return self.__codec
+
+    def encode(self, message):
+        start = self.__clock()
+        payload = self.__codec.encode(message)
+        self.__seconds.observe(self.__clock() - start)
+        self.__bytes.value += len(payload)
+        return payload
+
+    def decode(self, payload):
+        return self.__codec.decode(payload)
+
+    def array(self, values):
+        return self.__codec.array(values)
@@ -0,0 +1,108 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Bulk ingestion of NumPy arrays of sensor readings
+
+Requires NumPy, which is not needed by the rest of the library.
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import numpy as np
+
+
+STATISTICS = {
+    'min': np.minimum.reduceat,
+    'max': np.maximum.reduceat,
+    'sum': np.add.reduceat,
+}
+
+
+def downsample(values, window, timestamps=None, stats=('min', 'max', 'mean')):
+    """Aggregates consecutive windows of `window` samples (the last one
+    may be shorter), with no Python-level loop over the samples.
+    :param values: 1-D array of samples
+    :param window: number of samples per window
+    :param timestamps: (opt) 1-D array with the timestamp of each sample;
+                       each window gets the timestamp of its first sample
+    :param stats: the statistics to compute: any of 'min', 'max', 'mean',
+                  'sum', 'count'
+    :return: dict mapping each statistic (and 'ts', if timestamps were
+             given) to an array with one element per window
+    """
+    values = np.asarray(values)
+    starts = np.arange(0, len(values), window)
+    counts = np.diff(np.append(starts, len(values)))
+    result = {}
+    for stat in stats:
+        if stat == 'mean':
+            result[stat] = np.add.reduceat(values, starts, dtype=np.float64) / counts
+        elif stat == 'count':
+            result[stat] = counts
+        else:
+            result[stat] = STATISTICS[stat](values, starts)
+    if timestamps is not None:
+        result['ts'] = np.asarray(timestamps)[starts]
+    return result
+
+
+def send_array(comm, id_, values, timestamps=None, window=None,
+               stats=('min', 'max', 'mean'), max_payload=None,
+               qos=0, retain=False):
+    """Sends an array of readings of a sensor, encoded in bulk.
+    :param comm: the `GVComm` (or `AsyncGVComm`, in which case the result
+                 must be awaited) to send through
+    :param id_: the id of the sensor
+    :param values: 1-D array (or sequence) of samples
+    :param timestamps: (opt) 1-D array of the same length with the
+                       timestamp of each sample
+    :param window: (opt) aggregate windows of this many samples instead of
+                   sending every sample (see `downsample(...)`)
+    :param stats: the statistics to send for each window
+    :param max_payload: (opt) max size in bytes of each message: longer
+                        arrays are split into several messages
+    """
+    values = np.asarray(values)
+    if values.ndim != 1:
+        raise ValueError("Expected a 1-D array of samples")
+    if timestamps is not None and len(timestamps) != len(values):
+        raise ValueError("Values and timestamps differ in length")
+    if window:
+        fields = downsample(values, window, timestamps, stats)
+    else:
+        fields = {'values': values}
+        if timestamps is not None:
+            fields['ts'] = np.asarray(timestamps)
+    return comm.protocol.send_array(id_, fields, qos, retain, max_payload)
+
+
+def send_arrays(comm, arrays, timestamps=None, **kwargs):
+    """Sends arrays of readings of several sensors, one after the other.
+    :param comm: the `GVComm` to send through
+    :param arrays: dict mapping sensor ids to 1-D arrays of samples
+    :param timestamps: (opt) a single array shared by all the sensors,
+                       or a dict mapping sensor ids to arrays
+    Other keyword arguments are passed to `send_array(...)`.
+    """
+    for id_, values in arrays.items():
+        ts = timestamps.get(id_) if isinstance(timestamps, dict) else timestamps
+        send_array(comm, id_, values, ts, **kwargs)
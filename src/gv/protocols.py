@@ -26,15 +26,27 @@ Implementation of GreenVulcano protocols
 '''
 
 
-from .gvlib import Protocol, TransportListener
+import logging
+import threading
+
+from .gvlib import Protocol, SensorHandle, TransportListener
 from .mixins import _DeviceInfo
+from .aio import AsyncProtocol
+from .codecs import get_codec
+
+
+_log = logging.getLogger(__name__)
 
 
-class GVProtocol_v1(Protocol, _DeviceInfo, TransportListener):
+class _GVMessages_v1(object):
     '''
-    Version 1 of the GreenVulcano Protocol for IoT communication
+    Mixin building the topics and payloads of version 1 of the
+    GreenVulcano Protocol, shared by the synchronous and asynchronous
+    implementations. Requires the 'device_info' property.
+    Topics are rendered once and cached, since a device keeps publishing
+    to the same handful of them.
     '''
-        
+
     SERVICES = {
         'devices'  : '/devices/%(device_id)s',
         'devices_input'  : '/devices/%(device_id)s/input',
@@ -42,43 +54,381 @@ class GVProtocol_v1(Protocol, _DeviceInfo, TransportListener):
         'actuators': '/devices/%(device_id)s/actuators/%(actuator_id)s',
         'actuators_input': '/devices/%(device_id)s/actuators/%(actuator_id)s/input',
         'data'     : '/devices/%(device_id)s/sensors/%(sensor_id)s/output',
+        'data_batch': '/devices/%(device_id)s/output',
+        'registration': '/devices/%(device_id)s/registration',
         'status'   : '/devices/%(device_id)s/status'
     }
+
+    def __init__(self, codec=None):
+        """
+        :param codec: the codec used to encode the payloads, by name or as
+                      a `gv.codecs.Codec` (default: JSON)
+        """
+        self._codec = get_codec(codec)
+        self.__topics = {}
+
+    def topic(self, service, id_=None):
+        """Returns the topic of a service for the current device.
+        :param service: the service name (a key of `SERVICES`)
+        :param id_: the id of the sensor or actuator, for the services
+                    that need one
+        """
+        key = (service, id_)
+        topic = self.__topics.get(key)
+        if topic is None:
+            topic = self.__topics[key] = self.SERVICES[service] % {
+                'device_id': self.device_info.id,
+                'sensor_id': id_, 'actuator_id': id_}
+        return topic
+
+    def set_metrics(self, metrics, labels=None):
+        """Measures encoding times and sizes (see `gv.metrics`).
+        :param metrics: the `Metrics` registry to use, `None` to stop
+        :param labels: (opt) dict of labels for the encoding metrics
+        """
+        from .metrics import InstrumentedCodec
+        codec = self._codec
+        if isinstance(codec, InstrumentedCodec):
+            codec = codec.codec
+        self._codec = codec if metrics is None else InstrumentedCodec(codec, metrics, labels)
+
+    def _sensor_handle(self, id_, send):
+        """Builds the publish handle for a sensor (see
+        `Protocol.sensor_handle(...)`), publishing through `send`."""
+        topic = self.topic('data', id_)
+        encode = self._codec.encode
+
+        def send_value(value, qos=0, retain=False, timestamp=None):
+            if timestamp is None:
+                return send(topic, encode({"value": value}), qos, retain)
+            return send(topic, encode({"value": value, "ts": timestamp}), qos, retain)
+
+        return SensorHandle(id_, topic, send_value)
+
+    def _device_description(self):
+        message = {"nm": self.device_info.name, "ip": self.device_info.ip,
+                   "prt": "%d" % self.device_info.port}
+        if self._codec.name != 'json':
+            message["cd"] = self._codec.name  # tells the backend how to decode
+        return message
+
+    def _device_message(self):
+        return self.topic('devices'), self._codec.encode(self._device_description())
+
+    def _registration_message(self, device, sensors, actuators):
+        """Builds the bulk registration of the device, its sensors and
+        actuators (dicts mapping ids to `(name, type)`), sorted by id so that
+        the same description always gives the same payload:
+        {["nm":..,"ip":..,"prt":..,]"sensors":{"<id>":{"nm":..,"tp":..}},
+         "actuators":{...}}
+        """
+        message = self._device_description() if device else {}
+        message["sensors"] = {id_: {"nm": sensors[id_][0], "tp": sensors[id_][1]}
+                              for id_ in sorted(sensors)}
+        message["actuators"] = {id_: {"nm": actuators[id_][0], "tp": actuators[id_][1]}
+                                for id_ in sorted(actuators)}
+        return self.topic('registration'), self._codec.encode(message)
+
+    def _status_message(self, status):
+        if isinstance(status, bool):
+            status = status and 'true' or 'false'
+        topic = self.topic('status')
+        return topic, self._codec.encode({"status": status})
+
+    def _sensor_message(self, id_, name, type_):
+        topic = self.topic('sensors', id_)
+        return topic, self._codec.encode({"nm": name, "tp": type_})
+
+    def _actuator_message(self, id_, name, type_):
+        topic = self.topic('actuators', id_)
+        return topic, self._codec.encode({"nm": name, "tp": type_})
+
+    def _data_message(self, id_, val, timestamp=None):
+        topic = self.topic('data', id_)
+        message = {"value": val}
+        if timestamp is not None:
+            message["ts"] = timestamp
+        return topic, self._codec.encode(message)
+
+    def _array_messages(self, id_, fields, max_payload=None):
+        """Builds the messages carrying arrays of readings of a sensor:
+        {"<field>":[...], ...}, e.g. {"values":[...],"ts":[...]}.
+        All fields must have the same length. If the payload exceeds
+        `max_payload` bytes, the arrays are split into as many consecutive
+        chunks (one message each) as needed.
+        """
+        topic = self.topic('data', id_)
+        array = self._codec.array
+        encode = self._codec.encode
+        pending = [fields]
+        while pending:
+            chunk = pending.pop()
+            payload = encode({name: array(values) for name, values in chunk.items()})
+            size = len(next(iter(chunk.values())))
+            if max_payload is None or len(payload) <= max_payload or size < 2:
+                yield topic, payload
+                continue
+            # estimate how many chunks are needed, then check each of them
+            parts = min(size, -(-len(payload) // max_payload) + 1)
+            step = -(-size // parts)
+            pending.extend({name: values[start:start + step] for name, values in chunk.items()}
+                           for start in reversed(range(0, size, step)))
+
+    def _batch_message(self, readings):
+        """Readings are `(id, value)` or `(id, value, timestamp)` tuples.
+        Returns `None` when there are no readings."""
+        entries = []
+        for reading in readings:
+            entry = {"id": reading[0], "value": reading[1]}
+            if len(reading) > 2 and reading[2] is not None:
+                entry["ts"] = reading[2]
+            entries.append(entry)
+        if not entries:
+            return None
+        topic = self.topic('data_batch')
+        return topic, self._codec.encode({"data": entries})
+
+
+class GVProtocol_v1(_GVMessages_v1, Protocol, _DeviceInfo, TransportListener):
+    '''
+    Version 1 of the GreenVulcano Protocol for IoT communication
+
+    Payloads are encoded with the codec passed to the constructor (by name,
+    e.g. 'json' or 'cbor', or as a `gv.codecs.Codec`), JSON by default.
+    A reading is sent as {"value":<value>[,"ts":<timestamp>]}; arrays of
+    readings (see `send_array`) as {"values":[...][,"ts":[...]]}, or with
+    one array per statistic when downsampled ({"min":[...],"max":[...],...}).
+
+    Batches of readings (see `send_data_batch`) are sent to the
+    'data_batch' service as a single message:
+        {"data":[{"id":"<sensor_id>","value":<value>[,"ts":<timestamp>]}, ...]}
+    Backends that cannot accept this format can be served by passing
+    `batch_support=False`, in which case each reading is sent on its own.
+
+    Registrations of the device, sensors and actuators are sent again, with
+    qos 1, after the transport reconnects (see `Transport.reconnect()`),
+    unless it resumed its previous session or `replay_registrations=False`.
+
+    With a `RegistrationManifest` (see `gv.manifest`), registrations that
+    have not changed since they were last sent are not sent again, not even
+    after a restart; the others are sent with qos 1, and recorded in the
+    manifest once acknowledged (for transports tracking deliveries, see
+    `gv.delivery`) or handed over to the transport. With
+    `bulk_registration=True`, `add_device`, `add_sensor` and `add_actuator`
+    only update the description of the device, sent as a single message
+    to the 'registration' service by `flush_registrations()`: called by
+    `GVComm.poll()` and `GVComm.flush()`, on connection, and `bulk_delay_sec`
+    after the description changes while connected (unless `None`):
+        {"nm":..,"ip":..,"prt":..,"sensors":{"<id>":{"nm":..,"tp":..}, ...},
+         "actuators":{...}}
+    '''
     
-    def __init__(self, transport, device_info):
+    def __init__(self, transport, device_info, batch_support=True, codec=None,
+                 replay_registrations=True, manifest=None, bulk_registration=False,
+                 bulk_delay_sec=0.5):
         Protocol.__init__(self, transport)
         _DeviceInfo.__init__(self, device_info)
+        _GVMessages_v1.__init__(self, codec)
+        self.__batch_support = batch_support
+        self.__replay_registrations = replay_registrations
+        self.__registrations = {}  # topic -> payload, in registration order
+        self.__manifest = manifest
+        self.__bulk = bulk_registration
+        self.__bulk_device = False
+        self.__bulk_sensors = {}  # id -> (name, type)
+        self.__bulk_actuators = {}
+        self.__bulk_pending = False
+        self.__bulk_delay_sec = bulk_delay_sec
+        self.__bulk_timer = None
+        self.__bulk_lock = threading.Lock()
+        self.__connected = False
         self._transport.add_listener(self)
+
+    @property
+    def batch_support(self):
+        return self.__batch_support
+
+    @property
+    def codec(self):
+        return self._codec
+
+    @property
+    def manifest(self):
+        return self.__manifest
     
+    def sensor_handle(self, id_):
+        return self._sensor_handle(id_, self._transport.send)
+
     def add_device(self):
-        topic = self.SERVICES['devices'] %{'device_id': self.device_info.id}
-        payload = '{"nm":"%s","ip":"%s","prt":"%d"}' % (self.device_info.name, self.device_info.ip, self.device_info.port)        
-        self._transport.send(topic, payload)
+        if self.__bulk:
+            with self.__bulk_lock:
+                self.__bulk_device = True
+                self.__bulk_changed()
+        else:
+            self.__register(*self._device_message())
         
     def send_status(self, status):
-        if isinstance(status, bool):
-            status = status and 'true' or 'false'
-        payload = '{"status": "%s"}' % status
-        topic = self.SERVICES['status'] % {'device_id': self.device_info.id }
-        self._transport.send(topic, payload, 1, True)
+        self._transport.send(*self._status_message(status), qos=1, retain=True)
 
     def add_sensor(self, id_, name, type_):
-        topic = self.SERVICES['sensors'] % {'device_id': self.device_info.id, 'sensor_id': id_}
-        payload = '{"nm":"%s","tp":"%s"}' % (name, type_)
-        self._transport.send(topic, payload)
+        if self.__bulk:
+            with self.__bulk_lock:
+                self.__bulk_sensors[id_] = (name, type_)
+                self.__bulk_changed()
+        else:
+            self.__register(*self._sensor_message(id_, name, type_))
 
     def add_actuator(self, id_, name, type_):
-        topic = self.SERVICES['actuators'] % {'device_id': self.device_info.id, 'actuator_id': id_}
-        payload = '{"nm":"%s","tp":"%s"}' % (name, type_)
-        self._transport.send(topic, payload)
+        if self.__bulk:
+            with self.__bulk_lock:
+                self.__bulk_actuators[id_] = (name, type_)
+                self.__bulk_changed()
+        else:
+            self.__register(*self._actuator_message(id_, name, type_))
+
+    def flush_registrations(self):
+        """Sends the bulk registration of the device, if its description
+        changed since `flush_registrations()` was last called."""
+        with self.__bulk_lock:
+            if not self.__bulk_pending:
+                return
+            self.__bulk_pending = False
+            if self.__bulk_timer is not None:
+                self.__bulk_timer.cancel()
+                self.__bulk_timer = None
+            message = self._registration_message(
+                self.__bulk_device, self.__bulk_sensors, self.__bulk_actuators)
+        self.__register(*message)
+
+    def __bulk_changed(self):
+        """Called with the bulk lock held."""
+        self.__bulk_pending = True
+        if self.__connected and self.__bulk_delay_sec is not None and self.__bulk_timer is None:
+            self.__bulk_timer = threading.Timer(self.__bulk_delay_sec, self.__bulk_flush)
+            self.__bulk_timer.daemon = True
+            self.__bulk_timer.start()
+
+    def __bulk_flush(self):
+        try:
+            self.flush_registrations()
+        except Exception:
+            _log.exception("Failed sending the registration of %s", self.device_info.id)
+
+    def __register(self, topic, payload):
+        if self.__replay_registrations:
+            self.__registrations[topic] = payload
+        manifest = self.__manifest
+        if manifest is None:
+            self._transport.send(topic, payload)
+            return
+        device_id = self.device_info.id
+        if not manifest.changed(device_id, topic, payload):
+            return
+        delivery = self._transport.send(topic, payload, qos=1)
+        if hasattr(delivery, 'add_done_callback'):
+            delivery.add_done_callback(
+                lambda d: d.acked and manifest.record(device_id, topic, payload))
+        else:
+            manifest.record(device_id, topic, payload)
     
-    def send_data(self, id_, val, qos=0, retain=False):
-        topic = self.SERVICES['data'] % {'device_id': self.device_info.id, 'sensor_id': id_}
-        payload = '{value:"%s"}' % (str(val))
-        self._transport.send(topic, payload, qos, retain)
+    def send_data(self, id_, val, qos=0, retain=False, timestamp=None):
+        return self._transport.send(*self._data_message(id_, val, timestamp),
+                                    qos=qos, retain=retain)
+
+    def send_array(self, id_, fields, qos=0, retain=False, max_payload=None):
+        """Sends arrays of readings of a sensor (see `gv.numeric`).
+        :param id_: the id of the sensor
+        :param fields: dict of equally long arrays, e.g. `{"values": ...,
+                       "ts": ...}` or `{"min": ..., "max": ..., "ts": ...}`
+        :param max_payload: (opt) max size in bytes of each message
+        """
+        for topic, payload in self._array_messages(id_, fields, max_payload):
+            self._transport.send(topic, payload, qos=qos, retain=retain)
+
+    def send_data_batch(self, readings, qos=0, retain=False):
+        if not self.__batch_support:
+            return Protocol.send_data_batch(self, readings, qos, retain)
+        message = self._batch_message(readings)
+        if message:
+            self._transport.send(*message, qos=qos, retain=retain)
 
     def _after_connect(self, info):
+        self.__connected = True
         self.send_status(True)
+        if self.__bulk:
+            self.flush_registrations()
+
+    def _after_reconnect(self, info):
+        if info.transport.session_present:
+            return
+        for topic, payload in list(self.__registrations.items()):
+            self._transport.send(topic, payload, qos=1)
+
+    def _after_connection_lost(self, info):
+        self.__connected = False
 
     def _before_disconnect(self, info):
+        if self.__bulk:
+            self.flush_registrations()
+        self.__connected = False
         self.send_status(False)
+        if self.__manifest is not None:
+            self.__manifest.save()
+
+
+class AsyncGVProtocol_v1(_GVMessages_v1, AsyncProtocol, _DeviceInfo, TransportListener):
+    '''
+    Version 1 of the GreenVulcano Protocol for IoT communication,
+    for use with an `AsyncTransport`: same messages as `GVProtocol_v1`,
+    but every method is a coroutine.
+    '''
+
+    def __init__(self, transport, device_info, batch_support=True, codec=None):
+        AsyncProtocol.__init__(self, transport)
+        _DeviceInfo.__init__(self, device_info)
+        _GVMessages_v1.__init__(self, codec)
+        self.__batch_support = batch_support
+        self._transport.add_listener(self)
+
+    @property
+    def batch_support(self):
+        return self.__batch_support
+
+    @property
+    def codec(self):
+        return self._codec
+
+    def sensor_handle(self, id_):
+        return self._sensor_handle(id_, self._transport.send)
+
+    async def add_device(self):
+        await self._transport.send(*self._device_message())
+
+    async def send_status(self, status):
+        await self._transport.send(*self._status_message(status), qos=1, retain=True)
+
+    async def add_sensor(self, id_, name, type_):
+        await self._transport.send(*self._sensor_message(id_, name, type_))
+
+    async def add_actuator(self, id_, name, type_):
+        await self._transport.send(*self._actuator_message(id_, name, type_))
+
+    async def send_data(self, id_, val, qos=0, retain=False, timestamp=None):
+        await self._transport.send(*self._data_message(id_, val, timestamp), qos=qos, retain=retain)
+
+    async def send_array(self, id_, fields, qos=0, retain=False, max_payload=None):
+        for topic, payload in self._array_messages(id_, fields, max_payload):
+            await self._transport.send(topic, payload, qos=qos, retain=retain)
+
+    async def send_data_batch(self, readings, qos=0, retain=False):
+        if not self.__batch_support:
+            return await AsyncProtocol.send_data_batch(self, readings, qos, retain)
+        message = self._batch_message(readings)
+        if message:
+            await self._transport.send(*message, qos=qos, retain=retain)
+
+    async def _after_connect(self, info):
+        await self.send_status(True)
+
+    async def _before_disconnect(self, info):
+        await self.send_status(False)
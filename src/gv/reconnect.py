@@ -0,0 +1,146 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Automatic reconnection with exponential backoff and jitter
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import logging
+import random
+import threading
+
+from .gvlib import TransportListener
+
+
+_log = logging.getLogger(__name__)
+
+
+class Reconnector(TransportListener):
+    """Reconnects a `Transport` (see `Transport.set_reconnector`) whenever
+    its connection is lost or cannot be established, on a background
+    thread, until it succeeds or `max_attempts` attempts have failed.
+
+    Attempt n (from 0) waits a random delay between `(1 - jitter) * d` and
+    `d`, where `d = min(max_delay, initial_delay * multiplier ** n)`: with
+    the default full jitter, a fleet losing its broker at the same time
+    comes back spread over the whole delay instead of all at once.
+    `Transport.reconnect()` restores the subscriptions and notifies
+    listeners (e.g. the protocol, to replay registrations).
+    """
+
+    def __init__(self, initial_delay=1.0, max_delay=60.0, multiplier=2.0,
+                 jitter=1.0, max_attempts=None, random_=random.random):
+        """
+        :param jitter: fraction of each delay that is randomized, from 0
+                       (none) to 1 (full jitter)
+        :param max_attempts: (opt) attempts before giving up, until the
+                             next failure is reported
+        :param random_: function returning a random float in [0, 1)
+        """
+        self.__initial_delay = initial_delay
+        self.__max_delay = max_delay
+        self.__multiplier = multiplier
+        self.__jitter = jitter
+        self.__max_attempts = max_attempts
+        self.__random = random_
+        self.__reconnect = None
+        self.__lock = threading.Lock()
+        self.__stopping = threading.Event()
+        self.__thread = None
+        self.__failures = 0
+        self.__attempts = 0
+        self.__reconnections = 0
+
+    @property
+    def active(self):
+        """`True` while trying to reconnect."""
+        return self.__thread is not None
+
+    @property
+    def attempts(self):
+        """Number of reconnection attempts made so far."""
+        return self.__attempts
+
+    @property
+    def reconnections(self):
+        """Number of successful reconnections."""
+        return self.__reconnections
+
+    def delay(self, attempt):
+        """Returns the time to wait before the attempt number `attempt`
+        (from 0)."""
+        delay = min(self.__max_delay, self.__initial_delay * self.__multiplier ** attempt)
+        return delay * (1 - self.__jitter * self.__random())
+
+    def _attach(self, reconnect):
+        """Called by the transport: `reconnect()` connects again and
+        returns `True` on success."""
+        self.__reconnect = reconnect
+
+    def stop(self):
+        """Stops trying to reconnect."""
+        with self.__lock:
+            thread = self.__thread
+            self.__stopping.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _after_connection_unsuccessful(self, info):
+        self.__start()
+
+    def _after_connection_lost(self, info):
+        self.__start()
+
+    def _before_disconnect(self, info):
+        self.stop()
+
+    def __start(self):
+        with self.__lock:
+            self.__failures += 1
+            if self.__thread is not None or self.__reconnect is None:
+                return  # failures of our own attempts, or not attached
+            self.__stopping.clear()
+            self.__thread = threading.Thread(target=self.__run, name="gv-reconnect",
+                                             daemon=True)
+            self.__thread.start()
+
+    def __run(self):
+        attempt = 0
+        while not self.__stopping.wait(self.delay(attempt)):
+            attempt += 1
+            self.__attempts += 1
+            failures = self.__failures
+            connected = self.__reconnect()
+            if connected:
+                self.__reconnections += 1
+            elif self.__max_attempts and attempt >= self.__max_attempts:
+                _log.error("Giving up reconnecting after %d attempts", attempt)
+            with self.__lock:
+                if connected and self.__failures == failures:
+                    break
+                if connected:
+                    attempt = 0  # lost again while reconnecting: start over
+                elif self.__max_attempts and attempt >= self.__max_attempts:
+                    break
+        with self.__lock:
+            self.__thread = None
@@ -0,0 +1,333 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Shared-memory ring buffer of sensor readings
+
+Layout of the file (little-endian, offsets in bytes):
+    0    magic "GVRB", version, number of slots, record size (4 x u32)
+    64   head: records written so far (u64, written by the producer only)
+    72   dropped: records not written because the ring was full (u64)
+    128  tail: records read so far (u64, written by the consumer only)
+    192  the slots, each holding one record:
+         sequence number (u64, 1 for the first record written), timestamp
+         (f64, NaN if none), value (f64), sensor id (22 bytes, UTF-8,
+         NUL-padded), kind of value (u8: float, int, bool), qos (u8),
+         CRC-32 of the fields before (u32), padding (4 bytes)
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+
+_log = logging.getLogger(__name__)
+
+MAGIC = b'GVRB'
+VERSION = 2
+FLOAT, INT, BOOL = range(3)
+
+_HEADER = struct.Struct('<4sIII')
+_RECORD = struct.Struct('<Qdd22sBBI4x')
+_FIELDS = struct.Struct('<Qdd22sBB')  # the fields covered by the CRC
+_CRC = struct.Struct('<I4x')
+_HEAD, _DROPPED, _TAIL = 8, 9, 16  # indexes of the counters, as u64
+_DATA = 192
+_NAN = float('nan')
+
+
+class ReadingRing(object):
+    """Lock-free ring buffer of fixed-size reading records in a
+    memory-mapped file (e.g. under `/dev/shm`), written by exactly one
+    producer process (e.g. a sensor driver) and read by exactly one
+    consumer process (see `RingConsumer`). Neither side ever blocks: a
+    full ring makes `write(...)` return `False` and count the reading as
+    dropped.
+
+    Values are numbers or booleans (integers beyond 2**53 lose precision),
+    timestamps are floats and sensor ids take at most 22 bytes in UTF-8.
+    The counters are 8-byte aligned and only ever written by their owner,
+    after the records they cover. As stores may become visible to the other
+    process out of order (e.g. on ARM), each record carries its sequence
+    number and a CRC-32: the consumer stops at the first record not fully
+    there yet, and reads it next time.
+
+    Create the ring on the consumer side with `create(...)`, then `open(...)`
+    it in the producer.
+    """
+
+    def __init__(self, path, map_):
+        """Use `create(...)` or `open(...)`."""
+        magic, version, slots, record_size = _HEADER.unpack_from(map_, 0)
+        if magic != MAGIC or version != VERSION or record_size != _RECORD.size:
+            map_.close()
+            raise ValueError("Not a version %d reading ring: %s" % (VERSION, path))
+        self.__path = path
+        self.__map = map_
+        self.__view = memoryview(map_)
+        self.__counters = self.__view[:_DATA].cast('Q')
+        self.__slots = slots
+        self.__mask = slots - 1
+        self.__ids = {}  # sensor id -> encoded
+
+    @classmethod
+    def create(cls, path, slots=65536):
+        """Creates (or resets) the ring file.
+        :param slots: capacity, in readings (a power of two)
+        """
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError("The number of slots must be a power of two")
+        size = _DATA + slots * _RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            map_ = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        _HEADER.pack_into(map_, 0, MAGIC, VERSION, slots, _RECORD.size)
+        return cls(path, map_)
+
+    @classmethod
+    def open(cls, path):
+        """Opens a ring created by `create(...)`."""
+        fd = os.open(path, os.O_RDWR)
+        try:
+            map_ = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        return cls(path, map_)
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def capacity(self):
+        return self.__slots
+
+    @property
+    def pending(self):
+        """Number of readings written and not read yet."""
+        return self.__counters[_HEAD] - self.__counters[_TAIL]
+
+    @property
+    def dropped(self):
+        """Number of readings dropped because the ring was full."""
+        return self.__counters[_DROPPED]
+
+    def write(self, sensor_id, value, timestamp=None, qos=0):
+        """Producer side: appends a reading.
+        :return: `False` if the ring is full (the reading is dropped)
+        """
+        counters = self.__counters
+        head = counters[_HEAD]
+        if head - counters[_TAIL] >= self.__slots:
+            counters[_DROPPED] += 1
+            return False
+        encoded = self.__ids.get(sensor_id)
+        if encoded is None:
+            encoded = sensor_id.encode('utf-8')
+            if len(encoded) > 22:
+                raise ValueError("Sensor id too long for a reading ring: %s" % sensor_id)
+            self.__ids[sensor_id] = encoded
+        if value.__class__ is bool:
+            kind = BOOL
+        elif isinstance(value, int):
+            kind = INT
+        else:
+            kind = FLOAT
+        fields = _FIELDS.pack(head + 1, _NAN if timestamp is None else timestamp,
+                              value, encoded, kind, qos)
+        offset = _DATA + (head & self.__mask) * _RECORD.size
+        self.__map[offset:offset + _RECORD.size] = fields + _CRC.pack(zlib.crc32(fields))
+        counters[_HEAD] = head + 1
+        return True
+
+    def write_many(self, readings, qos=0):
+        """Producer side: appends `(sensor_id, value)` or `(sensor_id,
+        value, timestamp)` readings, stopping at the first one not fitting.
+        :return: the number of readings written
+        """
+        written = 0
+        for reading in readings:
+            if not self.write(reading[0], reading[1],
+                              reading[2] if len(reading) > 2 else None, qos):
+                break
+            written += 1
+        return written
+
+    def read(self, max_records=None):
+        """Consumer side: removes and returns the records written so far
+        (at most `max_records`), as `(timestamp, value, sensor_id, kind,
+        qos)` tuples of raw fields: see `RingConsumer` for the decoding.
+        Records written but not visible yet in full are left for later."""
+        records = self.peek(max_records)
+        self.consume(len(records))
+        return records
+
+    def peek(self, max_records=None):
+        """Consumer side: returns the records `read(...)` would return,
+        leaving them in the ring until `consume(...)` is called."""
+        counters = self.__counters
+        tail = counters[_TAIL]
+        count = counters[_HEAD] - tail
+        if max_records is not None:
+            count = min(count, max_records)
+        if count <= 0:
+            return []
+        size, view = _RECORD.size, self.__view
+        start = tail & self.__mask
+        first = min(count, self.__slots - start)
+        offset = _DATA + start * size
+        records = []
+        self.__check(records, view[offset:offset + first * size], tail + 1)
+        if first < count and len(records) == first:  # wrapped around
+            self.__check(records, view[_DATA:_DATA + (count - first) * size], tail + first + 1)
+        return records
+
+    def consume(self, count):
+        """Consumer side: removes the `count` oldest records, returned by
+        `peek(...)`, from the ring."""
+        if count:
+            self.__counters[_TAIL] += count
+
+    @staticmethod
+    def __check(records, data, seq):
+        """Appends the records in `data`, from sequence number `seq`, up to
+        the first one not fully written."""
+        checked, crc32 = _FIELDS.size, zlib.crc32
+        offset = 0
+        for record in _RECORD.iter_unpack(data):
+            if record[0] != seq or record[6] != crc32(data[offset:offset + checked]):
+                return
+            records.append(record[1:6])
+            seq += 1
+            offset += _RECORD.size
+
+    def close(self):
+        self.__counters.release()
+        self.__view.release()
+        self.__map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RingConsumer(object):
+    """Drains a `ReadingRing` into a `GVComm`, through
+    `send_data_batch(...)`: readings go to the protocol in bulk (a single
+    message per batch, if the protocol supports it), with no per-reading
+    IPC. Call `drain()` from the application's loop (e.g. next to
+    `poll()`), or `start()` a background thread doing it.
+
+    Readings leave the ring only once `send_data_batch(...)` has returned:
+    when it raises, they are sent again by the next `drain()` (delivery is
+    at least once: a batch that failed halfway may be sent in part twice).
+    """
+
+    def __init__(self, ring, comm, max_batch=1000):
+        """
+        :param ring: the `ReadingRing` to read from
+        :param comm: the `GVComm` (or `GatewayDevice`) to send readings with
+        :param max_batch: max readings per `send_data_batch(...)` call
+        """
+        self.__ring = ring
+        self.__comm = comm
+        self.__max_batch = max_batch
+        self.__ids = {}  # raw sensor id -> str
+        self.__consumed = 0
+        self.__thread = None
+        self.__stop = threading.Event()
+
+    @property
+    def consumed(self):
+        """Number of readings sent so far."""
+        return self.__consumed
+
+    def drain(self):
+        """Sends the readings waiting in the ring.
+        :return: the number of readings sent
+        """
+        ring, ids, send = self.__ring, self.__ids, self.__comm.send_data_batch
+        sent = 0
+        try:
+            while True:
+                records = ring.peek(self.__max_batch)
+                if not records:
+                    break
+                readings = []
+                qos = records[0][4]
+                for timestamp, value, raw_id, kind, record_qos in records:
+                    if record_qos != qos:
+                        send(readings, qos)
+                        ring.consume(len(readings))
+                        sent += len(readings)
+                        readings, qos = [], record_qos
+                    id_ = ids.get(raw_id)
+                    if id_ is None:
+                        id_ = ids[raw_id] = raw_id.rstrip(b'\0').decode('utf-8')
+                    if kind == INT:
+                        value = int(value)
+                    elif kind == BOOL:
+                        value = value != 0.0
+                    readings.append((id_, value) if timestamp != timestamp
+                                    else (id_, value, timestamp))
+                send(readings, qos)
+                ring.consume(len(readings))
+                sent += len(readings)
+        finally:
+            self.__consumed += sent
+        return sent
+
+    def start(self, idle_sec=0.001):
+        """Drains the ring on a background thread, sleeping `idle_sec`
+        whenever it is empty."""
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__loop, args=(idle_sec,),
+                                         name="gv-ring", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stops the background thread, after a last `drain()`."""
+        thread, self.__thread = self.__thread, None
+        if thread is not None:
+            self.__stop.set()
+            thread.join()
+        self.drain()
+
+    def __loop(self, idle_sec):
+        while not self.__stop.is_set():
+            try:
+                if not self.drain():
+                    self.__stop.wait(idle_sec)
+            except Exception:
+                _log.exception("Failed draining the reading ring %s", self.__ring.path)
+                self.__stop.wait(idle_sec)
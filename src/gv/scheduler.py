@@ -0,0 +1,361 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Outbound scheduling: priority lanes and rate limits
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import collections
+import logging
+import threading
+import time
+
+from .gvlib import Transport
+from .topics import TopicIndex
+
+
+_log = logging.getLogger(__name__)
+
+# lanes, from the highest priority to the lowest
+CONTROL, REGISTRATION, TELEMETRY = range(3)
+LANES = ("control", "registration", "telemetry")
+
+
+def classify_gv_v1(service):
+    """Lane and device of a topic of the GreenVulcano protocol, version 1:
+    device status is control traffic, readings are telemetry, everything
+    else about a device is registration. Other topics are telemetry.
+    :return: `(lane, device id or None)`
+    """
+    levels = service.split('/')
+    if len(levels) < 3 or levels[1] != 'devices':
+        return TELEMETRY, None
+    device = levels[2]
+    if len(levels) == 4 and levels[3] == 'status':
+        return CONTROL, device
+    if levels[-1] == 'output':
+        return TELEMETRY, device
+    return REGISTRATION, device
+
+
+class TokenBucket(object):
+    """Allows `rate` units per second on average, with bursts of up to
+    `burst` units. A request larger than the burst is let through when
+    the bucket is full, leaving it in debt."""
+    __slots__ = ('rate', 'burst', 'tokens', 'stamp')
+
+    def __init__(self, rate, burst=None, now=0.0):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst
+        self.stamp = now
+
+    def delay(self, amount, now):
+        """Seconds to wait before `amount` units are available (0 if they
+        are available now)."""
+        tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.tokens, self.stamp = tokens, now
+        missing = min(amount, self.burst) - tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount):
+        """Consumes `amount` units (after `delay(...)` returned 0)."""
+        self.tokens -= amount
+
+
+def _size(payload):
+    """Size of a payload in bytes, as sent (`str` payloads in UTF-8)."""
+    if isinstance(payload, str) and not payload.isascii():
+        return len(payload.encode('utf-8'))
+    return len(payload)
+
+
+def _bucket(limit, now):
+    if limit is None:
+        return None
+    if isinstance(limit, tuple):
+        return TokenBucket(limit[0], limit[1], now)
+    return TokenBucket(limit, None, now)
+
+
+class _Lane(object):
+    __slots__ = ('bucket', 'queues', 'order', 'count', 'busy', 'sent', 'failed', 'rejected')
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.queues = {}  # device -> deque of messages
+        self.order = collections.deque()  # devices with queued messages, round-robin
+        self.count = 0
+        self.busy = 0  # messages taken from the queues, being sent
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+
+
+class OutboundScheduler(object):
+    """Outbound stage of a `Transport` (see `Transport.set_scheduler`)
+    giving priority to control messages (device status) over registrations,
+    and to registrations over telemetry, within rate limits.
+
+    Each message is put in a lane by `classify(service)` (by default,
+    `classify_gv_v1`), unless its topic matches a filter given to
+    `set_lane(...)`. Limits are token buckets, given as a rate or as a
+    `(rate, burst)` tuple: per lane and per device (in messages per
+    second; control messages are only subject to their lane's limit) and
+    for the whole uplink, in payload bytes per second.
+
+    Messages are sent straight away, in the caller's thread, while their
+    lane and the lanes above it have nothing queued and the limits allow
+    it; otherwise they are queued and sent by a background thread, higher
+    lanes first and devices of the same lane in turn, keeping the order of
+    the messages of each device in each lane. When a lane already holds
+    `max_queued` messages, `send(...)` raises a `TransportException`
+    (QUEUE_FULL): callers can back off, or drop the message. The next
+    stage is always called without holding the scheduler's lock: a send
+    blocking there (e.g. waiting for room in an in-flight window) holds
+    up no other lane.
+    """
+
+    def __init__(self, rates=None, device_rate=None, max_bytes_per_sec=None,
+                 max_queued=1000, classify=classify_gv_v1, clock=time.monotonic):
+        """
+        :param rates: (opt) dict mapping lanes to their limits
+        :param device_rate: (opt) limit of each device, over registration
+                            and telemetry
+        :param max_bytes_per_sec: (opt) limit of the whole uplink
+        :param max_queued: max number of messages waiting in each lane
+        """
+        now = clock()
+        rates = rates or {}
+        self.__lanes = [_Lane(_bucket(rates.get(lane), now)) for lane in range(len(LANES))]
+        self.__device_rate = device_rate
+        self.__devices = {}  # device -> TokenBucket
+        self.__uplink = _bucket(max_bytes_per_sec, now)
+        self.__max_queued = max_queued
+        self.__classify = classify
+        self.__clock = clock
+        self.__overrides = TopicIndex()
+        self.__classes = {}  # service -> (lane, device)
+        self.__handler = None
+        self.__lock = threading.Condition()
+        self.__drainer = None
+
+    @property
+    def pending(self):
+        """Number of queued messages, over all lanes."""
+        return sum(lane.count for lane in self.__lanes)
+
+    @property
+    def failed(self):
+        """Number of messages the next stage failed to send, over all
+        lanes."""
+        return sum(lane.failed for lane in self.__lanes)
+
+    def stats(self):
+        """Returns a dict mapping lane names to the number of messages
+        sent, failed (the next stage raised an exception), queued and
+        rejected (queue full)."""
+        return {LANES[i]: {"sent": lane.sent, "failed": lane.failed, "queued": lane.count,
+                           "rejected": lane.rejected}
+                for i, lane in enumerate(self.__lanes)}
+
+    def set_lane(self, topic_filter, lane):
+        """Puts the messages sent to topics matching `topic_filter` in
+        `lane` (e.g. actuator acknowledgements in `CONTROL`)."""
+        with self.__lock:
+            self.__overrides.remove(topic_filter)
+            self.__overrides.add(topic_filter, lane)
+            self.__classes.clear()
+
+    def _attach(self, handler):
+        """Called by the transport: `handler` actually sends a message."""
+        self.__handler = handler
+
+    def send(self, service, payload, qos=0, retain=False):
+        """Sends a message now, or queues it if its lane is behind or
+        over its limits.
+        :return: what the next stage returned, `None` if the message was
+                 queued"""
+        lane_id, device = self.__class_of(service)
+        size = _size(payload)
+        with self.__lock:
+            lane = self.__lanes[lane_id]
+            direct = (not any(self.__lanes[i].count or self.__lanes[i].busy
+                              for i in range(lane_id + 1))
+                      and self.__ready(lane_id, lane, device, size, self.__clock()) == 0)
+            if direct:
+                lane.busy += 1
+            else:
+                self.__queue(lane, (device, service, payload, qos, retain, size))
+        if not direct:
+            return None
+        try:
+            result = self.__handler(service, payload, qos, retain)
+        except Exception:
+            with self.__lock:
+                lane.busy -= 1
+                lane.failed += 1
+            raise
+        with self.__lock:
+            lane.busy -= 1
+            lane.sent += 1
+        return result
+
+    def __queue(self, lane, message):
+        if lane.count >= self.__max_queued:
+            lane.rejected += 1
+            raise Transport.TransportException(lookup="QUEUE_FULL")
+        device = message[0]
+        queue = lane.queues.get(device)
+        if queue is None:
+            queue = lane.queues[device] = collections.deque()
+            lane.order.append(device)
+        queue.append(message)
+        lane.count += 1
+        if self.__drainer is None:
+            self.__drainer = threading.Thread(target=self.__drain_loop,
+                                              name="gv-scheduler", daemon=True)
+            self.__drainer.start()
+        self.__lock.notify()
+
+    def flush(self):
+        """Sends all queued messages now, regardless of the limits."""
+        with self.__lock:
+            taken = []
+            for lane in self.__lanes:
+                while lane.order:
+                    device = lane.order.popleft()
+                    for message in lane.queues.pop(device):
+                        lane.count -= 1
+                        lane.busy += 1
+                        taken.append((lane, message))
+        for lane, message in taken:
+            self.__deliver(lane, message)
+
+    def shutdown(self):
+        """Sends all queued messages (see `flush()`) and stops the
+        background thread. Called by `Transport.shutdown()`."""
+        with self.__lock:
+            drainer, self.__drainer = self.__drainer, None
+            self.__lock.notify()
+        if drainer is not None and drainer is not threading.current_thread():
+            drainer.join()
+        self.flush()
+
+    def __class_of(self, service):
+        cls = self.__classes.get(service)
+        if cls is None:
+            cls = self.__classify(service)
+            lanes = self.__overrides.match(service) if len(self.__overrides) else ()
+            if lanes:
+                cls = (lanes[0], cls[1])
+            if len(self.__classes) >= 4096:
+                self.__classes.clear()
+            self.__classes[service] = cls
+        return cls
+
+    def __ready(self, lane_id, lane, device, size, now):
+        """Seconds to wait before a message can be sent (0: take the
+        tokens, it can be sent now)."""
+        wait = lane.bucket.delay(1, now) if lane.bucket else 0.0
+        bucket = None
+        if self.__device_rate is not None and lane_id != CONTROL and device is not None:
+            bucket = self.__devices.get(device)
+            if bucket is None:
+                bucket = self.__devices[device] = _bucket(self.__device_rate, now)
+            wait = max(wait, bucket.delay(1, now))
+        if self.__uplink:
+            wait = max(wait, self.__uplink.delay(size, now))
+        if wait == 0:
+            if lane.bucket:
+                lane.bucket.take(1)
+            if bucket:
+                bucket.take(1)
+            if self.__uplink:
+                self.__uplink.take(size)
+        return wait
+
+    def __deliver(self, lane, message):
+        """Sends a message taken from a queue (counted in `lane.busy`),
+        without holding the lock."""
+        try:
+            self.__handler(*message[1:5])
+        except Exception:
+            _log.exception("Failed sending a scheduled message to %s", message[1])
+            sent = False
+        else:
+            sent = True
+        with self.__lock:
+            lane.busy -= 1
+            if sent:
+                lane.sent += 1
+            else:
+                lane.failed += 1
+
+    def __next(self, now):
+        """Takes the next message that can be sent from its queue.
+        :return: `(0, lane, message)` if there is one, else `(seconds to
+                 wait, None, None)` (`None` seconds: nothing is queued)"""
+        wait = None
+        uplink = self.__uplink
+        for lane_id, lane in enumerate(self.__lanes):
+            if not lane.count:
+                continue
+            delay = lane.bucket.delay(1, now) if lane.bucket else 0.0
+            if delay:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            starved = False
+            for _ in range(len(lane.order)):
+                device = lane.order[0]
+                queue = lane.queues[device]
+                size = queue[0][5]
+                delay = self.__ready(lane_id, lane, device, size, now)
+                if delay == 0:
+                    message = queue.popleft()
+                    lane.count -= 1
+                    lane.busy += 1
+                    if queue:
+                        lane.order.rotate(-1)
+                    else:
+                        lane.order.popleft()
+                        del lane.queues[device]
+                    return 0, lane, message
+                wait = delay if wait is None else min(wait, delay)
+                starved = starved or (uplink is not None and uplink.delay(size, now) > 0)
+                lane.order.rotate(-1)
+            if starved:
+                break  # lower lanes must not take the uplink this lane waits for
+        return wait, None, None
+
+    def __drain_loop(self):
+        me = threading.current_thread()
+        while True:
+            with self.__lock:
+                if self.__drainer is not me:
+                    return
+                wait, lane, message = self.__next(self.__clock())
+                if message is None:
+                    self.__lock.wait(wait)
+                    continue
+            self.__deliver(lane, message)
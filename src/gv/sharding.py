@@ -0,0 +1,520 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Sharded gateway: the devices of a gateway spread over worker processes
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import functools
+import logging
+import multiprocessing
+import queue
+import time
+import zlib
+
+from .gateway import GVGateway
+from .gvlib import DeviceInfo, Transport, TransportListener
+from .mixins import _DeviceInfo
+from .protocols import GVProtocol_v1
+from .transports import create_transport
+
+
+_log = logging.getLogger(__name__)
+
+
+def shard_of(device_id, shards):
+    """The shard serving a device: stable across processes and runs
+    (unlike `hash(...)`)."""
+    return zlib.crc32(device_id.encode('utf-8')) % shards
+
+
+class ShardDevice(_DeviceInfo):
+    """Handle on a device served by a `ShardedGateway`, with the same
+    methods as a `GatewayDevice`: every call is forwarded to the worker
+    process serving the device. Callbacks run in the supervisor, from
+    `ShardedGateway.poll()`.
+    """
+
+    def __init__(self, gateway, shard, device_info):
+        _DeviceInfo.__init__(self, device_info)
+        self.__gateway = gateway
+        self.__shard = shard
+        self.__id = device_info.id
+
+    @property
+    def shard(self):
+        return self.__shard
+
+    def add_sensor(self, id_: str, name: str, type_: str):
+        """Registers a new sensing capability for this device."""
+        self.__gateway._register(self.__shard, self.__id, ('sensor', self.__id, id_, name, type_))
+
+    def add_actuator(self, id_: str, name: str, type_: str, callback):
+        """Registers a new actuator for this device: `callback` is called
+        with the commands received for it."""
+        self.__gateway._set_callback(self.__id, id_, callback)
+        self.__gateway._register(self.__shard, self.__id,
+                                 ('actuator', self.__id, id_, name, type_))
+
+    def send_data(self, id_: str, value, qos=0, retain=False, timestamp=None):
+        """Sends a sensor reading. See `GVComm.send_data(...)`."""
+        self.__gateway._queue(self.__shard,
+                              ('data', self.__id, id_, value, qos, retain, timestamp))
+
+    def send_data_batch(self, readings, qos=0, retain=False):
+        """Sends several readings at once. See `GVComm.send_data_batch(...)`."""
+        self.__gateway._queue(self.__shard, ('batch', self.__id, list(readings), qos, retain))
+
+    def send_status(self, status):
+        """Sends the status of this device."""
+        self.__gateway._queue(self.__shard, ('status', self.__id, status))
+
+    def shutdown(self):
+        self.__gateway.remove_device(self.__id)
+
+
+class _Worker(object):
+    """Supervisor-side state of a shard."""
+
+    def __init__(self, index):
+        self.index = index
+        self.process = None
+        self.commands = None  # writing end of the command pipe
+        self.events = None
+        self.outgoing = []
+        self.registrations = {}  # device id -> registration commands, in order
+        self.restarts = 0
+        self.sent = 0
+        self.dropped = 0
+        self.report = {}
+        self.reported_at = None
+        self.synced = 0
+
+
+class ShardedGateway(_DeviceInfo):
+    """Façade of a gateway whose devices are spread over `shards` worker
+    processes, each running a `GVGateway` with its own transport, so that
+    encoding, topic rendering and callback dispatch use as many cores as
+    there are shards. Each device is served by the shard given by
+    `shard_of(...)`; each shard connects with its own identity, the
+    gateway's id followed by `-<shard>` (e.g. its MQTT client id).
+
+    Calls on the `ShardDevice` objects are queued and sent to their shard
+    in batches of `batch_size` commands (one pickle and one write for the
+    whole batch), and by `flush()` and `poll()`, which must be called
+    regularly: it also delivers actuator commands to their callbacks,
+    relays the transport events of the shards to the listeners added with
+    `add_listener(...)` (with `info.transport` set to `None` and the shard
+    index in `info.shard`) and restarts the workers that died, registering
+    their devices again. Readings that a worker had not processed yet when
+    it died are lost.
+    """
+
+    def __init__(self, device_info, transport, shards=None, protocol_factory=GVProtocol_v1,
+                 transport_args=(), transport_kwargs=None, batch_size=256,
+                 health_interval_sec=1.0, hang_timeout_sec=60.0, restart=True,
+                 mp_context=None):
+        """Constructor: the workers are started by `connect()`.
+        :param device_info: the identity of the gateway itself
+        :param transport: the name of a transport (see `gv.transports`),
+                          built in each worker as `create_transport(transport,
+                          shard_info, *transport_args, **transport_kwargs)`,
+                          or a picklable callable returning a transport for
+                          the `DeviceInfo` of a shard
+        :param shards: number of worker processes (default: one per CPU)
+        :param protocol_factory: picklable, see `GVGateway`
+        :param health_interval_sec: how often each worker reports its state
+        :param hang_timeout_sec: a worker not reporting for this long is
+                                 killed (and restarted)
+        :param restart: `False` not to restart the workers that die
+        :param mp_context: (opt) the `multiprocessing` context to use
+        """
+        _DeviceInfo.__init__(self, device_info)
+        self.__spec = (device_info, transport, tuple(transport_args),
+                       dict(transport_kwargs or {}), protocol_factory, health_interval_sec)
+        self.__workers = [_Worker(i) for i in range(shards or multiprocessing.cpu_count())]
+        self.__batch_size = batch_size
+        self.__hang_timeout_sec = hang_timeout_sec
+        self.__restart = restart
+        self.__context = mp_context or multiprocessing.get_context()
+        self.__devices = {}
+        self.__callbacks = {}  # (device id, actuator id or None) -> callback
+        self.__listeners = set()
+        self.__running = False
+
+    @property
+    def shards(self):
+        return len(self.__workers)
+
+    @property
+    def devices(self):
+        """The ids of the devices served by this gateway."""
+        return list(self.__devices)
+
+    def device(self, id_):
+        """Returns the `ShardDevice` for a device id (`KeyError` if
+        the device is not served by this gateway)."""
+        return self.__devices[id_]
+
+    def add_listener(self, listener: TransportListener):
+        """Registers a `TransportListener` for the events of all the
+        shards' transports."""
+        self.__listeners.add(listener)
+
+    def remove_listener(self, listener: TransportListener):
+        self.__listeners.remove(listener)
+
+    def add_device(self, device_info, callback=None):
+        """Starts serving a new device and registers it to the IoT network.
+        See `GVGateway.add_device(...)`.
+        :return: the `ShardDevice` to use for the device
+        """
+        if device_info.id in self.__devices:
+            raise ValueError("Device already served: %s" % device_info.id)
+        shard = shard_of(device_info.id, len(self.__workers))
+        device = self.__devices[device_info.id] = ShardDevice(self, shard, device_info)
+        if callback:
+            self._set_callback(device_info.id, None, callback)
+        self._register(shard, device_info.id, ('device', device_info, callback is not None))
+        return device
+
+    def remove_device(self, id_):
+        """Stops serving a device, sending its offline status first."""
+        device = self.__devices.pop(id_, None)
+        if device is None:
+            return
+        worker = self.__workers[device.shard]
+        worker.registrations.pop(id_, None)
+        for key in [key for key in self.__callbacks if key[0] == id_]:
+            del self.__callbacks[key]
+        self._queue(device.shard, ('remove', id_))
+
+    def connect(self):
+        """Starts the workers, which connect their transports."""
+        self.__running = True
+        for worker in self.__workers:
+            self.__start(worker)
+
+    def flush(self):
+        """Sends the queued commands to the workers."""
+        for worker in self.__workers:
+            if worker.outgoing:
+                self.__send(worker)
+
+    def poll(self):
+        """Sends the queued commands, runs the callbacks of the commands
+        received, relays the events of the shards and restarts the
+        workers that died or hung."""
+        self.flush()
+        for worker in self.__workers:
+            self.__receive(worker)
+        if self.__running:
+            now = time.monotonic()
+            for worker in self.__workers:
+                if worker.commands is None:
+                    continue  # dead, not restarted
+                if not worker.process.is_alive():
+                    self.__died(worker, "exited with code %s" % worker.process.exitcode)
+                elif (self.__hang_timeout_sec is not None
+                        and now - worker.reported_at > self.__hang_timeout_sec):
+                    worker.process.kill()
+                    worker.process.join()
+                    self.__died(worker, "killed after not reporting for %.0f s"
+                                % (now - worker.reported_at))
+
+    def sync(self, timeout=None):
+        """Waits until the workers have processed all the commands sent
+        so far, polling meanwhile.
+        :return: `False` on timeout
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        tokens = {}
+        for worker in self.__workers:
+            worker.synced += 1
+            tokens[worker.index] = worker.synced
+            self._queue(worker.index, ('sync', worker.synced))
+        while True:
+            self.poll()
+            if all(self.__workers[i].report.get('synced', 0) >= token
+                   for i, token in tokens.items()):
+                return True
+            if end is not None and time.monotonic() >= end:
+                return False
+            time.sleep(0.001)
+
+    def health(self):
+        """Returns the state of each shard, as a list of dicts: process id,
+        whether it is alive and connected, restarts, devices, commands sent
+        and dropped (the worker was dead), plus the counters of its last
+        report (readings and commands processed, errors) and its age."""
+        now = time.monotonic()
+        result = []
+        for worker in self.__workers:
+            process = worker.process
+            result.append({
+                "shard": worker.index,
+                "pid": process.pid if process else None,
+                "alive": bool(process and process.is_alive()),
+                "restarts": worker.restarts,
+                "devices": len(worker.registrations),
+                "sent": worker.sent,
+                "dropped": worker.dropped,
+                **worker.report,
+                "report_age_sec": (None if worker.reported_at is None
+                                   else round(now - worker.reported_at, 3)),
+            })
+        return result
+
+    def shutdown(self, timeout=10.0):
+        """Takes all the devices offline, disconnects and stops the
+        workers (killing those still running after `timeout`)."""
+        self.__running = False
+        for worker in self.__workers:
+            worker.outgoing.append(None)
+            self.__send(worker)
+        end = time.monotonic() + timeout
+        for worker in self.__workers:
+            if worker.process is None:
+                continue
+            while worker.process.is_alive() and time.monotonic() < end:
+                self.__receive(worker)
+                worker.process.join(0.01)
+            if worker.process.is_alive():
+                _log.warning("Shard %d did not stop, killing it", worker.index)
+                worker.process.kill()
+            worker.process.join()
+            self.__receive(worker)
+            if worker.commands is not None:  # else, closed when it died
+                worker.commands.close()
+
+    def _set_callback(self, device_id, actuator_id, callback):
+        self.__callbacks[(device_id, actuator_id)] = callback
+
+    def _register(self, shard, device_id, command):
+        """Queues a registration, recording it for the worker restarts."""
+        self.__workers[shard].registrations.setdefault(device_id, []).append(command)
+        self._queue(shard, command)
+
+    def _queue(self, shard, command):
+        worker = self.__workers[shard]
+        worker.outgoing.append(command)
+        if len(worker.outgoing) >= self.__batch_size:
+            self.__send(worker)
+
+    def __send(self, worker):
+        if worker.commands is None:
+            if self.__running:  # dead, not restarted
+                worker.dropped += len(worker.outgoing)
+                worker.outgoing = []
+            return  # else sent when the worker starts
+        batch, worker.outgoing = worker.outgoing, []
+        try:
+            worker.commands.send(batch)
+            worker.sent += len(batch)
+        except (OSError, ValueError):
+            worker.dropped += len(batch)  # dead worker, restarted by poll()
+
+    def __start(self, worker):
+        receiver, worker.commands = self.__context.Pipe(duplex=False)
+        worker.events = self.__context.Queue()
+        worker.process = self.__context.Process(
+            target=_run_shard, args=(worker.index, self.__spec, receiver, worker.events),
+            name="gv-shard-%d" % worker.index, daemon=True)
+        worker.process.start()
+        receiver.close()
+        worker.reported_at = time.monotonic()
+        pending, worker.outgoing = worker.outgoing, []
+        for commands in worker.registrations.values():
+            worker.outgoing.extend(commands)
+        worker.outgoing.extend(c for c in pending if c is not None and c[0] not in _REGISTRATIONS)
+        if worker.outgoing:
+            self.__send(worker)
+
+    def __died(self, worker, reason):
+        _log.error("Shard %d %s", worker.index, reason)
+        self.__receive(worker)
+        worker.commands.close()
+        worker.commands = None
+        self.__relay_event(worker, '_after_connection_lost', None, "shard %d %s"
+                           % (worker.index, reason))
+        if self.__restart:
+            worker.restarts += 1
+            self.__start(worker)
+
+    def __receive(self, worker):
+        events = worker.events
+        while events is not None:
+            try:
+                event = events.get_nowait()
+            except (queue.Empty, OSError, ValueError):
+                return
+            kind = event[0]
+            if kind == 'callback':
+                self.__run_callback(worker, *event[1:])
+            elif kind == 'health':
+                worker.report = event[1]
+                worker.reported_at = time.monotonic()
+            else:
+                self.__relay_event(worker, *event[1:])
+
+    def __run_callback(self, worker, device_id, actuator_id, topic, payload):
+        callback = self.__callbacks.get((device_id, actuator_id))
+        if callback is None:
+            return
+        try:
+            callback(payload)
+        except Exception as exc:
+            _log.exception("Callback failed on %s", topic)
+            self.__relay_event(worker, '_after_callback_error', topic, exc)
+
+    def __relay_event(self, worker, method, topic, reason):
+        if isinstance(reason, str):
+            reason = Transport.TransportException(reason=reason)
+        info = TransportListener.Info(None, topic, reason)
+        info.shard = worker.index
+        for listener in list(self.__listeners):
+            getattr(listener, method)(info)
+
+
+_REGISTRATIONS = ('device', 'sensor', 'actuator')
+
+
+class _Shard(TransportListener):
+    """Worker-side loop: serves the devices of one shard with a
+    `GVGateway`."""
+
+    def __init__(self, index, spec, commands, events):
+        device_info, transport, args, kwargs, protocol_factory, health_interval_sec = spec
+        info = DeviceInfo("%s-%d" % (device_info.id, index), device_info.name,
+                          device_info.ip, device_info.port)
+        if isinstance(transport, str):
+            transport = create_transport(transport, info, *args, **kwargs)
+        else:
+            transport = transport(info)
+        transport.add_listener(self)
+        self.__transport = transport
+        self.__gateway = GVGateway(info, transport, protocol_factory)
+        self.__commands = commands
+        self.__events = events
+        self.__health_interval_sec = health_interval_sec
+        self.__connected = False
+        self.__readings = 0
+        self.__commands_received = 0
+        self.__errors = 0
+        self.__synced = 0
+
+    def run(self):
+        gateway, commands = self.__gateway, self.__commands
+        gateway.connect()
+        poll_every = 0.01
+        polled = reported = 0.0
+        synced = 0
+        while True:
+            batch = commands.recv() if commands.poll(poll_every) else ()
+            for command in batch:
+                if command is None:
+                    gateway.shutdown()
+                    self.__report()
+                    return
+                try:
+                    self.__apply(command)
+                except Exception:
+                    self.__errors += 1
+                    _log.exception("Shard command failed: %s", command[0])
+            now = time.monotonic()
+            if now - polled >= poll_every:
+                gateway.poll()
+                polled = now
+            if now - reported >= self.__health_interval_sec or synced != self.__synced:
+                self.__report()
+                reported, synced = now, self.__synced
+
+    def __apply(self, command):
+        kind = command[0]
+        if kind == 'data':
+            self.__gateway.device(command[1]).send_data(*command[2:])
+            self.__readings += 1
+        elif kind == 'batch':
+            self.__gateway.device(command[1]).send_data_batch(*command[2:])
+            self.__readings += len(command[2])
+        elif kind == 'status':
+            self.__gateway.device(command[1]).send_status(command[2])
+        elif kind == 'device':
+            device_info, relayed = command[1:]
+            callback = (functools.partial(self.__relay, device_info.id, None, None)
+                        if relayed else None)
+            self.__gateway.add_device(device_info, callback)
+        elif kind == 'sensor':
+            self.__gateway.device(command[1]).add_sensor(*command[2:])
+        elif kind == 'actuator':
+            device = self.__gateway.device(command[1])
+            device.add_actuator(*command[2:], functools.partial(
+                self.__relay, command[1], command[2],
+                device.protocol.topic("actuators_input", command[2])))
+        elif kind == 'remove':
+            self.__gateway.remove_device(command[1])
+        elif kind == 'sync':
+            self.__synced = command[1]
+
+    def __relay(self, device_id, actuator_id, topic, payload):
+        self.__commands_received += 1
+        self.__events.put(('callback', device_id, actuator_id, topic, payload))
+        return payload
+
+    def __report(self):
+        self.__events.put(('health', {
+            "connected": self.__connected,
+            "readings": self.__readings,
+            "commands": self.__commands_received,
+            "errors": self.__errors,
+            "synced": self.__synced,
+        }))
+
+    def __event(self, method, info):
+        reason = info.failure_reason
+        self.__events.put(('event', method, info.topic, None if reason is None else str(reason)))
+
+    def _after_connect(self, info):
+        self.__connected = True
+        self.__event('_after_connect', info)
+
+    def _after_connection_unsuccessful(self, info):
+        self.__event('_after_connection_unsuccessful', info)
+
+    def _before_disconnect(self, info):
+        self.__connected = False
+        self.__event('_before_disconnect', info)
+
+    def _after_connection_lost(self, info):
+        self.__connected = False
+        self.__event('_after_connection_lost', info)
+
+    def _after_reconnect(self, info):
+        self.__event('_after_reconnect', info)
+
+    def _after_callback_error(self, info):
+        self.__event('_after_callback_error', info)
+
+
+def _run_shard(index, spec, commands, events):
+    _Shard(index, spec, commands, events).run()
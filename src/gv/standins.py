@@ -0,0 +1,470 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Local MQTT and HTTP stand-in servers, for tests and benchmarks
+
+Both servers run on a background thread of the current process, listen
+on localhost and only depend on the standard library: they speak just
+enough of their protocol for `MqttTransport` and `RestTransport` (and
+their asyncio counterparts) to be exercised end-to-end.
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import asyncio
+import base64
+import collections
+import http.server
+import json
+import struct
+import threading
+import time
+import urllib.parse
+
+from .topics import TopicIndex
+
+
+class _StandIn(object):
+    """Start/stop and context manager protocol shared by the stand-ins."""
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _Subscription(object):
+    __slots__ = ('session', 'qos')
+
+    def __init__(self, session, qos):
+        self.session = session
+        self.qos = qos
+
+
+class _Session(object):
+    __slots__ = ('client_id', 'writer', 'subscriptions', 'next_id')
+
+    def __init__(self, client_id, writer):
+        self.client_id = client_id
+        self.writer = writer
+        self.subscriptions = {}  # topic filter -> _Subscription
+        self.next_id = 0
+
+    def packet_id(self):
+        self.next_id = self.next_id % 0xffff + 1
+        return self.next_id
+
+
+class MqttStandIn(_StandIn):
+    """Minimal MQTT 3.1.1 broker: CONNECT, PUBLISH (QoS 0, 1 and 2, in both
+    directions), SUBSCRIBE and UNSUBSCRIBE with wildcards, retained
+    messages, PINGREQ and DISCONNECT. Sessions are not persisted,
+    authentication and wills are ignored and nothing is ever retransmitted.
+    Calling `start()` again after `stop()` simulates a broker restart on the
+    same port: all sessions are gone, retained messages are kept.
+
+        with MqttStandIn() as broker:
+            transport = MqttTransport(me, *broker.address)
+    """
+
+    CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP, SUBSCRIBE, \
+        SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = range(1, 15)
+
+    def __init__(self, host='127.0.0.1', port=0):
+        """:param port: the port to listen on; 0 picks a free one"""
+        self.__host = host
+        self.__port = port
+        self.__loop = None
+        self.__thread = None
+        self.__server = None
+        self.__sessions = set()
+        self.__connections = {}  # writer -> task serving it
+        self.__subscriptions = TopicIndex()
+        self.__retained = {}  # topic -> (payload, qos)
+        self.__published = 0
+        self.__delivered = 0
+        self.__connects = 0
+
+    @property
+    def address(self):
+        """`(host, port)` the broker listens on."""
+        return self.__host, self.__port
+
+    @property
+    def connections(self):
+        """Number of connections accepted (CONNECT packets received)."""
+        return self.__connects
+
+    @property
+    def published(self):
+        """Number of messages received from clients."""
+        return self.__published
+
+    @property
+    def delivered(self):
+        """Number of messages sent to subscribers."""
+        return self.__delivered
+
+    def start(self):
+        """Starts listening, on a background thread."""
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever,
+                                         name="gv-mqtt-standin", daemon=True)
+        self.__thread.start()
+        self.__server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self.__serve, self.__host, self.__port),
+            self.__loop).result()
+        self.__port = self.__server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        """Closes all connections and stops listening."""
+        async def close():
+            self.__server.close()
+            for writer in list(self.__connections):
+                writer.close()
+            if self.__connections:
+                await asyncio.wait(list(self.__connections.values()), timeout=1)
+        asyncio.run_coroutine_threadsafe(close(), self.__loop).result()
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+        self.__sessions.clear()
+
+    async def __serve(self, reader, writer):
+        session = None
+        self.__connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                first = (await reader.readexactly(1))[0]
+                length, shift = 0, 0
+                while True:
+                    byte = (await reader.readexactly(1))[0]
+                    length |= (byte & 0x7f) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                body = await reader.readexactly(length)
+                kind, flags = first >> 4, first & 0x0f
+                if kind == self.CONNECT:
+                    session = self.__connect(body, writer)
+                elif session is None:
+                    break
+                elif kind == self.PUBLISH:
+                    self.__publish(session, flags, body)
+                elif kind == self.PUBREL:
+                    writer.write(bytes((self.PUBCOMP << 4, 2)) + body[:2])
+                elif kind == self.PUBREC:
+                    writer.write(bytes((self.PUBREL << 4 | 2, 2)) + body[:2])
+                elif kind == self.SUBSCRIBE:
+                    self.__subscribe(session, body)
+                elif kind == self.UNSUBSCRIBE:
+                    self.__unsubscribe(session, body)
+                elif kind == self.PINGREQ:
+                    writer.write(bytes((self.PINGRESP << 4, 0)))
+                elif kind == self.DISCONNECT:
+                    break
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session is not None:
+                self.__sessions.discard(session)
+                for topic_filter, subscription in session.subscriptions.items():
+                    self.__subscriptions.remove(topic_filter, subscription)
+            del self.__connections[writer]
+            writer.close()
+
+    @staticmethod
+    def __string(body, pos):
+        size = struct.unpack_from('>H', body, pos)[0]
+        return bytes(body[pos + 2:pos + 2 + size]).decode('utf-8'), pos + 2 + size
+
+    @staticmethod
+    def __packet(kind_flags, body):
+        length, header = len(body), bytearray((kind_flags,))
+        while True:
+            byte, length = length & 0x7f, length >> 7
+            header.append(byte | 0x80 if length else byte)
+            if not length:
+                return bytes(header) + body
+
+    def __connect(self, body, writer):
+        pos = self.__string(body, 0)[1]  # protocol name
+        client_id = self.__string(body, pos + 4)[0]  # level, flags, keep alive
+        session = _Session(client_id, writer)
+        self.__sessions.add(session)
+        self.__connects += 1
+        writer.write(bytes((self.CONNACK << 4, 2, 0, 0)))
+        return session
+
+    def __publish(self, session, flags, body):
+        qos, retain = (flags >> 1) & 3, flags & 1
+        topic, pos = self.__string(body, 0)
+        if qos:
+            packet_id = body[pos:pos + 2]
+            pos += 2
+            reply = self.PUBACK if qos == 1 else self.PUBREC
+            session.writer.write(bytes((reply << 4, 2)) + packet_id)
+        payload = bytes(body[pos:])
+        self.__published += 1
+        if retain:
+            if payload:
+                self.__retained[topic] = (payload, qos)
+            else:
+                self.__retained.pop(topic, None)
+        granted = {}
+        for subscription in self.__subscriptions.match(topic):
+            target = subscription.session
+            granted[target] = max(granted.get(target, 0), min(qos, subscription.qos))
+        for target, target_qos in granted.items():
+            self.__send(target, topic, payload, target_qos, False)
+
+    def __send(self, session, topic, payload, qos, retain):
+        name = topic.encode('utf-8')
+        header = struct.pack('>H', len(name)) + name
+        if qos:
+            header += struct.pack('>H', session.packet_id())
+        session.writer.write(self.__packet(self.PUBLISH << 4 | qos << 1 | retain,
+                                           header + payload))
+        self.__delivered += 1
+
+    def __subscribe(self, session, body):
+        packet_id, pos = body[:2], 2
+        granted = bytearray()
+        filters = []
+        while pos < len(body):
+            topic_filter, pos = self.__string(body, pos)
+            qos = min(body[pos], 2)
+            pos += 1
+            old = session.subscriptions.pop(topic_filter, None)
+            if old is not None:
+                self.__subscriptions.remove(topic_filter, old)
+            subscription = _Subscription(session, qos)
+            session.subscriptions[topic_filter] = subscription
+            self.__subscriptions.add(topic_filter, subscription)
+            granted.append(qos)
+            filters.append((topic_filter, qos))
+        session.writer.write(self.__packet(self.SUBACK << 4, packet_id + bytes(granted)))
+        for topic_filter, qos in filters:
+            index = TopicIndex(cache_size=0)
+            index.add(topic_filter, session)
+            for topic, (payload, retained_qos) in self.__retained.items():
+                if index.match(topic):
+                    self.__send(session, topic, payload, min(qos, retained_qos), True)
+
+    def __unsubscribe(self, session, body):
+        packet_id, pos = body[:2], 2
+        while pos < len(body):
+            topic_filter, pos = self.__string(body, pos)
+            subscription = session.subscriptions.pop(topic_filter, None)
+            if subscription is not None:
+                self.__subscriptions.remove(topic_filter, subscription)
+        session.writer.write(bytes((self.UNSUBACK << 4, 2)) + packet_id)
+
+
+class _HttpHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.standin._received(self.path, body)
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+
+    do_PUT = do_POST
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if not url.path.endswith('/inbox'):
+            self.send_error(404)
+            return
+        filters = [f for f in query.get('topics', [''])[0].split(',') if f]
+        since = int(query['since'][0]) if 'since' in query else None
+        wait = float(query.get('wait', ['0'])[0])
+        standin = self.server.standin
+        if 'stream' in query:
+            self.__stream(standin, filters, since, wait)
+            return
+        cursor, messages = standin._inbox(filters, since, wait)
+        body = json.dumps({"cursor": cursor, "messages": [m for _, m in messages]},
+                          separators=(',', ':')).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if not standin.running:
+            self.close_connection = True
+            self.send_header("Connection", "close")
+        try:
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client gave up waiting
+
+    def __stream(self, standin, filters, cursor, wait):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            cursor, messages = standin._inbox(filters, cursor, 0)
+            self.__chunk("id: %d\n\n" % cursor)  # tells the client where it starts
+            while True:
+                for seq, message in messages:
+                    self.__chunk("id: %d\ndata: %s\n\n"
+                                 % (seq, json.dumps(message, separators=(',', ':'))))
+                if not standin.running:
+                    self.__chunk("")
+                    return
+                if not messages:
+                    self.__chunk(": keep-alive\n\n")
+                cursor, messages = standin._inbox(filters, cursor, wait)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away
+
+    def __chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpStandIn(_StandIn):
+    """Minimal HTTP/1.1 server accepting the POST (and PUT) requests of
+    `RestTransport`, with keep-alive, and answering 204 No Content.
+    The last `keep` requests are kept in `requests`, as `(path, body)`.
+
+    Messages given to `publish(...)` are served to the devices' inboxes
+    (see `RestTransport`), by long polling or as an event stream; the last
+    `backlog` of them are kept for the clients to catch up.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, keep=1000, backlog=1000):
+        """:param port: the port to listen on; 0 picks a free one"""
+        self.__host = host
+        self.__port = port
+        self.__keep = keep
+        self.__server = None
+        self.__thread = None
+        self.__lock = threading.Lock()
+        self.__requests = []
+        self.__count = 0
+        self.__messages = collections.deque(maxlen=backlog)  # (cursor, message)
+        self.__cursor = int(time.time() * 1e6)  # keeps growing across restarts
+        self.__inbox = threading.Condition()
+        self.__running = False
+
+    @property
+    def address(self):
+        """`(host, port)` the server listens on."""
+        return self.__host, self.__port
+
+    @property
+    def count(self):
+        """Number of requests received."""
+        return self.__count
+
+    @property
+    def requests(self):
+        with self.__lock:
+            return list(self.__requests)
+
+    @property
+    def running(self):
+        return self.__running
+
+    def publish(self, topic, payload):
+        """Sends a message to the clients subscribed to the topic.
+        :param payload: bytes or str
+        """
+        if isinstance(payload, str):
+            message = {"topic": topic, "payload": payload}
+        else:
+            try:
+                message = {"topic": topic, "payload": payload.decode('utf-8')}
+            except UnicodeDecodeError:
+                message = {"topic": topic,
+                           "payload_b64": base64.b64encode(payload).decode('ascii')}
+        with self.__inbox:
+            self.__cursor += 1
+            self.__messages.append((self.__cursor, message))
+            self.__inbox.notify_all()
+
+    def start(self):
+        """Starts listening, on a background thread."""
+        self.__running = True
+        self.__server = http.server.ThreadingHTTPServer((self.__host, self.__port),
+                                                        _HttpHandler)
+        self.__server.daemon_threads = True
+        self.__server.standin = self
+        self.__port = self.__server.server_address[1]
+        self.__thread = threading.Thread(target=self.__server.serve_forever,
+                                         name="gv-http-standin", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stops listening (and ends the event streams)."""
+        with self.__inbox:
+            self.__running = False
+            self.__inbox.notify_all()
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def _received(self, path, body):
+        with self.__lock:
+            self.__count += 1
+            if self.__keep:
+                self.__requests.append((path, body))
+                del self.__requests[:-self.__keep]
+
+    def _inbox(self, filters, since, wait):
+        """Waits up to `wait` seconds for messages after cursor `since`
+        (from now on if `None`) on topics matching `filters`.
+        :return: `(cursor, [(cursor, message), ...])`
+        """
+        index = TopicIndex()
+        for filter_ in filters:
+            index.add(filter_, filter_)
+
+        def pending():
+            return [(cursor, message) for cursor, message in self.__messages
+                    if cursor > since and index.match(message["topic"])]
+
+        with self.__inbox:
+            if since is None:
+                since = self.__cursor
+            messages = pending()
+            if not messages and wait > 0:
+                self.__inbox.wait_for(lambda: not self.__running or pending(), wait)
+                messages = pending()
+            return (messages[-1][0] if messages else max(since, self.__cursor)), messages
@@ -0,0 +1,374 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Durable store-and-forward of outbound messages
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .gvlib import Transport, TransportListener
+
+
+_log = logging.getLogger(__name__)
+
+
+def is_permanent(exc):
+    """Whether a failure to send a message will happen again whenever it
+    is sent: invalid messages (`ValueError`, `TypeError`), methods not
+    implemented and requests rejected by an HTTP server (4xx but 408 and
+    429, as `TransportException` codes). Anything else (connection errors,
+    timeouts, server errors, ...) is worth trying again later.
+    """
+    if isinstance(exc, Transport.TransportException):
+        code = exc.code
+        return code == -1 or (isinstance(code, int) and 400 <= code < 500
+                              and code not in (408, 429))
+    return isinstance(exc, (ValueError, TypeError))
+
+
+class _Segment(object):
+    __slots__ = ('seq', 'path', 'file', 'map', 'size', 'write', 'read')
+
+    def __init__(self, seq, path, file, map_, write, read):
+        self.seq = seq
+        self.size = len(map_)
+        self.path = path
+        self.file = file
+        self.map = map_
+        self.write = write
+        self.read = read
+
+
+class SegmentQueue(object):
+    """Disk-backed FIFO queue of outbound messages.
+
+    Messages are appended to memory-mapped segment files of `segment_size`
+    bytes each, kept in `path`. At most `max_segments` segments exist at any
+    time: when a new one is needed and the limit is reached, the oldest
+    segment is evicted along with all the messages it still holds (see
+    `dropped`). Segments are deleted as soon as they have been consumed.
+
+    Layout of a segment: a header (magic, read offset) followed by records
+    (size, qos, flags, length of the service name, service, payload).
+    The size of a record is written last, so a record interrupted by a crash
+    is simply not there when the queue is reopened.
+
+    Not thread-safe: `Outbox` takes care of locking.
+    """
+
+    MAGIC = b'GVQ1'
+    _HEADER = struct.Struct('<4sI')    # magic, read offset
+    _RECORD = struct.Struct('<IBBH')   # size, qos, flags, service length
+    _RETAIN = 0x01
+    _TEXT = 0x02
+
+    def __init__(self, path, segment_size=4 * 1024 * 1024, max_segments=64,
+                 sync=False):
+        """Opens (or creates) a queue.
+        :param path: the directory holding the segment files
+        :param segment_size: the size of each segment file, in bytes
+        :param max_segments: the max number of segment files
+        :param sync: `True` to flush every consumed segment to disk
+        """
+        os.makedirs(path, exist_ok=True)
+        self.__path = path
+        self.__segment_size = segment_size
+        self.__max_segments = max_segments
+        self.__sync = sync
+        self.__segments = []
+        self.__count = 0
+        self.__dropped = 0
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.seg'):
+                self.__load(int(name[:-4], 16), os.path.join(path, name))
+
+    def __len__(self):
+        """Number of messages in the queue."""
+        return self.__count
+
+    @property
+    def dropped(self):
+        """Number of messages evicted because the queue was full."""
+        return self.__dropped
+
+    def append(self, service, payload, qos=0, retain=False):
+        """Appends a message at the end of the queue."""
+        flags = self._RETAIN if retain else 0
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+            flags |= self._TEXT
+        service = service.encode('utf-8')
+        size = self._RECORD.size + len(service) + len(payload)
+        if size > self.__segment_size - self._HEADER.size:
+            raise ValueError("Message too large for the queue segments")
+        segments = self.__segments
+        if not segments or segments[-1].write + size > segments[-1].size:
+            self.__roll()
+        seg = segments[-1]
+        start = seg.write + self._RECORD.size
+        mid = start + len(service)
+        seg.map[start:mid] = service
+        seg.map[mid:mid + len(payload)] = payload
+        self._RECORD.pack_into(seg.map, seg.write, size, qos, flags, len(service))
+        seg.write += size
+        self.__count += 1
+
+    def peek(self):
+        """Returns the oldest message as `(service, payload, qos, retain)`,
+        or `None` if the queue is empty. The message stays in the queue
+        until `pop()` is called."""
+        if not self.__count:
+            return None
+        seg = self.__segments[0]
+        size, qos, flags, service_len = self._RECORD.unpack_from(seg.map, seg.read)
+        start = seg.read + self._RECORD.size
+        service = seg.map[start:start + service_len].decode('utf-8')
+        payload = seg.map[start + service_len:seg.read + size]
+        if flags & self._TEXT:
+            payload = payload.decode('utf-8')
+        return service, payload, qos, bool(flags & self._RETAIN)
+
+    def pop(self):
+        """Removes the oldest message from the queue."""
+        if not self.__count:
+            return
+        seg = self.__segments[0]
+        seg.read += self._RECORD.unpack_from(seg.map, seg.read)[0]
+        self._HEADER.pack_into(seg.map, 0, self.MAGIC, seg.read)
+        self.__count -= 1
+        if seg.read == seg.write and len(self.__segments) > 1:
+            self.__discard(self.__segments.pop(0))
+
+    def close(self):
+        """Flushes and closes all the segment files."""
+        for seg in self.__segments:
+            seg.map.flush()
+            seg.map.close()
+            seg.file.close()
+        self.__segments = []
+
+    def __roll(self):
+        seq = self.__segments[-1].seq + 1 if self.__segments else 0
+        if self.__segments and self.__segments[-1].read == self.__segments[-1].write:
+            # fully read (the only segment left): peek() must not stop there
+            self.__discard(self.__segments.pop())
+        elif len(self.__segments) >= self.__max_segments:
+            oldest = self.__segments.pop(0)
+            lost = self.__records(oldest, oldest.read, oldest.write)
+            self.__count -= lost
+            self.__dropped += lost
+            self.__discard(oldest)
+        path = os.path.join(self.__path, '%016x.seg' % seq)
+        file = open(path, 'w+b')
+        file.truncate(self.__segment_size)
+        map_ = mmap.mmap(file.fileno(), self.__segment_size)
+        self._HEADER.pack_into(map_, 0, self.MAGIC, self._HEADER.size)
+        self.__segments.append(_Segment(seq, path, file, map_,
+                                        self._HEADER.size, self._HEADER.size))
+
+    def __load(self, seq, path):
+        file = open(path, 'r+b')
+        size = os.fstat(file.fileno()).st_size
+        if size < self._HEADER.size:
+            file.close()
+            os.remove(path)
+            return
+        map_ = mmap.mmap(file.fileno(), size)
+        magic, read = self._HEADER.unpack_from(map_, 0)
+        if magic != self.MAGIC:
+            map_.close()
+            file.close()
+            raise ValueError("Not a queue segment: %s" % path)
+        seg = _Segment(seq, path, file, map_, self._HEADER.size, read)
+        write = self._HEADER.size
+        while write + self._RECORD.size <= size:
+            rec_size = self._RECORD.unpack_from(map_, write)[0]
+            if rec_size < self._RECORD.size or write + rec_size > size:
+                break
+            write += rec_size
+        seg.write = write
+        self.__count += self.__records(seg, read, write)
+        self.__segments.append(seg)
+
+    def __records(self, seg, start, end):
+        count = 0
+        while start < end:
+            start += self._RECORD.unpack_from(seg.map, start)[0]
+            count += 1
+        return count
+
+    def __discard(self, seg):
+        if self.__sync:
+            seg.map.flush()
+        seg.map.close()
+        seg.file.close()
+        os.remove(seg.path)
+
+
+class Outbox(TransportListener):
+    """Store-and-forward stage for a `Transport` (see `Transport.set_outbox`).
+
+    While the transport is connected and nothing is waiting in the queue,
+    messages go straight to the transport. Otherwise (not connected yet,
+    connection lost, a send failed, or older messages still waiting) they
+    are appended to the queue, so that messages are always delivered in
+    the order they were sent. Once the transport connects, a background
+    thread drains the queue at `drain_rate` messages per second at most,
+    retrying every `retry_sec` after a failure.
+
+    Messages that can never be delivered (see `is_permanent(...)`) are not
+    retried: sent directly, their exception goes to the caller; drained
+    from the queue, they are logged, handed to `dead_letter` if given, and
+    dropped (see `rejected`).
+    """
+
+    def __init__(self, queue: SegmentQueue, drain_rate=500, retry_sec=5, dead_letter=None):
+        """
+        :param queue: the `SegmentQueue` holding the messages
+        :param drain_rate: max messages per second sent from the queue
+        :param retry_sec: seconds to wait before trying again after a failure
+        :param dead_letter: (opt) called as `dead_letter(service, payload,
+                            qos, retain, exc)` with the queued messages
+                            failing permanently
+        """
+        self.__queue = queue
+        self.__drain_rate = drain_rate
+        self.__retry_sec = retry_sec
+        self.__dead_letter = dead_letter
+        self.__lock = threading.Lock()
+        self.__online = False
+        self.__handler = None
+        self.__wakeup = threading.Event()
+        self.__drainer = None
+        self.__rejected = 0
+
+    @property
+    def queue(self):
+        return self.__queue
+
+    @property
+    def online(self):
+        return self.__online
+
+    @property
+    def rejected(self):
+        """Number of queued messages dropped after a permanent failure."""
+        return self.__rejected
+
+    def _attach(self, handler):
+        """Called by the transport: `handler` actually sends a message."""
+        self.__handler = handler
+
+    def send(self, service, payload, qos=0, retain=False):
+        """Sends a message through the transport, or queues it if it cannot
+        be sent right now.
+        :return: what the transport returned, `None` if the message was
+                 queued"""
+        with self.__lock:
+            direct = self.__online and not len(self.__queue)
+            if not direct:
+                self.__queue.append(service, payload, qos, retain)
+        if direct:
+            try:
+                return self.__handler(service, payload, qos, retain)
+            except Exception as exc:
+                if is_permanent(exc):
+                    raise
+                with self.__lock:
+                    self.__online = False
+                    self.__queue.append(service, payload, qos, retain)
+        self.__wakeup.set()
+
+    def spill(self, service, payload, qos=0, retain=False):
+        """Queues a message that the transport could not deliver after
+        accepting it (e.g. from its own sending thread)."""
+        with self.__lock:
+            self.__online = False
+            self.__queue.append(service, payload, qos, retain)
+
+    def _after_connect(self, info):
+        self.__online = True
+        if self.__drainer is None:
+            self.__drainer = threading.Thread(target=self.__drain_loop,
+                                              name="gv-outbox", daemon=True)
+            self.__drainer.start()
+        self.__wakeup.set()
+
+    def _after_connection_unsuccessful(self, info):
+        self.__online = False
+
+    def _after_connection_lost(self, info):
+        self.__online = False
+
+    def _before_disconnect(self, info):
+        drainer, self.__drainer = self.__drainer, None
+        if drainer:
+            self.__wakeup.set()
+            drainer.join()
+
+    def __drain_loop(self):
+        me = threading.current_thread()
+        interval = 1.0 / self.__drain_rate if self.__drain_rate else 0
+        while self.__drainer is me:
+            if self.__drain_one():
+                if interval:
+                    time.sleep(interval)
+            else:
+                self.__wakeup.wait(self.__retry_sec if len(self.__queue) else None)
+                self.__wakeup.clear()
+
+    def __drain_one(self):
+        """Sends the oldest queued message; `False` if there is none or
+        it could not be sent (and should be tried again later)."""
+        with self.__lock:
+            message = self.__queue.peek()
+            if message is None:
+                return False
+            dropped = self.__queue.dropped
+        # the message stays first in the queue while being sent, so newer
+        # messages keep being queued behind it; only this thread pops
+        try:
+            self.__handler(*message)
+        except Exception as exc:
+            if not is_permanent(exc):
+                self.__online = False
+                return False
+            _log.error("Dropping a message to %s that cannot be delivered: %r",
+                       message[0], exc)
+            self.__rejected += 1
+            if self.__dead_letter is not None:
+                try:
+                    self.__dead_letter(*message, exc)
+                except Exception:
+                    _log.exception("Dead letter handler failed for %s", message[0])
+        with self.__lock:
+            if self.__queue.dropped == dropped:  # else, evicted while sending
+                self.__queue.pop()
+            self.__online = True
+        return True
@@ -0,0 +1,210 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Subscription index with MQTT wildcard semantics
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import threading
+
+
+class _Node(object):
+    __slots__ = ('children', 'callbacks')
+
+    def __init__(self):
+        self.children = {}
+        self.callbacks = None  # callback -> registration order, only for subscribed filters
+
+
+class TopicIndex(object):
+    """Maps topic filters to callbacks and finds the callbacks matching a
+    topic, following the MQTT rules for wildcards:
+        '+' matches exactly one topic level
+        '#' (last level only) matches any number of levels, including
+            the parent level ('a/#' matches 'a')
+    Wildcards at the first level do not match topics starting with '$'.
+
+    Callbacks matching a topic are returned in the order they were
+    registered, even when they come from different filters.
+
+    Filters are kept in a trie with one node per topic level, so matching
+    costs depend on the depth of the topic, not on the number of
+    subscriptions. Results for the most recent topics are cached; the cache
+    is invalidated whenever the subscriptions change.
+
+    Thread-safe: changes are serialized by a lock and never modify the
+    callbacks of a filter in place (copy-on-write), so `match(...)` runs
+    without locking, on a consistent view of each filter.
+    """
+
+    def __init__(self, cache_size=4096):
+        self.__root = _Node()
+        self.__count = 0
+        self.__seq = 0
+        self.__version = 0  # bumped on changes, so that stale results are not cached
+        self.__cache = {}
+        self.__cache_size = cache_size
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        """Number of distinct filters in the index."""
+        return self.__count
+
+    def __contains__(self, topic_filter):
+        node = self.__find(topic_filter)
+        return node is not None and node.callbacks is not None
+
+    def add(self, topic_filter, callback):
+        """Registers a callback for a topic filter.
+        :param topic_filter: a topic, possibly containing wildcards
+        :param callback: the callback to associate to the filter
+        :return: `True` if the filter was not in the index before
+        """
+        levels = topic_filter.split('/')
+        for i, level in enumerate(levels):
+            if (('#' in level or '+' in level) and len(level) > 1) or \
+                    (level == '#' and i != len(levels) - 1):
+                raise ValueError("Invalid topic filter: %r" % topic_filter)
+        with self.__lock:
+            node = self.__root
+            for level in levels:
+                child = node.children.get(level)
+                if child is None:
+                    child = node.children[level] = _Node()
+                node = child
+            new = node.callbacks is None
+            callbacks = {} if new else dict(node.callbacks)
+            if new:
+                self.__count += 1
+            self.__seq += 1
+            callbacks.setdefault(callback, self.__seq)
+            node.callbacks = callbacks
+            self.__changed()
+            return new
+
+    def remove(self, topic_filter, callback=None):
+        """Unregisters a callback (or all callbacks) for a topic filter.
+        :param topic_filter: the filter as passed to `add(...)`
+        :param callback: the callback to remove, `None` to remove them all
+        :return: `True` if the filter is no longer in the index
+        """
+        with self.__lock:
+            path = [self.__root]
+            levels = topic_filter.split('/')
+            for level in levels:
+                node = path[-1].children.get(level)
+                if node is None:
+                    return True
+                path.append(node)
+            node = path[-1]
+            if node.callbacks is None:
+                return True
+            if callback is not None:
+                callbacks = dict(node.callbacks)
+                callbacks.pop(callback, None)
+                if callbacks:
+                    node.callbacks = callbacks
+                    self.__changed()
+                    return False
+            node.callbacks = None
+            self.__count -= 1
+            # prune the branches left empty
+            for i in range(len(levels), 0, -1):
+                if path[i].children or path[i].callbacks is not None:
+                    break
+                del path[i - 1].children[levels[i - 1]]
+            self.__changed()
+            return True
+
+    def match(self, topic):
+        """Finds the callbacks whose filters match a topic.
+        :param topic: the topic (no wildcards) to match
+        :return: a tuple of callbacks; empty if nothing matches
+        """
+        result = self.__cache.get(topic)
+        if result is not None:
+            return result
+        version = self.__version
+        found = []  # one dict (callback -> order) per matching filter
+        levels = topic.split('/')
+        last = len(levels)
+        nodes = [(self.__root, 0)]
+        while nodes:
+            node, i = nodes.pop()
+            wild = i > 0 or not topic.startswith('$')
+            if wild:
+                multi = node.children.get('#')
+                callbacks = multi.callbacks if multi is not None else None
+                if callbacks:
+                    found.append(callbacks)
+            if i == last:
+                callbacks = node.callbacks
+                if callbacks:
+                    found.append(callbacks)
+                continue
+            child = node.children.get(levels[i])
+            if child is not None:
+                nodes.append((child, i + 1))
+            if wild:
+                child = node.children.get('+')
+                if child is not None:
+                    nodes.append((child, i + 1))
+        if len(found) == 1:
+            result = tuple(found[0])
+        else:
+            ordered = sorted(((seq, cb) for callbacks in found
+                              for cb, seq in callbacks.items()),
+                             key=lambda item: item[0])
+            result = tuple(dict.fromkeys(cb for seq, cb in ordered))
+        if self.__cache_size:
+            with self.__lock:
+                if version == self.__version:  # else, may be stale already
+                    if len(self.__cache) >= self.__cache_size:
+                        self.__cache.clear()
+                    self.__cache[topic] = result
+        return result
+
+    def filters(self):
+        """Lists all the filters in the index."""
+        result = []
+        with self.__lock:
+            nodes = [(self.__root, [])]
+            while nodes:
+                node, levels = nodes.pop()
+                if node.callbacks is not None and levels:
+                    result.append('/'.join(levels))
+                for level, child in node.children.items():
+                    nodes.append((child, levels + [level]))
+        return result
+
+    def __changed(self):
+        self.__version += 1
+        self.__cache.clear()
+
+    def __find(self, topic_filter):
+        node = self.__root
+        for level in topic_filter.split('/'):
+            node = node.children.get(level)
+            if node is None:
+                return None
+        return node
@@ -13,4 +13,65 @@
 # for more details.
 #
 # You should have received a copy of the GNU Lesser General Public License
-# along with this software. If not, see <http://www.gnu.org/licenses/>.
\ No newline at end of file
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+Transport implementations, loaded on first use
+
+Each transport lives in its own module, imported only when the transport
+is first needed, so that e.g. MQTT-only deployments never load the HTTP
+client library: look transports up by name with `get_transport(...)`, or
+access them as attributes of this package (`gv.transports.MqttTransport`).
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import importlib
+
+
+# name -> "module:class", or the class itself once loaded or registered
+TRANSPORTS = {
+    'mqtt': 'gv.transports.mqtt:MqttTransport',
+    'rest': 'gv.transports.rest:RestTransport',
+    'loopback': 'gv.transports.loopback:LoopbackTransport',
+    'aio_mqtt': 'gv.transports.aio_mqtt:AsyncMqttTransport',
+    'aio_rest': 'gv.transports.aio_rest:AsyncRestTransport',
+}
+
+
+def register_transport(name, transport):
+    """Makes a transport available by name.
+    :param transport: the transport class, or its location as
+                      `"module:class"` to import it on first use
+    """
+    TRANSPORTS[name] = transport
+
+
+def get_transport(name):
+    """Returns the transport class registered as `name` in `TRANSPORTS`,
+    importing its module if needed."""
+    try:
+        transport = TRANSPORTS[name]
+    except KeyError:
+        raise ValueError("Unknown transport: %s" % name)
+    if isinstance(transport, str):
+        module, _, cls = transport.partition(':')
+        transport = TRANSPORTS[name] = getattr(importlib.import_module(module), cls)
+    return transport
+
+
+def create_transport(name, *args, **kwargs):
+    """Builds a transport by name: `create_transport("mqtt", me, host, port)`."""
+    return get_transport(name)(*args, **kwargs)
+
+
+def __getattr__(attr):
+    for name, transport in list(TRANSPORTS.items()):
+        if (transport.rpartition(':')[2] if isinstance(transport, str)
+                else transport.__name__) == attr:
+            return get_transport(name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, attr))
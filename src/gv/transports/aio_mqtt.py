@@ -0,0 +1,155 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+GreenVulcano Communication Library
+asyncio MQTT Transport Implementation
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+"""
+
+import asyncio
+
+from ..aio import AsyncTransport
+from ..mixins import _ServerAndPort, _DeviceInfo
+from .mqtt import MqttTransport
+
+import paho.mqtt.client as mqtt
+
+
+class AsyncMqttTransport(AsyncTransport, _DeviceInfo, _ServerAndPort):
+    """Implementation of `AsyncTransport` for MQTT.
+    The paho client socket is driven by the running event loop (no extra
+    thread, no `poll()` needed): inbound messages are dispatched on the
+    loop as they arrive. `send()` with qos 1 or 2 completes when the broker
+    acknowledges the message; with qos 0, as soon as it is handed over
+    to the client. `connect()` waits up to `connect_timeout_sec` for the
+    broker to accept the connection, then gives up with a
+    `TransportException` (NOT_CONNECTED), reported to
+    `_after_connection_unsuccessful(...)`.
+    """
+
+    MISC_INTERVAL_SEC = 1
+
+    def __init__(self, device_info, server, port, clean_session=True, credentials=None,
+                 connect_timeout_sec=10):
+        AsyncTransport.__init__(self)
+        _DeviceInfo.__init__(self, device_info)
+        _ServerAndPort.__init__(self, server, port)
+
+        client = mqtt.Client(device_info.id, clean_session)
+        if credentials:
+            client.username_pw_set(credentials[0], credentials[1])
+
+        client.on_socket_open = self.__on_socket_open
+        client.on_socket_close = self.__on_socket_close
+        client.on_socket_register_write = self.__on_socket_register_write
+        client.on_socket_unregister_write = self.__on_socket_unregister_write
+        client.on_connect = self.__on_connect
+        client.on_message = self.__on_message
+        client.on_publish = self.__on_ack
+        client.on_subscribe = self.__on_subscribe
+        self.__client = client
+        self.__connect_timeout_sec = connect_timeout_sec
+        self.__loop = None
+        self.__misc_task = None
+        self.__connecting = None
+        self.__pending = {}  # mid -> future waiting for the broker's ack
+
+    async def send(self, service, payload, qos=0, retain=False):
+        info = self.__client.publish(service, payload, qos, retain)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise self.TransportException(info.rc, mqtt.error_string(info.rc))
+        if qos and not info.is_published():
+            await self.__wait_ack(info.mid)
+
+    async def _handle_connect(self):
+        self.__loop = asyncio.get_running_loop()
+        self.__connecting = self.__loop.create_future()
+        self.__client.connect(self.server, self.port, bind_address=self.device_info.ip)
+        self.__misc_task = self.__loop.create_task(self.__misc_loop())
+        try:
+            await asyncio.wait_for(self.__connecting, self.__connect_timeout_sec)
+        except asyncio.TimeoutError:
+            await self._handle_shutdown()
+            raise self.TransportException(lookup="NOT_CONNECTED") from None
+
+    async def _handle_shutdown(self):
+        self.__client.disconnect()
+        if self.__misc_task:
+            self.__misc_task.cancel()
+            self.__misc_task = None
+        for future in self.__pending.values():
+            future.cancel()
+        self.__pending.clear()
+
+    async def _handle_subscription(self, topic, callback):
+        rc, mid = self.__client.subscribe(topic)
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            raise self.TransportException(rc, mqtt.error_string(rc))
+        await self.__wait_ack(mid)
+
+    async def _handle_unsubscription(self, topic):
+        self.__client.unsubscribe(topic)
+
+    def __wait_ack(self, mid):
+        future = self.__loop.create_future()
+        self.__pending[mid] = future
+        return future
+
+    async def __misc_loop(self):
+        """Keeps the connection alive (pings, retries) while connected."""
+        while self.__client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(self.MISC_INTERVAL_SEC)
+
+    def __on_socket_open(self, client, userdata, sock):
+        self.__loop.add_reader(sock, client.loop_read)
+
+    def __on_socket_close(self, client, userdata, sock):
+        self.__loop.remove_reader(sock)
+
+    def __on_socket_register_write(self, client, userdata, sock):
+        self.__loop.add_writer(sock, client.loop_write)
+
+    def __on_socket_unregister_write(self, client, userdata, sock):
+        self.__loop.remove_writer(sock)
+
+    def __on_connect(self, client, userdata, flags, rc):
+        if self.__connecting is None or self.__connecting.done():
+            return
+        if rc == 0:
+            self.__connecting.set_result(True)
+        else:
+            if 0 < rc < len(MqttTransport.CONNECT_RESULT_CODES):
+                msg = MqttTransport.CONNECT_RESULT_CODES[rc]
+            else:
+                msg = "Unknown connect result code: %d" % rc
+            self.__connecting.set_exception(ConnectionError(msg))
+
+    def __on_ack(self, client, userdata, mid):
+        future = self.__pending.pop(mid, None)
+        if future is not None and not future.done():
+            future.set_result(mid)
+
+    def __on_subscribe(self, client, userdata, mid, granted_qos):
+        self.__on_ack(client, userdata, mid)
+
+    def __on_message(self, client, userdata, msg):
+        self.__loop.create_task(self.callback(msg.topic, msg.payload))
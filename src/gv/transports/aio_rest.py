@@ -0,0 +1,175 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+'''
+GreenVulcano Communication Library
+asyncio Rest Transport Implementation
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+'''
+
+import asyncio
+import base64
+import ssl
+
+from ..aio import AsyncTransport
+from ..mixins import _ServerAndPort, _DeviceInfo
+
+
+class _Connection(object):
+    """A keep-alive HTTP/1.1 connection, speaking just enough of the
+    protocol to POST data and read the response."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def post(self, path, headers, body):
+        """Returns `(status, reason, keep_alive)`."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        head = ''.join('%s: %s\r\n' % h for h in headers)
+        self.writer.write(('POST %s HTTP/1.1\r\n%sContent-Length: %d\r\n\r\n'
+                           % (path, head, len(body))).encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by the server")
+        version, status, reason = (status_line.decode('latin-1').rstrip('\r\n')
+                                   .split(' ', 2) + [''])[:3]
+        response = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response[name.strip().lower()] = value.strip()
+
+        keep_alive = (version == 'HTTP/1.1' and
+                      response.get('connection', '').lower() != 'close')
+        if response.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in response:
+            await self.reader.readexactly(int(response['content-length']))
+        elif int(status) not in (204, 304):
+            await self.reader.read()
+            keep_alive = False
+        return int(status), reason, keep_alive
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncRestTransport(AsyncTransport, _DeviceInfo, _ServerAndPort):
+    """Implementation of `AsyncTransport` over REST/HTTP.
+    Like `RestTransport`, keeps up to `pool_size` keep-alive connections
+    open and reuses them; coroutines exceeding that number wait for a
+    free connection.
+    """
+
+    def __init__(self, device_info, server, port,
+                 credentials=None, use_https=False, timeout=None,
+                 pool_size=4, keep_alive=True,
+                 content_type="application/json; charset=utf-8"):
+        AsyncTransport.__init__(self)
+        _DeviceInfo.__init__(self, device_info)
+        _ServerAndPort.__init__(self, server, port)
+        self.__ssl = ssl.create_default_context() if use_https else None
+        self.__timeout = timeout
+        self.__headers = [
+            ("Host", device_info.ip),
+            ("Content-Type", content_type),
+            ("Connection", "keep-alive" if keep_alive else "close")]
+        if credentials:
+            token = base64.b64encode(('%s:%s' % credentials).encode('utf-8'))
+            self.__headers.append(("Authorization", "Basic " + token.decode('ascii')))
+        self.__pool_size = pool_size
+        self.__idle = []
+        self.__slots = None  # created on first use, within the event loop
+
+    async def send(self, service, payload, qos=0, retain=False):
+        """Sends data to a specific service with an HTTP POST.
+        `qos` and `retain` have no meaning over HTTP."""
+        await self.send_bulk(((service, payload),))
+
+    async def send_bulk(self, messages):
+        """Sends several messages in a row over the same connection.
+        :param messages: iterable of `(service, payload)` pairs
+        """
+        if self.__slots is None:
+            self.__slots = asyncio.Semaphore(self.__pool_size)
+        async with self.__slots:
+            conn = self.__idle.pop() if self.__idle else None
+            try:
+                for service, payload in messages:
+                    if not service.startswith('/'):
+                        service = '/' + service
+                    if conn is None:
+                        conn = await self.__open()
+                        status, reason, keep_alive = await self.__post(conn, service, payload)
+                    else:
+                        try:
+                            status, reason, keep_alive = await self.__post(conn, service, payload)
+                        except (ConnectionError, asyncio.IncompleteReadError):
+                            # the server closed the idle connection: retry once
+                            conn.close()
+                            conn = await self.__open()
+                            status, reason, keep_alive = await self.__post(conn, service, payload)
+                    if not keep_alive:
+                        conn.close()
+                        conn = None
+                    if status < 200 or status > 299:
+                        raise self.TransportException(status, reason)
+            except BaseException:
+                if conn:
+                    conn.close()
+                raise
+            if conn:
+                self.__idle.append(conn)
+
+    def __post(self, conn, service, payload):
+        return asyncio.wait_for(conn.post(service, self.__headers, payload),
+                                self.__timeout)
+
+    async def __open(self):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.server, self.port, ssl=self.__ssl),
+            self.__timeout)
+        return _Connection(reader, writer)
+
+    async def _handle_connect(self):
+        pass  # connections are opened on demand
+
+    async def _handle_shutdown(self):
+        while self.__idle:
+            self.__idle.pop().close()
+
+    # Polling and topic subscription is not (yet) supported via REST
+
+    async def poll(self):
+        raise self.TransportException(lookup="NOT_IMPLEMENTED")
+
+    async def _handle_subscription(self, topic, callback):
+        raise self.TransportException(lookup="NOT_IMPLEMENTED")
@@ -0,0 +1,231 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+GreenVulcano Communication Library
+In-memory loopback Transport Implementation
+
+@author: Domenico Barra
+@contact: eisenach@gmail.com
+@license: LGPL v.3
+@change: 2026-10-16 - First version
+"""
+
+from ..gvlib import Transport
+from ..mixins import _DeviceInfo
+from ..topics import TopicIndex
+
+import collections
+import threading
+
+
+class LoopbackBroker(object):
+    """In-memory stand-in for an MQTT broker, connecting the
+    `LoopbackTransport`s of the same process.
+
+    Messages are routed with the MQTT rules for wildcards. Retained
+    messages are kept (an empty payload removes them) and delivered to new
+    subscriptions. `stop()` simulates a broker outage: all transports lose
+    their connection until `start()` is called and they connect again.
+    """
+
+    def __init__(self):
+        self.__lock = threading.RLock()
+        self.__subscriptions = TopicIndex()
+        self.__retained = {}  # topic -> (payload, qos)
+        self.__clients = set()
+        self.__online = True
+        self.__published = 0
+
+    @property
+    def online(self):
+        return self.__online
+
+    @property
+    def published(self):
+        """Number of messages received by the broker."""
+        return self.__published
+
+    @property
+    def retained(self):
+        """Dict of the retained messages, by topic."""
+        with self.__lock:
+            return {topic: msg[0] for topic, msg in self.__retained.items()}
+
+    def start(self):
+        """Makes the broker accept connections again after `stop()`."""
+        self.__online = True
+
+    def stop(self):
+        """Drops all connections and refuses new ones until `start()`."""
+        with self.__lock:
+            self.__online = False
+            clients = list(self.__clients)
+        for client in clients:
+            client._connection_lost(ConnectionError("Broker stopped"))
+
+    def _connect(self, client):
+        with self.__lock:
+            if not self.__online:
+                raise ConnectionRefusedError("Broker not available")
+            self.__clients.add(client)
+
+    def _disconnect(self, client, topic_filters, clean_session):
+        with self.__lock:
+            self.__clients.discard(client)
+            if clean_session:
+                for topic_filter in topic_filters:
+                    self.__subscriptions.remove(topic_filter, client)
+
+    def _subscribe(self, client, topic_filter):
+        with self.__lock:
+            self.__subscriptions.add(topic_filter, client)
+            if not self.__retained:
+                return
+            index = TopicIndex(cache_size=0)
+            index.add(topic_filter, client)
+            retained = [(topic, msg) for topic, msg in self.__retained.items()
+                        if index.match(topic)]
+        for topic, (payload, qos) in retained:
+            client._deliver(topic, payload, qos)
+
+    def _unsubscribe(self, client, topic_filter):
+        with self.__lock:
+            self.__subscriptions.remove(topic_filter, client)
+
+    def _publish(self, topic, payload, qos, retain):
+        with self.__lock:
+            if not self.__online:
+                raise ConnectionError("Broker not available")
+            self.__published += 1
+            if retain:
+                if payload:
+                    self.__retained[topic] = (payload, qos)
+                else:
+                    self.__retained.pop(topic, None)
+            clients = self.__subscriptions.match(topic)
+        for client in clients:
+            client._deliver(topic, payload, qos)
+
+
+class LoopbackTransport(Transport, _DeviceInfo):
+    """Implementation of `Transport` exchanging messages in memory through
+    a `LoopbackBroker`, for tests and benchmarks of everything above the
+    network.
+
+    With `reactive=True` (default) callbacks run as soon as a message is
+    published, in the publisher's thread; otherwise messages wait in an
+    inbound queue until `poll()`. QoS 0 messages are dropped when the
+    inbound queue already holds `max_inbound` messages, or when the
+    transport is disconnected; QoS 1 and 2 messages are never dropped and,
+    if `clean_session` is `False`, those published while the transport was
+    disconnected are delivered once it connects again.
+    """
+
+    def __init__(self, device_info, broker: LoopbackBroker, clean_session=True,
+                 reactive=True, max_inbound=10000):
+        Transport.__init__(self)
+        _DeviceInfo.__init__(self, device_info)
+        self.__broker = broker
+        self.__clean_session = clean_session
+        self.__reactive = reactive
+        self.__max_inbound = max_inbound
+        self.__inbound = collections.deque()
+        self.__filters = set()
+        self.__connected = False
+        self.__sent = 0
+        self.__received = 0
+
+    @property
+    def broker(self):
+        return self.__broker
+
+    @property
+    def connected(self):
+        return self.__connected
+
+    @property
+    def session_present(self):
+        """Without `clean_session` the broker keeps the subscriptions of a
+        disconnected transport."""
+        return not self.__clean_session
+
+    @property
+    def sent(self):
+        """Number of messages published through this transport."""
+        return self.__sent
+
+    @property
+    def received(self):
+        """Number of messages handed over to the callbacks."""
+        return self.__received
+
+    @property
+    def pending(self):
+        """Number of messages waiting for `poll()`."""
+        return len(self.__inbound)
+
+    def _handle_send(self, service, payload, qos=0, retain=False):
+        if not self.__connected:
+            raise self.TransportException(lookup="NOT_CONNECTED")
+        self.__broker._publish(service, payload, qos, retain)
+        self.__sent += 1
+
+    def poll(self):
+        inbound = self.__inbound
+        for _ in range(len(inbound)):
+            self.__received += 1
+            self.callback(*inbound.popleft())
+
+    def _handle_connect(self):
+        self.__broker._connect(self)
+        self.__connected = True
+        for topic_filter in self.__filters:
+            self.__broker._subscribe(self, topic_filter)
+        if self.__reactive:
+            self.poll()  # what arrived while disconnected
+
+    def _handle_reconnect(self, topics):
+        self._handle_connect()  # restores the subscriptions already
+
+    def _handle_shutdown(self):
+        self.__connected = False
+        self.__broker._disconnect(self, self.__filters, self.__clean_session)
+
+    def _handle_subscription(self, topic, callback):
+        self.__filters.add(topic)
+        if self.__connected:
+            self.__broker._subscribe(self, topic)
+
+    def _handle_unsubscription(self, topic):
+        self.__filters.discard(topic)
+        self.__broker._unsubscribe(self, topic)
+
+    def _deliver(self, topic, payload, qos):
+        """Called by the broker for each message matching a subscription."""
+        inbound = self.__inbound
+        if self.__connected and self.__reactive and not inbound:
+            self.__received += 1
+            self.callback(topic, payload)
+        elif qos or (self.__connected and len(inbound) < self.__max_inbound):
+            inbound.append((topic, payload))
+
+    def _connection_lost(self, reason):
+        """Called by the broker when it stops."""
+        self.__connected = False
+        self.__broker._disconnect(self, self.__filters, self.__clean_session)
+        Transport._connection_lost(self, reason)
@@ -25,57 +25,264 @@ MQTT Transport Implementation
 @change: 2015-07-24 - First version
 """
 
+from ..delivery import DeliveryTracker
 from ..gvlib import Transport
 from ..mixins import _ServerAndPort, _DeviceInfo
 
+import collections
+import logging
+import threading
+import time
+
 import paho.mqtt.client as mqtt
 
 
+_log = logging.getLogger(__name__)
+
+
 class MqttTransport(Transport, _DeviceInfo, _ServerAndPort):
-    """Implementation of `Transport` for MQTT"""
+    """Implementation of `Transport` for MQTT.
+
+    By default all network I/O happens in the caller's thread, during
+    `poll()`. With `threaded=True` the network loop runs on a background
+    thread instead: inbound messages are dispatched as soon as they arrive
+    (callbacks then run on that thread), `poll()` is not needed and `send()`
+    appends to an outbound queue of at most `max_queued` messages, drained
+    by a dedicated sender thread. `send()` raises a `TransportException`
+    (QUEUE_FULL) when the queue is full; it blocks only to take room in the
+    in-flight window for messages sent with qos 1 or 2 (see below).
+    A queued message the sender thread fails to publish goes to the outbox
+    if one is set (see `Transport.set_outbox`), its delivery completing as
+    `spilled`, and fails otherwise: it is never both failed and sent again.
+
+    A lost connection is reported to `_after_connection_lost(...)` and is
+    not re-established automatically: set a `gv.reconnect.Reconnector` to
+    do so. `reconnect()` waits up to `connect_timeout_sec` for the broker
+    to accept the connection, then restores all subscriptions with a single
+    SUBSCRIBE, unless the broker kept them in the session.
+
+    Messages sent with qos 1 or 2 are tracked until the broker acknowledges
+    them: `send(...)` returns their `gv.delivery.Delivery`, and at most
+    `max_in_flight` of them may wait for their acknowledgement at once,
+    further sends blocking (in the caller's thread mode, handling network
+    I/O meanwhile) for up to `window_timeout_sec` before raising a
+    `TransportException` (QUEUE_FULL). `shutdown()` waits up to
+    `shutdown_timeout_sec` for the messages in flight.
+    """
 
-    def __init__(self, device_info, server, port, clean_session=True, credentials=None, loop_wait_sec=0.1):
+    def __init__(self, device_info, server, port, clean_session=True, credentials=None, loop_wait_sec=0.1,
+                 threaded=False, max_queued=10000, connect_timeout_sec=10,
+                 max_in_flight=100, window_timeout_sec=30.0, shutdown_timeout_sec=10.0):
         self.__device_info = device_info
         self.__server = server
         self.__port = port
         self.__clean_session = clean_session
         self.__credentials = credentials
         self.__loop_wait_sec = loop_wait_sec
+        self.__threaded = threaded
+        self.__max_queued = max_queued
+        self.__outbox = collections.deque()
+        self.__outbox_ready = threading.Event()
+        self.__sender = None
+        self.__running = False
+        self.__connect_timeout_sec = connect_timeout_sec
+        self.__io_lock = threading.RLock()  # non-threaded mode: poll() vs reconnect()
+        self.__connack = threading.Event()
+        self.__connected = False
+        self.__session_present = False
+        self.__refusal = None
+        self.__reconnecting = False
+        self.__shutdown_timeout_sec = shutdown_timeout_sec
+        self.__tracker = DeliveryTracker(max_in_flight, window_timeout_sec)
+        self.__tracker._attach(None if threaded else self.__pump)
         
         Transport.__init__(self)
         _DeviceInfo.__init__(self, device_info)
         _ServerAndPort.__init__(self, server, port)
         
-        client = mqtt.Client(device_info.id, clean_session)
+        # reconnection is up to `reconnect()`, with subscriptions restored
+        client = mqtt.Client(device_info.id, clean_session, reconnect_on_failure=False)
 
         if credentials:
             client.username_pw_set(credentials[0], credentials[1])
             
         client.on_message = self.__on_message
         client.on_connect = self.__on_connect
+        client.on_disconnect = self.__on_disconnect
+        client.on_publish = self.__on_publish
+        client.max_inflight_messages_set(max_in_flight)
         self.__client = client
 
-    def send(self, service, payload, qos=0, retain=False):
-        self.__client.publish(service, payload, qos, retain)
+    @property
+    def threaded(self):
+        return self.__threaded
+
+    @property
+    def connected(self):
+        """`True` once the broker has accepted the connection, until it is
+        lost or shut down."""
+        return self.__connected
+
+    @property
+    def session_present(self):
+        return self.__session_present
+
+    @property
+    def queued(self):
+        """Number of messages waiting in the outbound queue (threaded mode)."""
+        return len(self.__outbox)
+
+    @property
+    def deliveries(self):
+        """The `gv.delivery.DeliveryTracker` of the messages sent with
+        qos 1 or 2 (see its `stats()`)."""
+        return self.__tracker
+
+    def wait_all(self, timeout=None):
+        return self.__tracker.wait_all(timeout)
+
+    def _handle_send(self, service, payload, qos=0, retain=False):
+        if not self.__threaded:
+            if not qos:
+                self.__publish(service, payload, qos, retain)
+                return None
+            delivery = self.__tracker.begin(service, qos)
+            spilling = self.outbox is not None  # it keeps the message on failure
+            try:
+                self.__tracker.track(delivery, lambda: self.__publish(service, payload, qos, retain),
+                                     fail=not spilling)
+            except self.TransportException:
+                if spilling:
+                    self.__tracker.spilled(delivery)
+                raise
+            except Exception as exc:
+                self.__tracker.failed(delivery, exc)  # sending it again is pointless
+                raise
+            return delivery
+        if len(self.__outbox) >= self.__max_queued:
+            raise self.TransportException(lookup="QUEUE_FULL")
+        delivery = self.__tracker.begin(service, qos) if qos else None
+        self.__outbox.append((service, payload, qos, retain, delivery))
+        self.__outbox_ready.set()
+        return delivery
+
+    def __publish(self, service, payload, qos, retain):
+        """Publishes a message, returning its message id."""
+        info = self.__client.publish(service, payload, qos, retain)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise self.TransportException(info.rc, mqtt.error_string(info.rc))
+        return info.mid
     
     def poll(self):
-        self.__client.loop(self.__loop_wait_sec)
+        if self.__threaded:
+            return
+        self.__pump(self.__loop_wait_sec)
+
+    def __pump(self, timeout):
+        """Runs the network loop in the caller's thread."""
+        with self.__io_lock:
+            rc = self.__client.loop(timeout)
+        if rc == mqtt.MQTT_ERR_NO_CONN:
+            time.sleep(timeout)  # do not spin while disconnected
 
     def _handle_connect(self):
         self.__client.connect(self.__server, self.__port, bind_address=self.__device_info.ip)
+        if self.__threaded:
+            self.__client.loop_start()
+            self.__running = True
+            self.__sender = threading.Thread(target=self.__send_loop,
+                                             name="gv-mqtt-sender", daemon=True)
+            self.__sender.start()
+
+    def _handle_reconnect(self, topics):
+        client = self.__client
+        with self.__io_lock:
+            self.__reconnecting = True
+            try:
+                if self.__threaded:
+                    client.loop_stop()  # the network thread ends with the connection
+                self.__connack.clear()
+                self.__refusal = None
+                client.reconnect()
+                if self.__threaded:
+                    client.loop_start()
+                    self.__connack.wait(self.__connect_timeout_sec)
+                else:
+                    deadline = time.monotonic() + self.__connect_timeout_sec
+                    while not self.__connack.is_set() and time.monotonic() < deadline:
+                        if client.loop(self.__loop_wait_sec) != mqtt.MQTT_ERR_SUCCESS:
+                            break
+            finally:
+                self.__reconnecting = False
+            if not self.__connected:
+                if self.__refusal:
+                    raise self.__refusal
+                raise self.TransportException(lookup="NOT_CONNECTED")
+            if topics and not self.__session_present:
+                rc = client.subscribe([(topic, 0) for topic in topics])[0]
+                if rc != mqtt.MQTT_ERR_SUCCESS:
+                    raise self.TransportException(rc, mqtt.error_string(rc))
 
     def _handle_shutdown(self):
+        if self.__sender:
+            self.__running = False
+            self.__outbox_ready.set()
+            self.__sender.join()
+            self.__sender = None
+            self.__drain_outbox()  # whatever was queued after the last wakeup
+        tracker = self.__tracker
+        if self.__connected and not tracker.wait_all(self.__shutdown_timeout_sec):
+            _log.warning("Shutting down with %d messages not acknowledged", tracker.in_flight)
+        self.__connected = False
         self.__client.disconnect()
+        if self.__threaded:
+            self.__client.loop_stop()
+        tracker.fail_all(self.TransportException(lookup="NOT_CONNECTED"))
+
+    def __send_loop(self):
+        """Body of the sender thread: publishes queued messages until
+        shutdown."""
+        while self.__running:
+            self.__outbox_ready.wait()
+            self.__outbox_ready.clear()
+            self.__drain_outbox()
+
+    def __drain_outbox(self):
+        outbox = self.__outbox
+        publish, tracker = self.__publish, self.__tracker
+        while outbox:
+            service, payload, qos, retain, delivery = outbox.popleft()
+            spilling = self.outbox is not None
+            try:
+                if delivery is None:
+                    publish(service, payload, qos, retain)
+                else:
+                    tracker.track(delivery, lambda: publish(service, payload, qos, retain),
+                                  fail=not spilling)
+            except self.TransportException as exc:
+                if spilling:
+                    self._spill(service, payload, qos, retain)
+                    if delivery is not None:
+                        tracker.spilled(delivery)
+                elif delivery is None:
+                    _log.warning("Message to %s lost: %s", service, exc)
+            except Exception as exc:  # e.g. an invalid topic: sending it again is pointless
+                _log.error("Message to %s rejected: %r", service, exc)
+                if delivery is not None:
+                    tracker.failed(delivery, exc)
         
     def _handle_subscription(self, topic, callback):
         self.__client.subscribe(topic)
 
+    def _handle_unsubscription(self, topic):
+        self.__client.unsubscribe(topic)
+
     CONNECT_RESULT_CODES = (
         "Connection successful",       # 0
         "Incorrect protocol version",  # 1
         "Invalid client identifier",   # 2
         "Server unavailable",          # 3
-        "Bad username or password"     # 4
+        "Bad username or password",    # 4
         "Not authorized"               # 5
     )
 
@@ -85,13 +292,33 @@ class MqttTransport(Transport, _DeviceInfo, _ServerAndPort):
         userdata: the private user data as set in Client() or userdata_set()
         flags: response flags sent by the broker
         rc: the connection result, see `CONNECT_RESULT_CODES`
+        Runs on the network loop's thread: errors are reported, not raised.
         """
         if rc != 0:
             if 0 < rc < len(self.CONNECT_RESULT_CODES):
                 msg = self.CONNECT_RESULT_CODES[rc]
             else:
                 msg = "Unknown connect result code: %d" % rc
-            raise ConnectionError(msg)
+            _log.warning("Connection to %s:%d refused: %s", self.__server, self.__port, msg)
+            self.__refusal = self.TransportException(rc, msg)
+        else:
+            self.__session_present = bool(flags.get('session present'))
+            self.__connected = True
+        self.__connack.set()
+
+    def __on_disconnect(self, client, userdata, rc):
+        """Called when the connection to the broker is closed.
+        rc: 0 if it was closed by `disconnect()`, an error code otherwise
+        """
+        was_connected, self.__connected = self.__connected, False
+        if rc != mqtt.MQTT_ERR_SUCCESS and not self.__reconnecting:
+            reason = self.__refusal if not was_connected and self.__refusal else \
+                self.TransportException(rc, mqtt.error_string(rc))
+            self._connection_lost(reason)
+
+    def __on_publish(self, client, userdata, mid):
+        """Called when a message has been sent (qos 0) or acknowledged."""
+        self.__tracker.acked(mid)
 
     def __on_message(self, client, userdata, msg):
         """Called when the broker sends us a message.
@@ -28,47 +28,310 @@ Rest Transport Implementation
 from ..gvlib import Transport
 from ..mixins import _ServerAndPort, _DeviceInfo
 
+import base64
+import http.client
+import json
+import logging
+import queue
+import random
+import socket
+import threading
+import urllib.parse
+
 import httplib2
 
 
+_log = logging.getLogger(__name__)
+
+LONG_POLL = 'long_poll'
+STREAM = 'stream'
+
+
 class RestTransport(Transport, _DeviceInfo, _ServerAndPort):
-    """Implementation of `Transport` over REST/HTTP"""
+    """Implementation of `Transport` over REST/HTTP.
+    HTTP/1.1 connections are kept alive and reused across sends: up to
+    `pool_size` of them can be open at once (one for each thread sending
+    concurrently); callers exceeding that number wait for a free one.
+    `content_type` must match the codec of the protocol (see `gv.codecs`).
+
+    Subscriptions are served by the device's inbox on the server,
+    `GET /devices/<device id>/inbox?topics=<filters>[&since=<cursor>]`,
+    where `topics` are the comma-separated topic filters subscribed to:
+    with `receive=LONG_POLL`, each request is held by the server for up to
+    `hold_sec` seconds until messages arrive, then answered with
+    `{"cursor": <cursor>, "messages": [...]}`; with `receive=STREAM`, a
+    single request (with `&stream=1`) gets a never-ending
+    `text/event-stream` response, one event per message, each with its
+    cursor as `id` (a stream staying silent, not even sending comments as
+    heartbeats, for `hold_sec` + 10 seconds is quietly opened again).
+    Messages are `{"topic": ..., "payload": <text>}` (or
+    `"payload_b64"` for binary payloads). The cursor of the last message
+    received is sent back on the next request, so nothing is lost across
+    requests. Messages are received by a background thread, which runs the
+    callbacks: `poll()` has nothing left to do. It starts on `connect()`
+    (nothing is requested before). Failed requests are retried
+    after an exponential backoff, from `backoff_sec` up to
+    `max_backoff_sec`, with jitter.
+    """
 
     def __init__(self, device_info, server, port,
-                 credentials=None, use_https=False, timeout=None):
+                 credentials=None, use_https=False, timeout=None,
+                 pool_size=4, keep_alive=True,
+                 content_type="application/json; charset=utf-8",
+                 receive=LONG_POLL, hold_sec=25.0, backoff_sec=0.5, max_backoff_sec=30.0):
+        if receive not in (LONG_POLL, STREAM):
+            raise ValueError("Unknown receive mode: %s" % receive)
         Transport.__init__(self)
         _DeviceInfo.__init__(self, device_info)
         _ServerAndPort.__init__(self, server, port)
         self.__use_https = use_https
-        self.__http = httplib2.Http(timeout=timeout)
+        self.__timeout = timeout
+        self.__credentials = credentials
+        self.__keep_alive = keep_alive
+        self.__base_url = "%s://%s:%d" % (
+            "https" if use_https else "http", server, port)
+        self.__headers = {
+            "Content-Type" : content_type,
+            "Host"         : device_info.ip,
+            "Connection"   : "keep-alive" if keep_alive else "close"
+        }
+        self.__idle = queue.LifoQueue()  # most recently used first: warmest
+        self.__slots = threading.BoundedSemaphore(pool_size)
+        self.__receive = receive
+        self.__hold_sec = hold_sec
+        self.__backoff_sec = backoff_sec
+        self.__max_backoff_sec = max_backoff_sec
+        self.__inbox = "/devices/%s/inbox" % urllib.parse.quote(device_info.id, safe='')
+        self.__inbound_headers = {"Accept": "text/event-stream" if receive == STREAM
+                                  else "application/json"}
         if credentials:
-            self.__http.add_credentials(credentials[0], credentials[1])
-    
-    def send(self, service, payload):
-        resp, cont = self.__http.request(
-                "%s//%s:%d/%s" % (
-                                "https" if self.__use_https else "http",
-                                self.server, self.port, service),
-                method="POST",
-                body=payload,
-                headers = {
-                    "Content-Type" : "application/json; charset=utf-8",
-                    "Host"         : self.device_info.ip,
-                    "Connection"   : "close"  # TODO: CHANGE THIS!
-                })
+            token = base64.b64encode(('%s:%s' % tuple(credentials)).encode('utf-8'))
+            self.__inbound_headers["Authorization"] = "Basic " + token.decode('ascii')
+        self.__topics = []
+        self.__cursor = None
+        self.__inbound = None  # connection of the current inbound request
+        self.__inbound_sock = None  # its socket, kept by the response if closing
+        self.__receiver = None
+        self.__connected = False
+        self.__changed = threading.Event()
+        self.__stopping = threading.Event()
+        self.__lock = threading.Lock()
+
+    def _handle_send(self, service, payload, qos=0, retain=False):
+        """Sends data to a specific service with an HTTP POST.
+        `qos` and `retain` are accepted for compatibility with the other
+        transports, but have no meaning over HTTP.
+        """
+        http = self.__acquire()
+        try:
+            self.__post(http, service, payload)
+        finally:
+            self.__release(http)
+
+    def send_bulk(self, messages):
+        """Sends several messages in a row over the same connection.
+        :param messages: iterable of `(service, payload)` pairs
+        """
+        http = self.__acquire()
+        try:
+            for service, payload in messages:
+                self.__post(http, service, payload)
+        finally:
+            self.__release(http)
+
+    def __post(self, http, service, payload):
+        if not service.startswith('/'):
+            service = '/' + service
+        resp, cont = http.request(self.__base_url + service,
+                                  method="POST",
+                                  body=payload,
+                                  headers=self.__headers)
         if resp.status < 200 or resp.status > 299:
             raise self.TransportException(resp.status, resp.reason)
 
+    def __acquire(self):
+        self.__slots.acquire()
+        try:
+            return self.__idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            http = httplib2.Http(timeout=self.__timeout)
+            if self.__credentials:
+                http.add_credentials(self.__credentials[0], self.__credentials[1])
+            return http
+        except:
+            self.__slots.release()
+            raise
+
+    def __release(self, http):
+        if not self.__keep_alive:
+            http.close()
+        self.__idle.put(http)
+        self.__slots.release()
+
     def _handle_connect(self):
-        pass  # Nothing specific for now - TODO: insert a connection check at least
+        self.__connected = True
+        if self.__topics:
+            self.__start_receiver()
 
     def _handle_shutdown(self):
-        Transport._handle_shutdown(self) # no specific shutdown handling
-        
-    # Polling and topic subscription is not (yet) supported via REST
-    
+        with self.__lock:
+            self.__connected = False
+            receiver, self.__receiver = self.__receiver, None
+            self.__stopping.set()
+            self.__abort_inbound()
+        if receiver is not None and receiver is not threading.current_thread():
+            receiver.join()
+        while True:
+            try:
+                self.__idle.get_nowait().close()
+            except queue.Empty:
+                break
+
     def poll(self):
-        Transport.poll(self)
-        
+        pass  # messages are received by a background thread
+
     def _handle_subscription(self, topic, callback):
-        Transport._handle_subscription(self, topic, callback)
+        with self.__lock:
+            if topic not in self.__topics:
+                self.__topics.append(topic)
+                self.__topics_changed()
+        if self.__connected:
+            self.__start_receiver()
+
+    def _handle_unsubscription(self, topic):
+        with self.__lock:
+            if topic in self.__topics:
+                self.__topics.remove(topic)
+                self.__topics_changed()
+
+    def __topics_changed(self):
+        """Makes the receiver start a new request for the new topics
+        (called holding the lock)."""
+        self.__changed.set()
+        self.__abort_inbound()
+
+    def __abort_inbound(self):
+        sock = self.__inbound_sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # wakes up the receiver
+            except OSError:
+                pass
+
+    def __start_receiver(self):
+        with self.__lock:
+            if self.__receiver is not None:
+                return
+            self.__stopping.clear()
+            self.__receiver = threading.Thread(target=self.__receive_loop,
+                                               name="gv-rest-receiver", daemon=True)
+            self.__receiver.start()
+
+    def __receive_loop(self):
+        failures = 0
+        while not self.__stopping.is_set():
+            with self.__lock:
+                self.__changed.clear()
+                topics = list(self.__topics)
+            if not topics:
+                self.__changed.wait(1.0)
+                continue
+            try:
+                if self.__receive == STREAM:
+                    self.__stream(topics)
+                else:
+                    self.__long_poll(topics)
+                failures = 0
+            except Exception as exc:
+                self.__close_inbound()
+                if self.__stopping.is_set() or self.__changed.is_set():
+                    continue  # aborted on purpose
+                failures += 1
+                _log.warning("Inbound request failed (%d in a row): %s", failures, exc)
+                if failures == 1:
+                    self._connection_lost(exc)
+                delay = min(self.__max_backoff_sec,
+                            self.__backoff_sec * 2 ** (failures - 1))
+                self.__stopping.wait(delay * (0.5 + random.random() / 2))
+        self.__close_inbound()
+
+    def __request(self, topics, stream):
+        query = {"topics": ','.join(topics), "wait": "%g" % self.__hold_sec}
+        if self.__cursor is not None:
+            query["since"] = self.__cursor
+        if stream:
+            query["stream"] = 1
+        with self.__lock:
+            conn = self.__inbound
+            if conn is None:
+                cls = (http.client.HTTPSConnection if self.__use_https
+                       else http.client.HTTPConnection)
+                conn = self.__inbound = cls(self.server, self.port,
+                                            timeout=self.__hold_sec + 10.0)
+        conn.request("GET", self.__inbox + '?' + urllib.parse.urlencode(query),
+                     headers=self.__inbound_headers)
+        with self.__lock:
+            # a response read until the server closes takes the socket away
+            # from the connection: keep it at hand to abort the request
+            self.__inbound_sock = conn.sock
+            if self.__stopping.is_set() or self.__changed.is_set():
+                self.__abort_inbound()
+        resp = conn.getresponse()
+        if resp.status != 200:
+            resp.read()
+            raise self.TransportException(resp.status, resp.reason)
+        return resp
+
+    def __long_poll(self, topics):
+        resp = self.__request(topics, False)
+        answer = json.loads(resp.read())
+        if resp.will_close:
+            self.__close_inbound()
+        for message in answer["messages"]:
+            self.__deliver(message)
+        self.__cursor = answer["cursor"]
+
+    def __stream(self, topics):
+        resp = self.__request(topics, True)
+        cursor = data = None
+        while not (self.__stopping.is_set() or self.__changed.is_set()):
+            try:
+                line = resp.readline()
+            except socket.timeout:
+                _log.debug("Inbound stream silent for too long, opening it again")
+                break
+            if not line:
+                raise ConnectionError("Inbound stream closed by the server")
+            line = line.rstrip(b'\r\n')
+            if not line:  # end of an event
+                if data is not None:
+                    self.__deliver(json.loads(data))
+                if cursor is not None:
+                    self.__cursor = cursor
+                cursor = data = None
+                continue
+            field, _, value = line.partition(b':')
+            if value.startswith(b' '):
+                value = value[1:]
+            if field == b'id':
+                cursor = int(value)
+            elif field == b'data':
+                data = value if data is None else data + b'\n' + value
+            # other fields and comments (heartbeats) are ignored
+        self.__close_inbound()
+
+    def __deliver(self, message):
+        if "payload_b64" in message:
+            payload = base64.b64decode(message["payload_b64"])
+        else:
+            payload = message["payload"].encode('utf-8')
+        self.callback(message["topic"], payload)
+
+    def __close_inbound(self):
+        with self.__lock:
+            conn, self.__inbound = self.__inbound, None
+            self.__inbound_sock = None
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,187 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import json
+import socket
+import time
+
+import pytest
+
+from gv import DeviceInfo
+from gv.aio import AsyncGVComm, AsyncTransport
+from gv.gvlib import TransportListener
+from gv.protocols import AsyncGVProtocol_v1
+
+
+def _me():
+    return DeviceInfo("dev", "device", "127.0.0.1", 0)
+
+
+class _AsyncRecorder(AsyncTransport):
+    def __init__(self):
+        AsyncTransport.__init__(self)
+        self.sent = []
+        self.topics = []
+
+    async def send(self, service, payload, qos=0, retain=False):
+        self.sent.append((service, json.loads(payload), qos, retain))
+
+    async def _handle_connect(self):
+        pass
+
+    async def _handle_shutdown(self):
+        pass
+
+    async def _handle_subscription(self, topic, callback):
+        self.topics.append(topic)
+
+
+class _Events(TransportListener):
+    def __init__(self):
+        self.events = []
+
+    def _after_connect(self, info):
+        self.events.append(("connect", None))
+
+    def _after_connection_unsuccessful(self, info):
+        self.events.append(("unsuccessful", info.failure_reason))
+
+
+def test_mqtt_connect_times_out_without_connack():
+    pytest.importorskip("paho.mqtt.client")
+    from gv.transports.aio_mqtt import AsyncMqttTransport
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)  # accepts, never answers
+    try:
+        transport = AsyncMqttTransport(_me(), *server.getsockname(), connect_timeout_sec=0.3)
+        events = _Events()
+        transport.add_listener(events)
+        start = time.monotonic()
+        asyncio.run(transport.connect())
+        assert time.monotonic() - start < 5
+        [(event, reason)] = events.events
+        assert event == "unsuccessful"
+        assert isinstance(reason, AsyncMqttTransport.TransportException)
+        assert reason.code == AsyncMqttTransport.TransportException.ERRORS["NOT_CONNECTED"][0]
+    finally:
+        server.close()
+
+
+def test_comm_sends_the_v1_messages():
+    transport = _AsyncRecorder()
+    comm = AsyncGVComm(_me(), transport, AsyncGVProtocol_v1(transport, _me()))
+
+    async def run():
+        await comm.connect()
+        await comm.add_device()
+        await comm.add_sensor("s", "temp", "NUMERIC")
+        await comm.send_data("s", 1)
+        await comm.send_data("s", 2, qos=1, timestamp=5.0)
+        await comm.sensor("s").send(3)
+        await comm.send_data_batch([("s", 4), ("t", 5, 6.0)])
+        await comm.shutdown()
+
+    asyncio.run(run())
+    assert transport.sent == [
+        ("/devices/dev/status", {"status": "true"}, 1, True),
+        ("/devices/dev", {"nm": "device", "ip": "127.0.0.1", "prt": "0"}, 0, False),
+        ("/devices/dev/sensors/s", {"nm": "temp", "tp": "NUMERIC"}, 0, False),
+        ("/devices/dev/sensors/s/output", {"value": 1}, 0, False),
+        ("/devices/dev/sensors/s/output", {"value": 2, "ts": 5.0}, 1, False),
+        ("/devices/dev/sensors/s/output", {"value": 3}, 0, False),
+        ("/devices/dev/output", {"data": [{"id": "s", "value": 4},
+                                          {"id": "t", "value": 5, "ts": 6.0}]}, 0, False),
+        ("/devices/dev/status", {"status": "false"}, 1, True)]
+
+
+def test_batches_without_batch_support_are_sent_one_by_one():
+    transport = _AsyncRecorder()
+    comm = AsyncGVComm(_me(), transport,
+                       AsyncGVProtocol_v1(transport, _me(), batch_support=False))
+    asyncio.run(comm.send_data_batch([("s", 1), ("s", 2, 3.0)]))
+    assert [message[:2] for message in transport.sent] == [
+        ("/devices/dev/sensors/s/output", {"value": 1}),
+        ("/devices/dev/sensors/s/output", {"value": 2, "ts": 3.0})]
+
+
+def test_callbacks_may_be_coroutines():
+    transport = _AsyncRecorder()
+    comm = AsyncGVComm(_me(), transport, AsyncGVProtocol_v1(transport, _me()))
+    received = []
+
+    async def on_command(payload):
+        await asyncio.sleep(0)
+        received.append(payload)
+        return payload.upper()
+
+    async def run():
+        await comm.add_actuator("a", "switch", "BOOLEAN", on_command)
+        await comm.add_callback("/devices/dev/actuators/a/input", received.append)
+        await transport.callback("/devices/dev/actuators/a/input", "on")
+        await transport.callback("/devices/dev/actuators/b/input", "off")
+
+    asyncio.run(run())
+    assert transport.topics == ["/devices/dev/actuators/a/input"]
+    assert received == ["on", "ON"]  # callbacks chained in order
+
+
+def test_mqtt_publish_and_subscribe():
+    pytest.importorskip("paho.mqtt.client")
+    from gv.standins import MqttStandIn
+    from gv.transports.aio_mqtt import AsyncMqttTransport
+
+    async def run(address):
+        transport = AsyncMqttTransport(_me(), *address, connect_timeout_sec=5)
+        events = _Events()
+        transport.add_listener(events)
+        received = asyncio.Queue()
+        await transport.connect()
+        assert events.events == [("connect", None)]
+        try:
+            await transport.subscribe("/devices/dev/actuators/#", received.put)
+            for qos in (0, 1, 2):
+                await transport.send("/devices/dev/actuators/a/input", "qos%d" % qos, qos)
+            return [await asyncio.wait_for(received.get(), 5) for _ in range(3)]
+        finally:
+            await transport.shutdown()
+
+    with MqttStandIn() as broker:
+        assert asyncio.run(run(broker.address)) == [b"qos0", b"qos1", b"qos2"]
+
+
+def test_rest_posts_concurrent_and_bulk_messages():
+    from gv.standins import HttpStandIn
+    from gv.transports.aio_rest import AsyncRestTransport
+
+    async def run(address):
+        transport = AsyncRestTransport(_me(), *address, timeout=5, pool_size=2)
+        await transport.connect()
+        try:
+            await asyncio.gather(*(transport.send("/devices/dev/sensors/s/output",
+                                                  '{"value":%d}' % i) for i in range(10)))
+            await transport.send_bulk([("devices/dev/status", '{"status":"true"}')] * 2)
+        finally:
+            await transport.shutdown()
+
+    with HttpStandIn() as server:
+        asyncio.run(run(server.address))
+        requests = server.requests
+    assert sorted(body for path, body in requests[:10]) == sorted(
+        ('{"value":%d}' % i).encode() for i in range(10))
+    assert requests[10:] == [("/devices/dev/status", b'{"status":"true"}')] * 2
@@ -0,0 +1,144 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+from gv import DefaultProtocol, DeviceInfo, GVComm
+from gv.batching import DataBatcher
+from gv.gvlib import Protocol
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Recorder(object):
+    def __init__(self):
+        self.batches = []
+
+    def send_data_batch(self, readings, qos=0, retain=False):
+        self.batches.append((list(readings), qos, retain))
+
+
+def test_flushes_on_max_items():
+    protocol = _Recorder()
+    batcher = DataBatcher(protocol, max_items=3, max_latency_sec=None)
+    for i in range(7):
+        batcher.add("s", i)
+    assert [len(b[0]) for b in protocol.batches] == [3, 3]
+    assert batcher.pending == 1
+    batcher.flush()
+    assert protocol.batches[-1] == ([("s", 6)], 0, False) and batcher.pending == 0
+
+
+def test_flushes_on_max_bytes():
+    protocol = _Recorder()
+    batcher = DataBatcher(protocol, max_items=None, max_bytes=100, max_latency_sec=None)
+    batcher.add("sensor", "x" * 30)  # 6 + 30 + 20 bytes
+    assert protocol.batches == []
+    batcher.add("sensor", "y" * 30)
+    assert len(protocol.batches) == 1 and len(protocol.batches[0][0]) == 2
+
+
+def test_flushes_on_latency():
+    protocol, clock = _Recorder(), Clock()
+    batcher = DataBatcher(protocol, max_items=100, max_latency_sec=1.0, clock=clock)
+    batcher.add("s", 1, timestamp=10.0)
+    clock.now = 0.5
+    batcher.check()
+    assert protocol.batches == []
+    clock.now = 1.0
+    batcher.add("s", 2)  # add() checks the latency too
+    assert protocol.batches == [([("s", 1, 10.0), ("s", 2)], 0, False)]
+
+
+def test_separates_qos_and_retain():
+    protocol = _Recorder()
+    batcher = DataBatcher(protocol, max_items=2, max_latency_sec=None)
+    batcher.add("a", 1)
+    batcher.add("b", 2, qos=1)
+    batcher.add("c", 3, retain=True)
+    assert protocol.batches == []
+    batcher.add("d", 4, qos=1)
+    assert protocol.batches == [([("b", 2), ("d", 4)], 1, False)]
+    batcher.flush()
+    assert sorted(protocol.batches[1:]) == [([("a", 1)], 0, False), ([("c", 3)], 0, True)]
+
+
+def _comm(protocol_factory=DefaultProtocol):
+    broker = LoopbackBroker()
+    backend = LoopbackTransport(DeviceInfo("backend", "backend", "127.0.0.1", 0), broker)
+    backend.connect()
+    received = []
+    backend.subscribe("/devices/dev/#", received.append)
+    me = DeviceInfo("dev", "device", "127.0.0.1", 0)
+    transport = LoopbackTransport(me, broker)
+    comm = GVComm(me, transport, protocol_factory(transport, me))
+    comm.connect()
+    del received[:]  # the status sent on connect
+    return comm, received
+
+
+def test_gv_comm_sends_batches():
+    comm, received = _comm()
+    comm.enable_batching(max_items=3, max_latency_sec=None)
+    comm.send_data("s", 1)
+    comm.send_data("s", 2, timestamp=5.0)
+    assert len(received) == 0
+    comm.send_data("t", 3)
+    assert json.loads(received[-1]) == {"data": [{"id": "s", "value": 1},
+                                                 {"id": "s", "value": 2, "ts": 5.0},
+                                                 {"id": "t", "value": 3}]}
+    comm.send_data("s", 4)
+    comm.shutdown()  # flushes the pending batch
+    assert json.loads(received[-2]) == {"data": [{"id": "s", "value": 4}]}
+
+
+class _LegacyProtocol(Protocol):
+    """Written before timestamps: four-argument send_data()."""
+
+    def __init__(self, transport, device_info):
+        Protocol.__init__(self, transport)
+        self.readings = []
+
+    def add_device(self):
+        pass
+
+    def add_sensor(self, id_, name, type_):
+        pass
+
+    def add_actuator(self, id_, name, type_):
+        pass
+
+    def send_status(self, status):
+        pass
+
+    def send_data(self, id_, value, qos=0, retain=False):
+        self.readings.append((id_, value))
+
+
+def test_batches_reach_protocols_without_batch_support():
+    comm, _ = _comm(_LegacyProtocol)
+    comm.enable_batching(max_items=2, max_latency_sec=None)
+    comm.send_data("s", 1)
+    comm.send_data("s", 2)
+    assert comm.protocol.readings == [("s", 1), ("s", 2)]
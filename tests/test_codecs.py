@@ -0,0 +1,81 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+
+import pytest
+
+from gv.codecs import CborCodec, JsonCodec
+
+
+@pytest.mark.parametrize("value, encoded", [
+    (0, "00"), (23, "17"), (24, "1818"), (255, "18ff"), (256, "190100"),
+    (65536, "1a00010000"), (2 ** 32, "1b0000000100000000"), (-1, "20"),
+    (-500, "3901f3"), (1.5, "fa3fc00000"), (1.1, "fb3ff199999999999a"),
+    (True, "f5"), (False, "f4"), (None, "f6"), ("a", "6161"),
+    (b"\x01\x02", "420102"), ([1, [2]], "82018102"), ({"a": 1}, "a1616101"),
+])
+def test_cbor_encodes_rfc_7049_items(value, encoded):
+    codec = CborCodec()
+    assert codec.encode(value).hex() == encoded
+    assert codec.decode(bytes.fromhex(encoded)) == value
+
+
+def test_cbor_round_trips_messages():
+    codec = CborCodec()
+    message = {"data": [{"id": "s%d" % i, "value": i * 0.1, "ts": 1760000000 + i}
+                        for i in range(30)], "nested": {"ok": True, "none": None}}
+    assert codec.decode(codec.encode(message)) == message
+
+
+@pytest.mark.parametrize("value", [2 ** 64 - 1, 2 ** 64, 2 ** 100, -2 ** 64, -2 ** 64 - 1, -2 ** 90])
+def test_cbor_encodes_big_integers(value):
+    codec = CborCodec()
+    assert codec.decode(codec.encode(value)) == value
+
+
+def test_cbor_encodes_datetimes_as_epoch_timestamps():
+    codec = CborCodec()
+    when = datetime.datetime(2026, 10, 16, 12, 30, tzinfo=datetime.timezone.utc)
+    payload = codec.encode({"ts": when})
+    assert payload[4] == 0xc1
+    assert codec.decode(payload) == {"ts": when}
+
+
+def test_cbor_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        CborCodec().encode({"value": object()})
+
+
+def test_json_encodes_datetimes_as_epoch_timestamps():
+    when = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    assert JsonCodec().encode({"ts": when}) == '{"ts":1767225600.0}'
+
+
+def test_json_decodes_bytes():
+    assert JsonCodec().decode(b'{"value":"\xc3\xa9"}') == {"value": "é"}
+
+
+def test_numpy_values():
+    np = pytest.importorskip("numpy")
+    message = {"i": np.int64(5), "f": np.float32(1.5), "b": np.bool_(True), "u": np.uint8(7)}
+    assert JsonCodec().encode(message) == '{"i":5,"f":1.5,"b":true,"u":7}'
+    cbor = CborCodec()
+    assert cbor.decode(cbor.encode(message)) == {"i": 5, "f": 1.5, "b": True, "u": 7}
+    values = np.arange(5, dtype=np.int16)
+    assert cbor.decode(cbor.encode({"values": cbor.array(values)})) == {"values": [0, 1, 2, 3, 4]}
+    assert JsonCodec().array(values) == [0, 1, 2, 3, 4]
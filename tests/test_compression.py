@@ -0,0 +1,56 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import zlib
+
+import pytest
+
+from gv.codecs import JsonCodec
+from gv.compression import CompressedCodec, SharedDictionary
+
+
+def _batch(n):
+    return {"data": [{"id": "temp", "value": 20 + i * 0.5, "ts": 1760000000 + i}
+                     for i in range(n)]}
+
+
+def test_round_trips_plain_and_compressed_payloads():
+    dictionary = SharedDictionary.train(1, [JsonCodec().encode(_batch(3)) for _ in range(5)])
+    codec = CompressedCodec(JsonCodec(), 'zlib', dictionary)
+    small, large = {"value": 1}, _batch(50)
+    assert isinstance(codec.encode(small), str)
+    payload = codec.encode(large)
+    assert payload[0] == 0x1f and len(payload) < len(JsonCodec().encode(large))
+    assert codec.decode(codec.encode(small)) == small
+    assert codec.decode(payload) == large
+
+
+def test_content_type_names_codec_and_method():
+    codec = CompressedCodec(JsonCodec())
+    assert codec.content_type == "application/x-gv-compressed; codec=json; method=zlib"
+    assert codec.content_type != JsonCodec.content_type
+
+
+def test_refuses_payloads_too_large_once_decompressed():
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    bomb = b'\x1f\x01\x00\x00' + compressor.compress(b' ' * (1 << 22)) + compressor.flush()
+    assert len(bomb) < 8192
+    codec = CompressedCodec(JsonCodec(), max_size=1 << 20)
+    with pytest.raises(ValueError):
+        codec.decompress(bomb)
+    exact = CompressedCodec(JsonCodec(), max_size=1 << 22)
+    assert len(exact.decompress(bomb)) == 1 << 22
@@ -0,0 +1,158 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+import pytest
+
+from gv.delivery import DeliveryTracker
+from gv.gvlib import Transport
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ack_completes_delivery():
+    clock = Clock()
+    tracker = DeliveryTracker(clock=clock)
+    delivery = tracker.begin("topic", 1)
+    tracker.track(delivery, lambda: 7)
+    done = []
+    delivery.add_done_callback(done.append)
+    assert not delivery.done() and tracker.in_flight == 1
+    clock.now = 0.25
+    tracker.acked(7)
+    assert delivery.acked and delivery.latency == 0.25 and done == [delivery]
+    assert delivery.wait(0)
+    assert tracker.in_flight == 0
+    stats = tracker.stats()
+    assert stats["acked"] == 1 and stats["latency"]["min"] == 0.25
+
+
+def test_ack_before_publish_returns_is_not_missed():
+    tracker = DeliveryTracker()
+    delivery = tracker.begin("topic", 1)
+
+    def publish():
+        tracker.acked(3)  # e.g. from the network thread, before the mid is known
+        return 3
+
+    tracker.track(delivery, publish)
+    assert delivery.acked and tracker.in_flight == 0
+
+
+def test_early_acks_are_forgotten_after_publishing():
+    tracker = DeliveryTracker()
+    first = tracker.begin("topic", 1)
+    tracker.track(first, lambda: (tracker.acked(9), 1)[1])
+    second = tracker.begin("topic", 1)
+    tracker.track(second, lambda: 9)  # 9 was acked for an earlier, unknown message
+    assert not second.done()
+
+
+def test_early_ack_race_with_network_thread():
+    tracker = DeliveryTracker(max_in_flight=10000)
+    keys = iter(range(1, 100001))
+    lock = threading.Lock()
+    published = []
+    stop = threading.Event()
+
+    def publish():
+        with lock:
+            key = next(keys)
+            published.append(key)
+        return key
+
+    def network():
+        seen = 0
+        while not stop.is_set() or seen < len(published):
+            with lock:
+                pending = published[seen:]
+            for key in pending:
+                tracker.acked(key)
+            seen += len(pending)
+
+    thread = threading.Thread(target=network)
+    thread.start()
+    deliveries = []
+    for _ in range(2000):
+        delivery = tracker.begin("topic", 1)
+        tracker.track(delivery, publish)
+        deliveries.append(delivery)
+    stop.set()
+    thread.join()
+    assert tracker.wait_all(5)
+    assert all(delivery.acked for delivery in deliveries)
+
+
+def test_full_window_times_out():
+    tracker = DeliveryTracker(max_in_flight=2, window_timeout_sec=0.01)
+    for key in (1, 2):
+        tracker.track(tracker.begin("topic", 1), lambda: key)
+    with pytest.raises(Transport.TransportException) as info:
+        tracker.begin("topic", 1)
+    assert info.value.code == Transport.TransportException.ERRORS["QUEUE_FULL"][0]
+
+
+def test_full_window_waits_for_acks():
+    tracker = DeliveryTracker(max_in_flight=1, window_timeout_sec=5)
+    tracker.track(tracker.begin("topic", 1), lambda: 1)
+    timer = threading.Timer(0.05, tracker.acked, (1,))
+    timer.start()
+    delivery = tracker.begin("topic", 1)
+    timer.join()
+    assert tracker.in_flight == 1 and not delivery.done()
+
+
+def test_pump_handles_io_while_waiting():
+    tracker = DeliveryTracker(max_in_flight=1)
+    tracker.track(tracker.begin("topic", 1), lambda: 1)
+    tracker._attach(lambda timeout: tracker.acked(1))
+    assert tracker.wait_all(1)
+
+
+def test_failures():
+    tracker = DeliveryTracker()
+    failing = tracker.begin("topic", 1)
+    with pytest.raises(RuntimeError):
+        tracker.track(failing, lambda: (_ for _ in ()).throw(RuntimeError("no")))
+    assert failing.done() and not failing.acked and not failing.wait(0)
+    pending = tracker.begin("topic", 1)
+    tracker.track(pending, lambda: 2)
+    tracker.fail_all(ConnectionError("gone"))
+    assert isinstance(pending.error, ConnectionError)
+    assert tracker.stats()["failed"] == 2 and tracker.in_flight == 0
+    tracker.acked(2)  # too late: ignored
+    assert not pending.acked
+
+
+def test_spilled():
+    tracker = DeliveryTracker()
+    spilled = tracker.begin("topic", 1)
+    with pytest.raises(RuntimeError):
+        tracker.track(spilled, lambda: (_ for _ in ()).throw(RuntimeError("no")), fail=False)
+    assert not spilled.done() and tracker.in_flight == 1  # up to the caller
+    tracker.spilled(spilled)
+    assert spilled.done() and spilled.spilled and spilled.error is None
+    assert not spilled.wait(0)
+    stats = tracker.stats()
+    assert stats["spilled"] == 1 and stats["failed"] == 0 and tracker.in_flight == 0
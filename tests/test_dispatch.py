@@ -0,0 +1,137 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+
+import pytest
+
+from gv import DeviceInfo
+from gv.dispatch import COALESCE, DROP_NEWEST, DROP_OLDEST, Dispatcher
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+class _Handler(object):
+    """Records the messages; holds the first one until `release()`."""
+
+    def __init__(self):
+        self.handled = []
+        self.threads = set()
+        self.__gate = threading.Event()
+        self.__lock = threading.Lock()
+
+    def __call__(self, topic, payload):
+        if payload == "hold":
+            self.__gate.wait(5)
+        if payload == "fail":
+            raise RuntimeError("callback failed")
+        with self.__lock:
+            self.handled.append((topic, payload))
+            self.threads.add(threading.current_thread().name)
+
+    def release(self):
+        self.__gate.set()
+
+
+def _wait(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def _fill(dispatcher, handler, topic="t"):
+    """Submits a message held by the handler, then 5 more for the queue."""
+    dispatcher._attach(handler)
+    dispatcher.submit(topic, "hold")
+    _wait(lambda: dispatcher.pending == 0)  # taken by a worker
+    for i in range(1, 6):
+        dispatcher.submit(topic, "m%d" % i)
+    handler.release()
+    dispatcher.shutdown()
+
+
+@pytest.mark.parametrize("policy, kept", [
+    (DROP_OLDEST, ["m3", "m4", "m5"]),
+    (DROP_NEWEST, ["m1", "m2", "m3"]),
+    (COALESCE, ["m5"]),
+])
+def test_policies_of_a_full_queue(policy, kept):
+    handler = _Handler()
+    dispatcher = Dispatcher(max_queued=3, policy=policy)
+    _fill(dispatcher, handler)
+    assert [payload for _, payload in handler.handled] == ["hold"] + kept
+    assert dispatcher.dropped == 5 - len(kept)
+    assert dispatcher.dispatched == 1 + len(kept)
+
+
+def test_policy_for_a_topic():
+    handler = _Handler()
+    dispatcher = Dispatcher(max_queued=3, policy=DROP_OLDEST)
+    dispatcher.set_policy("cmd", COALESCE)
+    dispatcher.set_policy("log", DROP_NEWEST, max_queued=1)
+    _fill(dispatcher, handler, "cmd")
+    _fill(dispatcher, handler, "log")
+    assert handler.handled == [("cmd", "hold"), ("cmd", "m5"), ("log", "hold"), ("log", "m1")]
+    with pytest.raises(ValueError):
+        dispatcher.set_policy("cmd", "drop_all")
+    with pytest.raises(ValueError):
+        Dispatcher(policy="drop_all")
+
+
+def test_messages_of_a_topic_are_handled_in_order():
+    handler = _Handler()
+    dispatcher = Dispatcher(workers=4, max_queued=1000, burst=3)
+    dispatcher._attach(handler)
+    topics = ["t%d" % i for i in range(8)]
+    for i in range(200):
+        for topic in topics:
+            dispatcher.submit(topic, i)
+    dispatcher.shutdown()
+    assert dispatcher.dropped == 0 and dispatcher.pending == 0
+    for topic in topics:
+        assert [p for t, p in handler.handled if t == topic] == list(range(200))
+    assert all(name.startswith("gv-dispatch") for name in handler.threads)
+
+
+def test_failing_callback_does_not_stop_the_topic():
+    handler = _Handler()
+    dispatcher = Dispatcher()
+    dispatcher._attach(handler)
+    for payload in ("a", "fail", "b"):
+        dispatcher.submit("t", payload)
+    dispatcher.shutdown()
+    assert handler.handled == [("t", "a"), ("t", "b")]
+    dispatcher.submit("t", "c")  # workers start again on demand
+    dispatcher.shutdown()
+    assert handler.handled[-1] == ("t", "c")
+
+
+def test_transport_callbacks_run_on_the_workers():
+    broker = LoopbackBroker()
+    transport = LoopbackTransport(DeviceInfo("dev", "device", "127.0.0.1", 0), broker)
+    dispatcher = Dispatcher()
+    transport.set_dispatcher(dispatcher)
+    threads = []
+    transport.subscribe("/devices/dev/actuators/a/input",
+                        lambda payload: threads.append((payload, threading.current_thread().name)))
+    transport.connect()
+    transport.send("/devices/dev/actuators/a/input", "on")
+    transport.shutdown()  # waits for the dispatcher
+    assert len(threads) == 1
+    payload, name = threads[0]
+    assert payload == "on" and name.startswith("gv-dispatch")
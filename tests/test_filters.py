@@ -0,0 +1,100 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+from gv.filters import Deadband, SwingingDoor
+
+
+def test_deadband_absolute():
+    band = Deadband(absolute=0.5)
+    sent = [band.offer(value, t) for t, value in enumerate([20.0, 20.3, 20.6, 20.2, 21.2])]
+    assert sent == [[(20.0, 0)], [], [(20.6, 2)], [], [(21.2, 4)]]
+    assert band.stats == {"received": 5, "published": 3, "suppressed": 2}
+
+
+def test_deadband_percent_and_any_change():
+    band = Deadband(percent=10)
+    assert band.offer(100, 0) and not band.offer(109, 1) and band.offer(111, 2)
+    band = Deadband()
+    assert band.offer("on", 0) and not band.offer("on", 1) and band.offer("off", 2)
+
+
+def test_deadband_min_and_max_interval():
+    band = Deadband(absolute=1, min_interval=10, max_interval=60)
+    assert band.offer(0, 0)
+    assert not band.offer(5, 5)  # too soon
+    assert band.offer(5, 10)
+    assert not band.offer(5, 30)
+    assert band.offer(5, 70)  # heartbeat
+
+
+def test_deadband_uses_clock_without_timestamps():
+    now = [0.0]
+    band = Deadband(absolute=1, max_interval=10, clock=lambda: now[0])
+    assert band.offer(1) == [(1, None)]
+    now[0] = 11.0
+    assert band.offer(1) == [(1, None)]
+
+
+def test_swinging_door_drops_readings_on_a_line():
+    door = SwingingDoor(deviation=0.1)
+    published = []
+    for t in range(10):
+        published += door.offer(float(t), t)
+    published += door.flush()
+    assert published == [(0.0, 0), (9.0, 9)]
+
+
+def test_swinging_door_publishes_corners():
+    door = SwingingDoor(deviation=0.1)
+    signal = [0, 1, 2, 3, 4, 3, 2, 1, 0]
+    published = []
+    for t, value in enumerate(signal):
+        published += door.offer(float(value), t)
+    published += door.flush()
+    assert published == [(0.0, 0), (4.0, 4), (0.0, 8)]
+
+
+def test_swinging_door_error_is_bounded():
+    deviation = 0.5
+    door = SwingingDoor(deviation=deviation)
+    signal = [((t * 7919) % 13) / 4.0 for t in range(200)]
+    published = []
+    for t, value in enumerate(signal):
+        published += door.offer(value, t)
+    published += door.flush()
+    times = [t for _, t in published]
+    for (v0, t0), (v1, t1) in zip(published, published[1:]):
+        for t in range(t0, t1 + 1):
+            interpolated = v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+            assert abs(interpolated - signal[t]) <= 2 * deviation + 1e-9
+    assert times[0] == 0 and times[-1] == 199 and len(times) < len(signal)
+
+
+def test_wrap():
+    sent = []
+    send = Deadband(absolute=1).wrap(lambda value, qos, retain, timestamp: sent.append((value, qos)))
+    for value in (1, 1.5, 3):
+        send(value, qos=1)
+    assert sent == [(1, 1), (3, 1)]
+
+
+def test_held_readings_keep_their_options():
+    door = SwingingDoor(deviation=0.1)
+    door.offer(1.0, 0, qos=1, retain=True)
+    door.offer(2.0, 1, qos=1, retain=True)
+    assert door.options == (1, True)
+    assert door.flush() == [(2.0, 1)]
@@ -0,0 +1,123 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+
+import pytest
+
+from gv import DeviceInfo
+from gv.gateway import GVGateway
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+@pytest.fixture
+def broker():
+    return LoopbackBroker()
+
+
+@pytest.fixture
+def backend(broker):
+    """Records `(topic, payload)` for every message published."""
+    transport = LoopbackTransport(DeviceInfo("backend", "backend", "127.0.0.1", 0), broker)
+    transport.connect()
+    transport.messages = []
+    transport.callback = lambda topic, payload: transport.messages.append((topic, payload))
+    transport.subscribe("#", None)
+    return transport
+
+
+def _gateway(broker):
+    info = DeviceInfo("gw", "gateway", "127.0.0.1", 0)
+    gateway = GVGateway(info, LoopbackTransport(info, broker))
+    gateway.connect()
+    return gateway
+
+
+def _info(id_):
+    return DeviceInfo(id_, "name-" + id_, "127.0.0.1", 0)
+
+
+def _statuses(backend):
+    return [(topic.split("/")[2], json.loads(payload)["status"])
+            for topic, payload in backend.messages if topic.endswith("/status")]
+
+
+def test_devices_register_and_go_online_and_offline(broker, backend):
+    gateway = _gateway(broker)
+    d1 = gateway.add_device(_info("d1"))
+    gateway.add_device(_info("d2"))
+    assert sorted(gateway.devices) == ["d1", "d2"] and gateway.device("d1") is d1
+    d1.add_sensor("s", "temp", "NUMERIC")
+    d1.send_data("s", 21.5)
+    gateway.shutdown()
+    topics = [topic for topic, _ in backend.messages]
+    assert topics[:5] == ["/devices/d1", "/devices/d1/status", "/devices/d2",
+                          "/devices/d2/status", "/devices/d1/sensors/s"]
+    assert backend.messages[5] == ("/devices/d1/sensors/s/output", '{"value":21.5}')
+    assert sorted(_statuses(backend)) == [("d1", "false"), ("d1", "true"),
+                                          ("d2", "false"), ("d2", "true")]
+    assert not gateway.connected
+
+
+def test_inbound_messages_are_routed_by_topic(broker, backend):
+    gateway = _gateway(broker)
+    received = {"d1": [], "d2": []}
+    for id_ in received:
+        gateway.add_device(_info(id_)).add_callback(
+            "/devices/%s/actuators/a/input" % id_, received[id_].append)
+    backend.send("/devices/d2/actuators/a/input", "on")
+    backend.send("/devices/d1/actuators/a/input", "off")
+    assert received == {"d1": ["off"], "d2": ["on"]}
+
+
+def test_removed_device_goes_offline_and_stops_receiving(broker, backend):
+    gateway = _gateway(broker)
+    received = []
+    d1 = gateway.add_device(_info("d1"))
+    d1.add_callback("/devices/d1/actuators/a/input", received.append)
+    gateway.add_device(_info("d2"))
+    d1.shutdown()  # only this device: the connection stays open
+    assert gateway.devices == ["d2"] and gateway.connected
+    assert _statuses(backend)[-1] == ("d1", "false")
+    with pytest.raises(KeyError):
+        gateway.device("d1")
+    backend.send("/devices/d1/actuators/a/input", "on")
+    assert received == []
+    gateway.remove_device("d1")  # no-op once removed
+    gateway.add_device(_info("d1"))  # can be served again
+    assert _statuses(backend)[-1] == ("d1", "true")
+
+
+def test_device_served_twice(broker):
+    gateway = _gateway(broker)
+    gateway.add_device(_info("d1"))
+    with pytest.raises(ValueError):
+        gateway.add_device(_info("d1"))
+
+
+def test_shutdown_flushes_batched_data(broker, backend):
+    gateway = _gateway(broker)
+    device = gateway.add_device(_info("d1"))
+    device.enable_batching(max_items=10, max_latency_sec=None)
+    device.send_data("s", 1)
+    device.send_data("s", 2)
+    gateway.poll()
+    assert backend.messages[-1][0] == "/devices/d1/status"
+    gateway.shutdown()
+    batches = [json.loads(payload) for topic, payload in backend.messages
+               if topic == "/devices/d1/output"]
+    assert batches == [{"data": [{"id": "s", "value": 1}, {"id": "s", "value": 2}]}]
@@ -0,0 +1,44 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+
+def _modules_after(code):
+    env = dict(os.environ, PYTHONPATH=SRC)
+    out = subprocess.run([sys.executable, "-c", code + "\nimport sys; print(' '.join(sys.modules))"],
+                         env=env, check=True, stdout=subprocess.PIPE, universal_newlines=True)
+    return set(out.stdout.split())
+
+
+def test_import_gv_loads_no_transport_dependency():
+    modules = _modules_after("import gv")
+    assert not {m for m in modules if m == "httplib2" or m.startswith(("httplib2.", "paho"))}
+    assert "gv.transports.mqtt" not in modules and "gv.transports.rest" not in modules
+
+
+def test_transports_load_on_first_use():
+    pytest.importorskip("paho.mqtt.client")
+    modules = _modules_after("import gv; gv.MqttTransport")
+    assert "gv.transports.mqtt" in modules and "paho.mqtt.client" in modules
+    assert "httplib2" not in modules
@@ -0,0 +1,182 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+import time
+
+from gv import DefaultProtocol, DeviceInfo, GVComm
+from gv.manifest import RegistrationManifest
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_manifest_records_and_reloads(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = RegistrationManifest(path, autosave_sec=5, clock=Clock())
+    assert manifest.changed("d1", "/devices/d1", b'{"nm":"a"}')
+    manifest.record("d1", "/devices/d1", b'{"nm":"a"}')
+    manifest.record("d2", "/devices/d2", '{"nm":"b"}')
+    assert not manifest.changed("d1", "/devices/d1", '{"nm":"a"}')  # str or bytes
+    assert manifest.changed("d1", "/devices/d1", b'{"nm":"c"}')
+    assert len(manifest) == 2 and not os.path.exists(path)
+    manifest.save()
+    reloaded = RegistrationManifest(path)
+    assert len(reloaded) == 2
+    assert not reloaded.changed("d2", "/devices/d2", b'{"nm":"b"}')
+    reloaded.forget("d2")
+    assert reloaded.changed("d2", "/devices/d2", b'{"nm":"b"}') and len(reloaded) == 1
+    reloaded.forget()
+    assert len(reloaded) == 0
+
+
+def test_manifest_autosaves(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    clock = Clock()
+    manifest = RegistrationManifest(path, autosave_sec=5, clock=clock)
+    manifest.record("d1", "t1", b"a")
+    assert not os.path.exists(path)
+    clock.now = 5
+    manifest.record("d1", "t2", b"b")
+    with open(path) as file:
+        assert set(json.load(file)["d1"]) == {"t1", "t2"}
+    os.remove(path)
+    manifest.save()  # nothing changed since
+    assert not os.path.exists(path)
+
+
+def _backend(broker):
+    """Records `(topic, payload)` for every registration published."""
+    transport = LoopbackTransport(DeviceInfo("backend", "backend", "127.0.0.1", 0), broker)
+    transport.connect()
+    transport.messages = []
+    transport.callback = lambda topic, payload: (
+        transport.messages.append((topic, payload)) if not topic.endswith("/status") else None)
+    transport.subscribe("#", None)
+    return transport
+
+
+def _comm(broker, **kwargs):
+    me = DeviceInfo("dev", "device", "127.0.0.1", 0)
+    transport = LoopbackTransport(me, broker)
+    return GVComm(me, transport, DefaultProtocol(transport, me, **kwargs))
+
+
+def _register(comm, sensor_name="temp"):
+    comm.connect()
+    comm.add_device()
+    comm.add_sensor("s", sensor_name, "NUMERIC")
+    comm.add_actuator("a", "switch", "BOOLEAN", lambda payload: None)
+    comm.flush()
+
+
+def test_unchanged_registrations_are_not_sent_again(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    broker = LoopbackBroker()
+    backend = _backend(broker)
+    comm = _comm(broker, manifest=RegistrationManifest(path))
+    _register(comm)
+    comm.shutdown()  # saves the manifest
+    assert [topic for topic, _ in backend.messages] == [
+        "/devices/dev", "/devices/dev/sensors/s", "/devices/dev/actuators/a"]
+    del backend.messages[:]
+
+    comm = _comm(broker, manifest=RegistrationManifest(path))  # restart
+    _register(comm)
+    assert backend.messages == []
+    comm.add_sensor("s", "temperature", "NUMERIC")
+    assert backend.messages == [("/devices/dev/sensors/s", '{"nm":"temperature","tp":"NUMERIC"}')]
+    comm.shutdown()
+
+
+class _Delivery(object):
+    def __init__(self):
+        self.acked = False
+        self.callbacks = []
+
+    def add_done_callback(self, fn):
+        self.callbacks.append(fn)
+
+    def ack(self):
+        self.acked = True
+        for fn in self.callbacks:
+            fn(self)
+
+
+def test_registrations_are_recorded_once_acknowledged():
+    broker = LoopbackBroker()
+    comm = _comm(broker, manifest=RegistrationManifest())
+    deliveries = []
+
+    def send(service, payload, qos=0, retain=False):
+        deliveries.append(_Delivery())
+        return deliveries[-1]
+
+    comm.transport.send = send
+    comm.add_device()
+    comm.add_sensor("s", "temp", "NUMERIC")
+    manifest = comm.protocol.manifest
+    assert len(deliveries) == 2 and len(manifest) == 0
+    deliveries[1].ack()
+    assert not manifest.changed("dev", "/devices/dev/sensors/s", b'{"nm":"temp","tp":"NUMERIC"}')
+    assert manifest.changed("dev", "/devices/dev", b'{"nm":"device","ip":"127.0.0.1","prt":"0"}')
+
+
+def test_bulk_registration_is_sent_as_one_message():
+    broker = LoopbackBroker()
+    backend = _backend(broker)
+    comm = _comm(broker, bulk_registration=True, bulk_delay_sec=None)
+    comm.add_device()
+    comm.add_sensor("s2", "humidity", "NUMERIC")
+    comm.add_sensor("s1", "temp", "NUMERIC")
+    comm.connect()  # sends the registration
+    comm.poll()  # nothing changed since
+    [(topic, payload)] = backend.messages
+    assert topic == "/devices/dev/registration"
+    assert payload == ('{"nm":"device","ip":"127.0.0.1","prt":"0",'
+                       '"sensors":{"s1":{"nm":"temp","tp":"NUMERIC"},'
+                       '"s2":{"nm":"humidity","tp":"NUMERIC"}},"actuators":{}}')
+    comm.add_actuator("a", "switch", "BOOLEAN", lambda payload: None)
+    assert len(backend.messages) == 1  # until poll()
+    comm.poll()
+    assert json.loads(backend.messages[-1][1])["actuators"] == {
+        "a": {"nm": "switch", "tp": "BOOLEAN"}}
+    comm.shutdown()
+    assert len(backend.messages) == 2
+
+
+def test_bulk_registration_is_sent_after_a_delay():
+    broker = LoopbackBroker()
+    backend = _backend(broker)
+    comm = _comm(broker, bulk_registration=True, bulk_delay_sec=0.05)
+    comm.connect()
+    comm.add_device()
+    comm.add_sensor("s", "temp", "NUMERIC")
+    assert backend.messages == []
+    deadline = time.monotonic() + 5
+    while not backend.messages and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [topic for topic, _ in backend.messages] == ["/devices/dev/registration"]
+    assert set(json.loads(backend.messages[0][1])["sensors"]) == {"s"}
+    comm.shutdown()
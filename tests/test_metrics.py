@@ -0,0 +1,66 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from gv import DefaultProtocol, DeviceInfo, GVComm
+from gv.metrics import Metrics
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+def _comm(broker, id_):
+    me = DeviceInfo(id_, id_, "127.0.0.1", 0)
+    transport = LoopbackTransport(me, broker)
+    return GVComm(me, transport, DefaultProtocol(transport, me))
+
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.counter("c", labels={"path": 'a\\b "c"\nd'}).inc()
+    assert 'c{path="a\\\\b \\"c\\"\\nd"} 1' in metrics.prometheus().splitlines()
+
+
+def test_duplicate_gauges_are_rejected():
+    metrics = Metrics()
+    metrics.gauge("g", labels={"a": "1"}, function=lambda: 1)
+    with pytest.raises(ValueError):
+        metrics.gauge("g", labels={"a": "1"}, function=lambda: 2)
+    metrics.remove("g", {"a": "1"})
+    metrics.gauge("g", labels={"a": "1"}, function=lambda: 2)
+    assert metrics.snapshot() == {'g{a="1"}': 2}
+
+
+def test_devices_get_their_own_series():
+    metrics = Metrics()
+    broker = LoopbackBroker()
+    first, second = _comm(broker, "dev1"), _comm(broker, "dev2")
+    first.set_metrics(metrics)
+    second.set_metrics(metrics)
+    snapshot = metrics.snapshot()
+    assert 'gv_batch_pending{device="dev1"}' in snapshot
+    assert 'gv_batch_pending{device="dev2"}' in snapshot
+    assert 'gv_outbox_depth{device="dev1",transport="LoopbackTransport"}' in snapshot
+
+
+def test_gauges_are_removed_with_the_metrics():
+    metrics = Metrics()
+    comm = _comm(LoopbackBroker(), "dev1")
+    comm.set_metrics(metrics)
+    comm.set_metrics(metrics)  # again: replaces its own gauges
+    comm.set_metrics(None)
+    assert not [series for series in metrics.snapshot() if "depth" in series or "pending" in series
+                or "suppressed" in series]
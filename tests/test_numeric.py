@@ -0,0 +1,82 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from gv import DefaultProtocol, DeviceInfo, GVComm
+from gv.aio import AsyncGVComm, AsyncTransport
+from gv.codecs import JsonCodec
+from gv.numeric import send_array
+from gv.protocols import AsyncGVProtocol_v1
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+class _AsyncRecorder(AsyncTransport):
+    def __init__(self):
+        AsyncTransport.__init__(self)
+        self.sent = []
+
+    async def send(self, service, payload, qos=0, retain=False):
+        self.sent.append((service, payload))
+
+    async def _handle_connect(self):
+        pass
+
+    async def _handle_shutdown(self):
+        pass
+
+    async def _handle_subscription(self, topic, callback):
+        pass
+
+
+def _me():
+    return DeviceInfo("dev", "device", "127.0.0.1", 0)
+
+
+def _sync_messages(values, **kwargs):
+    broker = LoopbackBroker()
+    backend = LoopbackTransport(DeviceInfo("backend", "backend", "127.0.0.1", 0), broker)
+    backend.connect()
+    received = []
+    backend.subscribe("/devices/dev/sensors/#", received.append)
+    transport = LoopbackTransport(_me(), broker)
+    comm = GVComm(_me(), transport, DefaultProtocol(transport, _me()))
+    comm.connect()
+    send_array(comm, "s", values, **kwargs)
+    comm.shutdown()
+    return [JsonCodec().decode(payload) for payload in received]
+
+
+def test_send_array_through_gv_comm():
+    messages = _sync_messages(np.arange(4.0), timestamps=np.arange(4.0) + 100)
+    assert messages == [{"values": [0.0, 1.0, 2.0, 3.0], "ts": [100.0, 101.0, 102.0, 103.0]}]
+
+
+def test_send_array_through_async_gv_comm():
+    transport = _AsyncRecorder()
+    comm = AsyncGVComm(_me(), transport, AsyncGVProtocol_v1(transport, _me()))
+    assert comm.protocol is not None and comm.transport is transport
+    values = np.arange(10.0)
+    asyncio.run(send_array(comm, "s", values, window=5, stats=('min', 'max')))
+    [(topic, payload)] = transport.sent
+    assert topic == "/devices/dev/sensors/s/output"
+    assert JsonCodec().decode(payload) == {"min": [0.0, 5.0], "max": [4.0, 9.0]}
+    assert _sync_messages(values, window=5, stats=('min', 'max')) == [JsonCodec().decode(payload)]
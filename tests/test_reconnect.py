@@ -0,0 +1,120 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+import time
+
+import pytest
+
+mqtt = pytest.importorskip("paho.mqtt.client")
+
+from gv import DefaultProtocol, DeviceInfo, GVComm
+from gv.reconnect import Reconnector
+from gv.standins import MqttStandIn
+from gv.transports.mqtt import MqttTransport
+
+
+class _GatedReconnector(Reconnector):
+    """Holds the reconnection attempts until `gate` is set."""
+
+    def __init__(self, gate, **kwargs):
+        Reconnector.__init__(self, **kwargs)
+        self.__gate = gate
+
+    def _attach(self, reconnect):
+        def gated():
+            self.__gate.wait(10)
+            return reconnect()
+        Reconnector._attach(self, gated)
+
+
+def _wait(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_fleet_recovers_from_broker_restart_under_load():
+    devices = 10
+    gate = threading.Event()  # opened once the backend listens to registrations
+    subscribed = threading.Event()
+    commands = []
+    registrations = set()
+    with MqttStandIn() as broker:
+        host, port = broker.address
+        comms = []
+        for i in range(devices):
+            me = DeviceInfo("dev%d" % i, "restart", "127.0.0.1", 0)
+            transport = MqttTransport(me, host, port, threaded=True)
+            transport.set_reconnector(_GatedReconnector(gate, initial_delay=0.1, max_delay=0.5,
+                                                        jitter=0.5))
+            comm = GVComm(me, transport, DefaultProtocol(transport, me))
+            comm.connect()
+            comm.add_device()
+            comm.add_sensor("s1", "load", "NUMERIC")
+            comm.add_actuator("a1", "command", "NUMERIC", commands.append)
+            comms.append(comm)
+        running = threading.Event()
+        running.set()
+
+        def load():
+            value = 0
+            while running.is_set():
+                value += 1
+                for comm in comms:
+                    try:
+                        comm.send_data("s1", value)
+                    except MqttTransport.TransportException:
+                        pass  # queue full while the broker is down
+                time.sleep(0.02)
+
+        publisher = threading.Thread(target=load, daemon=True)
+        publisher.start()
+        backend = None
+        try:
+            assert _wait(lambda: all(c.transport.connected for c in comms), 10)
+            broker.stop()
+            assert _wait(lambda: not any(c.transport.connected for c in comms), 10)
+            time.sleep(0.3)
+            broker.start()
+            backend = mqtt.Client("restart-backend")
+            backend.on_message = lambda client, userdata, msg: registrations.add(msg.topic)
+            backend.on_subscribe = lambda client, userdata, mid, granted: subscribed.set()
+            backend.connect(host, port)
+            backend.subscribe("/devices/+")
+            backend.loop_start()
+            assert subscribed.wait(5)
+            gate.set()
+            assert _wait(lambda: all(c.transport.connected and not c.transport.reconnector.active
+                                     for c in comms), 20)
+            assert _wait(lambda: len(registrations) == devices, 10)
+            # the actuators' subscriptions were restored: commands get through
+            for comm in comms:
+                backend.publish("/devices/%s/actuators/a1/input" % comm.device_info.id, "1")
+            assert _wait(lambda: len(commands) == devices, 10)
+        finally:
+            gate.set()
+            running.clear()
+            publisher.join()
+            if backend is not None:
+                backend.loop_stop()
+                backend.disconnect()
+            for comm in comms:
+                comm.shutdown()
@@ -0,0 +1,51 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+import pytest
+
+pytest.importorskip("httplib2")
+
+from gv import DeviceInfo
+from gv.standins import HttpStandIn
+from gv.transports.rest import RestTransport, LONG_POLL, STREAM
+
+
+def _wait(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.mark.parametrize("mode", [LONG_POLL, STREAM])
+def test_receiver_starts_on_connect(mode):
+    received = []
+    with HttpStandIn() as server:
+        me = DeviceInfo("dev", "device", "127.0.0.1", 0)
+        transport = RestTransport(me, *server.address, receive=mode, hold_sec=1)
+        transport.subscribe("/devices/dev/actuators/a/input", received.append)
+        time.sleep(0.2)
+        assert server.count == 0
+        transport.connect()
+        time.sleep(0.3)  # let the first request in
+        server.publish("/devices/dev/actuators/a/input", "1")
+        assert _wait(lambda: received == [b"1"], 5)
+        transport.shutdown()
@@ -0,0 +1,109 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import struct
+
+import pytest
+
+from gv.ring import ReadingRing, RingConsumer, INT, _DATA, _RECORD
+
+
+def test_round_trip_and_wrap_around(tmp_path):
+    with ReadingRing.create(str(tmp_path / "ring"), slots=4) as ring:
+        for i in range(3):
+            assert ring.write("s%d" % i, i)
+        assert len(ring.read()) == 3
+        assert ring.write_many([("a", 1.5, 10.0), ("b", 2), ("c", True)]) == 3
+        records = ring.read()
+        assert [r[2].rstrip(b'\0') for r in records] == [b"a", b"b", b"c"]
+        assert records[0][:2] == (10.0, 1.5) and records[1][3] == INT
+        assert ring.pending == 0
+
+
+def test_records_not_fully_written_are_read_later(tmp_path):
+    path = str(tmp_path / "ring")
+    with ReadingRing.create(path, slots=8) as ring:
+        ring.write_many([("a", 1), ("b", 2), ("c", 3)])
+        value_of_b = _DATA + _RECORD.size + 16
+        with open(path, 'r+b') as file:  # as if the value of "b" were not visible yet
+            file.seek(value_of_b)
+            saved = file.read(8)
+            file.seek(value_of_b)
+            file.write(struct.pack('<d', 99.0))
+        assert [r[1] for r in ring.read()] == [1.0]
+        assert ring.pending == 2
+        with open(path, 'r+b') as file:
+            file.seek(value_of_b)
+            file.write(saved)
+        assert [r[1] for r in ring.read()] == [2.0, 3.0]
+
+
+def test_full_ring_drops(tmp_path):
+    with ReadingRing.create(str(tmp_path / "ring"), slots=2) as ring:
+        assert ring.write_many([("a", 1), ("b", 2), ("c", 3)]) == 2
+        assert ring.dropped == 1
+
+
+def test_records_of_the_previous_lap_are_not_read_again(tmp_path):
+    path = str(tmp_path / "ring")
+    with ReadingRing.create(path, slots=2) as ring:
+        ring.write_many([("a", 1), ("b", 2)])
+        assert len(ring.read()) == 2
+        with open(path, 'r+b') as file:  # head moved on, the record not visible yet
+            file.seek(64)
+            file.write(struct.pack('<Q', 3))
+        assert ring.read() == [] and ring.pending == 1
+
+
+class _FlakyComm(object):
+    def __init__(self, failures=0, failing_qos=None):
+        self.failures = failures
+        self.failing_qos = failing_qos
+        self.batches = []
+
+    def send_data_batch(self, readings, qos=0, retain=False):
+        if self.failures or qos == self.failing_qos:
+            self.failures = max(0, self.failures - 1)
+            raise ConnectionError("down")
+        self.batches.append((list(readings), qos))
+
+
+def test_consumer_keeps_readings_until_sent(tmp_path):
+    with ReadingRing.create(str(tmp_path / "ring"), slots=8) as ring:
+        ring.write("a", 1)
+        ring.write("b", 2, qos=1)
+        comm = _FlakyComm(failures=1)
+        consumer = RingConsumer(ring, comm)
+        with pytest.raises(ConnectionError):
+            consumer.drain()
+        assert ring.pending == 2 and consumer.consumed == 0
+        assert consumer.drain() == 2
+        assert comm.batches == [([("a", 1)], 0), ([("b", 2)], 1)]
+        assert ring.pending == 0 and consumer.consumed == 2
+
+
+def test_consumer_keeps_only_the_readings_not_sent(tmp_path):
+    with ReadingRing.create(str(tmp_path / "ring"), slots=8) as ring:
+        ring.write("a", 1)
+        ring.write("b", True, qos=1)
+        comm = _FlakyComm(failing_qos=1)
+        consumer = RingConsumer(ring, comm)
+        with pytest.raises(ConnectionError):
+            consumer.drain()
+        assert comm.batches == [([("a", 1)], 0)] and consumer.consumed == 1
+        [record] = ring.peek()
+        assert record[2].rstrip(b'\0') == b"b"
@@ -0,0 +1,157 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+import pytest
+
+from gv.gvlib import Transport
+from gv.scheduler import (CONTROL, REGISTRATION, TELEMETRY, OutboundScheduler,
+                          TokenBucket, classify_gv_v1)
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    bucket = TokenBucket(10, 5)
+    assert bucket.delay(5, 0.0) == 0
+    bucket.take(5)
+    assert bucket.delay(1, 0.0) == pytest.approx(0.1)
+    assert bucket.delay(1, 0.1) == 0
+    assert bucket.delay(5, 10.0) == 0  # refilled, up to the burst only
+    assert bucket.tokens == 5
+
+
+def test_token_bucket_lets_large_requests_through_into_debt():
+    bucket = TokenBucket(10, 5)
+    assert bucket.delay(50, 0.0) == 0
+    bucket.take(50)
+    assert bucket.delay(1, 0.0) == pytest.approx(4.6)
+
+
+@pytest.mark.parametrize("service, lane, device", [
+    ("/devices/d1/status", CONTROL, "d1"),
+    ("/devices/d1/sensors/s1/output", TELEMETRY, "d1"),
+    ("/devices/d1/sensors/s1", REGISTRATION, "d1"),
+    ("/devices/d1", REGISTRATION, "d1"),
+    ("/other", TELEMETRY, None),
+])
+def test_classify_gv_v1(service, lane, device):
+    assert classify_gv_v1(service) == (lane, device)
+
+
+def _scheduler(sent, **kwargs):
+    clock = Clock()
+    scheduler = OutboundScheduler(clock=clock, **kwargs)
+    scheduler._attach(lambda service, payload, qos, retain: sent.append((service, payload)))
+    return scheduler, clock
+
+
+def test_sends_directly_within_limits():
+    sent = []
+    scheduler, clock = _scheduler(sent, rates={TELEMETRY: (10, 2)})
+    scheduler.send("/devices/d/sensors/s/output", "1")
+    scheduler.send("/devices/d/sensors/s/output", "2")
+    scheduler.send("/devices/d/sensors/s/output", "3")
+    assert [payload for _, payload in sent] == ["1", "2"]
+    assert scheduler.pending == 1
+    scheduler.shutdown()
+    assert [payload for _, payload in sent] == ["1", "2", "3"]
+
+
+def test_queue_full():
+    sent = []
+    scheduler, clock = _scheduler(sent, rates={TELEMETRY: (1, 1)}, max_queued=2)
+    for _ in range(3):
+        scheduler.send("/devices/d/sensors/s/output", "x")
+    with pytest.raises(Transport.TransportException):
+        scheduler.send("/devices/d/sensors/s/output", "x")
+    assert scheduler.stats()["telemetry"]["rejected"] == 1
+    scheduler.flush()
+    assert len(sent) == 3
+
+
+def test_flush_sends_higher_lanes_first():
+    sent = []
+    scheduler, clock = _scheduler(sent, max_bytes_per_sec=(1, 1))
+    scheduler.send("/devices/d/sensors/s/output", "t1")  # takes the burst
+    scheduler.send("/devices/d/sensors/s/output", "t2")
+    scheduler.send("/devices/d/sensors/s", "r1")
+    scheduler.send("/devices/d/status", "c1")
+    scheduler.flush()
+    assert [payload for _, payload in sent] == ["t1", "c1", "r1", "t2"]
+
+
+def test_uplink_charges_utf8_bytes():
+    sent = []
+    scheduler, clock = _scheduler(sent, max_bytes_per_sec=(10, 10))
+    scheduler.send("/devices/d/status", "é" * 5)  # 10 bytes
+    scheduler.send("/devices/d/status", "a")
+    assert len(sent) == 1 and scheduler.pending == 1
+    scheduler.flush()
+
+
+def test_blocking_send_does_not_hold_other_lanes():
+    entered, release = threading.Event(), threading.Event()
+    sent = []
+
+    def handler(service, payload, qos, retain):
+        if service.endswith("output"):
+            entered.set()
+            release.wait(5)
+        sent.append(service)
+
+    scheduler = OutboundScheduler()
+    scheduler._attach(handler)
+    blocked = threading.Thread(target=scheduler.send, args=("/devices/d/sensors/s/output", "x"))
+    blocked.start()
+    try:
+        assert entered.wait(5)
+        scheduler.send("/devices/d/status", "on")
+        assert sent == ["/devices/d/status"]
+    finally:
+        release.set()
+        blocked.join()
+        scheduler.shutdown()
+    assert sent == ["/devices/d/status", "/devices/d/sensors/s/output"]
+
+
+def test_failed_sends_are_not_counted_as_sent():
+    def handler(service, payload, qos, retain):
+        if payload == "bad":
+            raise Transport.TransportException(lookup="NOT_CONNECTED")
+
+    clock = Clock()
+    scheduler = OutboundScheduler(clock=clock, rates={TELEMETRY: (1, 1)})
+    scheduler._attach(handler)
+    with pytest.raises(Transport.TransportException):
+        scheduler.send("/devices/d/sensors/s/output", "bad")  # direct
+    scheduler.send("/devices/d/status", "good")
+    clock.now = 2.0
+    scheduler.send("/devices/d/sensors/s/output", "good")
+    scheduler.send("/devices/d/sensors/s/output", "bad")  # queued
+    scheduler.flush()
+    stats = scheduler.stats()
+    assert stats["telemetry"]["sent"] == 1 and stats["telemetry"]["failed"] == 2
+    assert stats["control"] == {"sent": 1, "failed": 0, "queued": 0, "rejected": 0}
+    assert scheduler.failed == 2
@@ -0,0 +1,148 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import signal
+import time
+
+import pytest
+
+from gv import DeviceInfo
+from gv.gvlib import TransportListener
+from gv.sharding import ShardedGateway, shard_of
+from gv.transports.loopback import LoopbackBroker, LoopbackTransport
+
+
+def _loopback(device_info):
+    return LoopbackTransport(device_info, LoopbackBroker())
+
+
+def _wait(condition, timeout, gateway=None):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        if gateway is not None:
+            gateway.poll()
+        time.sleep(0.02)
+    return True
+
+
+class _Lost(TransportListener):
+    def __init__(self):
+        self.shards = []
+
+    def _after_connection_lost(self, info):
+        self.shards.append(info.shard)
+
+
+def _gateway(**kwargs):
+    me = DeviceInfo("gw", "gateway", "127.0.0.1", 0)
+    gateway = ShardedGateway(me, _loopback, shards=2, health_interval_sec=0.05, **kwargs)
+    gateway.connect()
+    devices = []
+    for i in range(6):
+        device = gateway.add_device(DeviceInfo("dev%d" % i, "device", "127.0.0.1", 0))
+        device.add_sensor("s", "sensor", "NUMERIC")
+        devices.append(device)
+    return gateway, devices
+
+
+def _kill(gateway, shard):
+    os.kill(gateway.health()[shard]["pid"], signal.SIGKILL)
+
+
+def test_readings_reach_the_shard_of_their_device():
+    gateway, devices = _gateway()
+    try:
+        for i in range(100):
+            devices[i % len(devices)].send_data("s", i)
+        assert gateway.sync(10)
+        health = gateway.health()
+        for shard in range(2):
+            mine = [d for d in devices if shard_of(d.device_info.id, 2) == shard]
+            assert all(d.shard == shard for d in mine)
+            assert health[shard]["devices"] == len(mine)
+            assert health[shard]["readings"] == sum(1 for i in range(100)
+                                                    if devices[i % len(devices)] in mine)
+            assert health[shard]["errors"] == 0
+    finally:
+        gateway.shutdown()
+    assert not any(shard["alive"] for shard in gateway.health())
+
+
+def test_dead_worker_is_restarted_with_its_devices():
+    gateway, devices = _gateway()
+    lost = _Lost()
+    gateway.add_listener(lost)
+    try:
+        assert gateway.sync(10)
+        _kill(gateway, 0)
+        assert _wait(lambda: gateway.health()[0]["restarts"] == 1, 10, gateway)
+        assert lost.shards == [0]
+        for device in devices:
+            device.send_data("s", 1)
+        assert gateway.sync(10)
+        health = gateway.health()[0]
+        assert health["alive"] and health["errors"] == 0
+        assert health["readings"] == sum(1 for d in devices if d.shard == 0)
+    finally:
+        gateway.shutdown()
+
+
+def test_dead_worker_not_restarted():
+    gateway, devices = _gateway(restart=False)
+    try:
+        assert gateway.sync(10)
+        _kill(gateway, 0)
+        assert _wait(lambda: not gateway.health()[0]["alive"], 10)
+        gateway.poll()
+        for device in devices:
+            device.send_data("s", 1)
+        gateway.flush()
+        health = gateway.health()
+        assert health[0]["restarts"] == 0
+        assert health[0]["dropped"] == sum(1 for d in devices if d.shard == 0)
+    finally:
+        gateway.shutdown()  # must not trip on the dead worker
+
+
+def test_actuator_commands_run_in_the_supervisor():
+    mqtt = pytest.importorskip("paho.mqtt.client")
+    from gv.standins import MqttStandIn
+    commands = []
+    with MqttStandIn() as broker:
+        me = DeviceInfo("gw", "gateway", "127.0.0.1", 0)
+        gateway = ShardedGateway(me, "mqtt", shards=2, transport_args=broker.address)
+        gateway.connect()
+        try:
+            for i in range(4):
+                device = gateway.add_device(DeviceInfo("dev%d" % i, "device", "127.0.0.1", 0))
+                device.add_actuator("a", "actuator", "NUMERIC",
+                                    lambda payload, i=i: commands.append((i, payload)))
+            assert gateway.sync(10)
+            time.sleep(0.3)  # let the subscriptions reach the broker
+            backend = mqtt.Client("sharding-backend")
+            backend.connect(*broker.address)
+            for i in range(4):
+                backend.publish("/devices/dev%d/actuators/a/input" % i, str(i))
+            backend.loop(0.1)
+            assert _wait(lambda: len(commands) == 4, 10, gateway)
+            assert sorted(commands) == [(i, str(i).encode()) for i in range(4)]
+            backend.disconnect()
+        finally:
+            gateway.shutdown()
@@ -0,0 +1,138 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+
+import pytest
+
+from gv.gvlib import Transport
+from gv.store import Outbox, SegmentQueue
+
+
+def test_fifo_of_text_and_binary_messages(tmp_path):
+    queue = SegmentQueue(str(tmp_path), segment_size=4096)
+    queue.append("a/b", "text é", 1, True)
+    queue.append("c", b"\x00\x01", 0, False)
+    assert len(queue) == 2
+    assert queue.peek() == ("a/b", "text é", 1, True)
+    assert queue.peek() == ("a/b", "text é", 1, True)
+    queue.pop()
+    assert queue.peek() == ("c", b"\x00\x01", 0, False)
+    queue.pop()
+    assert queue.peek() is None and len(queue) == 0
+    queue.pop()  # no-op on an empty queue
+
+
+def test_reopen_resumes_after_consumed_messages(tmp_path):
+    queue = SegmentQueue(str(tmp_path), segment_size=256)
+    for i in range(20):
+        queue.append("s", "m%d" % i)
+    for _ in range(5):
+        queue.pop()
+    queue.close()
+    queue = SegmentQueue(str(tmp_path), segment_size=256)
+    assert len(queue) == 15
+    assert queue.peek()[1] == "m5"
+    messages = []
+    while len(queue):
+        messages.append(queue.peek()[1])
+        queue.pop()
+    assert messages == ["m%d" % i for i in range(5, 20)]
+
+
+def test_consumed_segments_are_deleted(tmp_path):
+    queue = SegmentQueue(str(tmp_path), segment_size=128)
+    for i in range(20):
+        queue.append("s", "x" * 40)
+    assert len(os.listdir(str(tmp_path))) > 1
+    while len(queue):
+        queue.pop()
+    assert len(os.listdir(str(tmp_path))) == 1
+
+
+@pytest.mark.parametrize("length", [1, 20, 25, 40])
+def test_append_after_emptying_the_last_segment(tmp_path, length):
+    queue = SegmentQueue(str(tmp_path), segment_size=200)
+    for _ in range(6):
+        queue.append("s", "x" * length)
+    for _ in range(6):
+        queue.pop()
+    queue.append("s", "new")
+    assert queue.peek() == ("s", "new", 0, False)
+    queue.pop()
+    assert len(queue) == 0 and queue.peek() is None
+    queue.append("s", "again")
+    queue.close()
+    assert SegmentQueue(str(tmp_path), segment_size=200).peek()[1] == "again"
+
+
+def test_incomplete_record_is_ignored_on_reopen(tmp_path):
+    queue = SegmentQueue(str(tmp_path), segment_size=4096)
+    queue.append("s", b"complete")
+    queue.close()
+    path = os.path.join(str(tmp_path), os.listdir(str(tmp_path))[0])
+    with open(path, 'r+b') as file:  # a record whose size was never written
+        file.seek(SegmentQueue._HEADER.size + SegmentQueue._RECORD.size + 1 + len(b"complete"))
+        file.write(b"\x00\x00\x00\x00" + b"partial")
+    queue = SegmentQueue(str(tmp_path), segment_size=4096)
+    assert len(queue) == 1
+    assert queue.peek() == ("s", b"complete", 0, False)
+
+
+def test_oldest_segment_is_evicted_when_full(tmp_path):
+    record = SegmentQueue._RECORD.size + len("s") + 20
+    queue = SegmentQueue(str(tmp_path), segment_size=SegmentQueue._HEADER.size + 2 * record,
+                         max_segments=2)
+    for i in range(6):
+        queue.append("s", "%020d" % i)
+    assert queue.dropped == 2
+    assert len(queue) == 4
+    assert queue.peek()[1] == "%020d" % 2
+
+
+def test_message_too_large(tmp_path):
+    with pytest.raises(ValueError):
+        SegmentQueue(str(tmp_path), segment_size=64).append("s", b"x" * 64)
+
+
+def test_outbox_drops_messages_failing_permanently(tmp_path):
+    sent, dead = [], []
+
+    def handler(service, payload, qos, retain):
+        if service == "bad":
+            raise Transport.TransportException(400, "Bad Request")
+        sent.append(service)
+
+    outbox = Outbox(SegmentQueue(str(tmp_path)), retry_sec=0.01,
+                    dead_letter=lambda *message: dead.append(message))
+    outbox._attach(handler)
+    for service in ("a", "bad", "b"):
+        outbox.send(service, b"x")  # not connected: queued
+    assert len(outbox.queue) == 3
+    outbox._after_connect(None)
+    try:
+        deadline = time.monotonic() + 5
+        while len(outbox.queue) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        outbox._before_disconnect(None)
+    assert sent == ["a", "b"]
+    assert [message[0] for message in dead] == ["bad"]
+    assert outbox.rejected == 1
+    with pytest.raises(Transport.TransportException):
+        outbox.send("bad", b"x")  # sent directly: the caller gets the error
@@ -0,0 +1,109 @@
+# Copyright (c) 2015, GreenVulcano Open Source Project. All rights reserved.
+#
+# This file is part of the GreenVulcano Communication Library for IoT.
+#
+# This is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# This software is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License
+# for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this software. If not, see <http://www.gnu.org/licenses/>.
+
+import threading
+
+import pytest
+
+from gv.topics import TopicIndex
+
+
+@pytest.mark.parametrize("topic_filter, topic, matches", [
+    ("a/b", "a/b", True),
+    ("a/b", "a/b/c", False),
+    ("a/+", "a/b", True),
+    ("a/+", "a/b/c", False),
+    ("a/+/c", "a/b/c", True),
+    ("+/+", "a/b", True),
+    ("a/#", "a", True),
+    ("a/#", "a/b/c", True),
+    ("a/#", "b/a", False),
+    ("#", "a/b", True),
+    ("+", "", True),
+    ("a/+", "a/", True),
+    ("#", "$SYS/load", False),
+    ("+/load", "$SYS/load", False),
+    ("$SYS/#", "$SYS/load", True),
+])
+def test_wildcards(topic_filter, topic, matches):
+    index = TopicIndex()
+    index.add(topic_filter, "cb")
+    assert index.match(topic) == (("cb",) if matches else ())
+
+
+@pytest.mark.parametrize("topic_filter", ["a/#/b", "a/b#", "a+/b", "a/+b"])
+def test_invalid_filters(topic_filter):
+    with pytest.raises(ValueError):
+        TopicIndex().add(topic_filter, "cb")
+
+
+def test_callbacks_in_registration_order_across_filters():
+    index = TopicIndex()
+    index.add("a/#", 1)
+    index.add("a/b", 2)
+    index.add("a/+", 3)
+    index.add("a/b", 1)  # already registered by an earlier filter
+    assert index.match("a/b") == (1, 2, 3)
+
+
+def test_remove_invalidates_cache_and_prunes():
+    index = TopicIndex()
+    assert index.add("a/b/c", 1)
+    assert not index.add("a/b/c", 2)
+    assert index.match("a/b/c") == (1, 2)
+    assert not index.remove("a/b/c", 1)
+    assert index.match("a/b/c") == (2,)
+    assert index.remove("a/b/c")
+    assert index.match("a/b/c") == ()
+    assert len(index) == 0 and index.filters() == []
+    assert "a/b/c" not in index
+
+
+def test_filters():
+    index = TopicIndex()
+    for topic_filter in ("a/b", "a/+", "c/#"):
+        index.add(topic_filter, topic_filter)
+    assert sorted(index.filters()) == ["a/+", "a/b", "c/#"]
+
+
+def test_match_while_subscriptions_change():
+    index = TopicIndex(cache_size=0)
+    stop = threading.Event()
+    errors = []
+
+    def mutate():
+        i = 0
+        while not stop.is_set():
+            index.add("a/+/c" if i % 2 else "a/#", i)
+            index.remove("a/+/c" if i % 2 else "a/#", i - 10)
+            i += 1
+
+    def match():
+        while not stop.is_set():
+            try:
+                index.match("a/b/c")
+            except Exception as exc:
+                errors.append(exc)
+
+    threads = [threading.Thread(target=mutate)] + [threading.Thread(target=match) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    stop.wait(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []